@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""History tab benchmark with a large transfer history.
+
+Fills a throwaway history store with synthetic entries, then times what
+the History tab does: building the widget (first page only), re-sorting
+by each column, switching the direction filter, searching, opening
+the statistics dashboard and scrolling through further pages. Memory held by the model is reported for the first page
+and after the scrolled pages.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_history.py [--entries N] [--pages N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep the benchmark away from the real ~/.siro
+os.environ["HOME"] = tempfile.mkdtemp(prefix="siro-bench-")
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication
+
+from src.utils.config import Config
+
+
+def fill(store, count):
+    now = time.time()
+    rng = random.Random(42)
+    store.extend(
+        {
+            "timestamp": now - rng.uniform(0, 3 * 365 * 86400),
+            "direction": rng.choice(("send", "receive")),
+            "file_name": f"file_{rng.randrange(10 ** 6):06d}.{rng.choice(('pdf', 'zip', 'jpg', 'mp4'))}",
+            "file_count": 1,
+            "size": rng.randrange(10 ** 10),
+            "code": f"{rng.randrange(10 ** 4)}-alpha-beta",
+            "status": rng.choice(("completed",) * 9 + ("error",)),
+            "duration": rng.uniform(1, 120),
+            "connect_time": rng.uniform(0.1, 3),
+        }
+        for _ in range(count)
+    )
+
+
+def timed(name, func):
+    started = time.perf_counter()
+    result = func()
+    print(f"  {name:<32} {(time.perf_counter() - started) * 1000:9.2f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000, help="history entries to create")
+    parser.add_argument("--pages", type=int, default=20, help="pages to scroll through")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    config = Config()
+    started = time.perf_counter()
+    fill(config.history, args.entries)
+    print(f"filled {args.entries:,} entries in {time.perf_counter() - started:.1f} s")
+
+    from src.ui.history_widget import HistoryWidget
+    widget = timed("open history tab", lambda: HistoryWidget(config))
+    widget.resize(800, 600)
+    widget.show()
+    app.processEvents()
+    model = widget.history_model
+    print(f"  rows loaded {model.rowCount():,} of {model.total_count():,}")
+
+    header = widget.history_table.horizontalHeader()
+    for column, name in enumerate(("date", "file", "size", "type")):
+        for order in (Qt.SortOrder.AscendingOrder, Qt.SortOrder.DescendingOrder):
+            label = f"sort by {name} {'asc' if order == Qt.SortOrder.AscendingOrder else 'desc'}"
+            timed(label, lambda: (header.setSortIndicator(column, order), app.processEvents()))
+
+    combo = widget.direction_combo
+    timed("filter: sent only", lambda: combo.setCurrentIndex(1))
+    timed("filter: all", lambda: combo.setCurrentIndex(0))
+
+    search = widget.search_edit
+    for query in ("file_0123", "alpha", "pdf >5GB", "zip from:2024-01-01 to:2024-06-30"):
+        search.setText(query)
+        timed(f"search: {query}", widget.apply_search)
+        print(f"    {model.total_count():,} matches")
+    search.clear()
+    widget.apply_search()
+
+    stats = widget.stats_widget
+    timed("stats: last 14 days", lambda: widget.stats_button.setChecked(True))
+    timed("stats: last 12 weeks", lambda: stats.period_combo.setCurrentIndex(1))
+    widget.stats_button.setChecked(False)
+
+    def scroll():
+        for _ in range(args.pages):
+            model.fetchMore()
+    timed(f"fetch {args.pages} more pages", scroll)
+
+    # Memory in a separate pass: tracing slows everything it measures
+    tracemalloc.start()
+    model.reload()
+    first_page = tracemalloc.get_traced_memory()[0]
+    scroll()
+    scrolled = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("model memory")
+    print(f"  first page ({model.page_size} rows)            {first_page / 1024:9.0f} KiB")
+    print(f"  after {args.pages} more pages ({model.rowCount():,} rows) {scrolled / 1024:9.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Throughput benchmark for the croc output parser.
+
+Replays the recorded croc output in benchmarks/corpus through
+CrocOutputParser in fixed-size chunks and reports lines per second.
+It also feeds pathological lines that would make a backtracking-prone
+pattern blow up and fails if any of them takes too long.
+
+    python benchmarks/bench_parser.py [--repeat N] [--chunk BYTES]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.croc_parser import CrocOutputParser, MAX_LINE_LENGTH
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+# Events every recording must produce, as a sanity check before timing
+EXPECTED = {
+    "croc9_send.txt": {"CodeEvent": 1, "FileInfoEvent": 1, "ConnectedEvent": 1, "ProgressEvent": 41},
+    "croc9_receive.txt": {"FileInfoEvent": 1, "ConnectedEvent": 1, "ProgressEvent": 41},
+    "croc10_send_multi.txt": {"CodeEvent": 1, "HashingEvent": 2, "ConnectedEvent": 1, "ProgressEvent": 215},
+    "croc10_receive_error.txt": {"ConnectedEvent": 1, "ProgressEvent": 1, "ErrorEvent": 1},
+}
+
+# Inputs that are slow for naive patterns such as (.+)\s+(\d+.\d+)%
+PATHOLOGICAL = [
+    b"9" * MAX_LINE_LENGTH,
+    b" " * MAX_LINE_LENGTH + b"%",
+    b"Sending '" + b"(" * MAX_LINE_LENGTH,
+    b"Receiving " + b"'a" * (MAX_LINE_LENGTH // 2),
+    b"x " * (MAX_LINE_LENGTH // 2) + b"1.%",
+    b"Hashing " + b"1 " * (MAX_LINE_LENGTH // 2) + b"%",
+    b"a 50% |" + b"(" * MAX_LINE_LENGTH,
+]
+PATHOLOGICAL_LIMIT = 0.05  # seconds per line
+
+
+def load_corpus():
+    corpus = {}
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        with open(os.path.join(CORPUS_DIR, name), "rb") as f:
+            corpus[name] = f.read()
+    return corpus
+
+
+def replay(data, chunk_size, croc_version=None):
+    parser = CrocOutputParser(croc_version)
+    events = []
+    for i in range(0, len(data), chunk_size):
+        events.extend(parser.feed(data[i:i + chunk_size]))
+    events.extend(parser.close())
+    return events
+
+
+def count_lines(data):
+    pieces = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n").split(b"\n")
+    return sum(1 for piece in pieces if piece.strip())
+
+
+def check_corpus(corpus, chunk_size):
+    ok = True
+    for name, data in corpus.items():
+        counts = Counter(type(event).__name__ for event in replay(data, chunk_size))
+        for kind, expected in EXPECTED.get(name, {}).items():
+            if counts[kind] != expected:
+                print(f"FAIL {name}: {kind} = {counts[kind]}, expected {expected}")
+                ok = False
+    return ok
+
+
+def bench_throughput(corpus, repeat, chunk_size):
+    data = b"".join(corpus.values()) * repeat
+    lines = count_lines(data)
+    start = time.perf_counter()
+    events = replay(data, chunk_size)
+    elapsed = time.perf_counter() - start
+    print(f"{lines} lines, {len(events)} events, {len(data) / 1e6:.1f} MB in {elapsed:.3f}s")
+    print(f"throughput: {lines / elapsed:,.0f} lines/s, {len(data) / elapsed / 1e6:.1f} MB/s")
+
+
+def bench_pathological():
+    ok = True
+    for data in PATHOLOGICAL:
+        parser = CrocOutputParser()
+        start = time.perf_counter()
+        parser.feed(data + b"\n")
+        elapsed = time.perf_counter() - start
+        status = "ok" if elapsed < PATHOLOGICAL_LIMIT else "FAIL"
+        if elapsed >= PATHOLOGICAL_LIMIT:
+            ok = False
+        print(f"{status} {data[:24]!r}... ({len(data)} B): {elapsed * 1000:.2f} ms")
+    return ok
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument("--repeat", type=int, default=200)
+    arg_parser.add_argument("--chunk", type=int, default=4096)
+    args = arg_parser.parse_args()
+
+    corpus = load_corpus()
+    ok = check_corpus(corpus, args.chunk)
+    # Small chunks split lines and multi-byte characters mid-way
+    ok = check_corpus(corpus, 7) and ok
+    bench_throughput(corpus, args.repeat, args.chunk)
+    ok = bench_pathological() and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
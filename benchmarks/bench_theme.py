@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Theme-switch latency benchmark.
+
+Measures how long it takes to get a finished stylesheet (rendering it,
+reading it from the disk cache, or taking it from memory) and how long a
+full light/dark switch of the main window takes with every tab built,
+including the repolish Qt does before the next paint. It also times the
+drag highlight on the file list, which only flips a dynamic property.
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_theme.py [--switches N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication
+
+from src.ui.theme import ThemeEngine, render_stylesheet
+from src.utils.history_store import HistoryStore
+
+
+class BenchConfig:
+    """Just enough of Config for MainWindow, kept away from ~/.siro"""
+
+    def __init__(self, config_dir):
+        self.config_dir = config_dir
+        self.log_dir = os.path.join(config_dir, "logs")
+        self.hash_db = os.path.join(config_dir, "hashes.db")
+        self.history = HistoryStore(os.path.join(config_dir, "history.db"))
+        self.settings = {"theme": "light", "croc_path": os.path.join(config_dir, "no-croc")}
+
+    def get_value(self, key, default=None):
+        return self.settings.get(key, default)
+
+    def set_value(self, key, value):
+        self.settings[key] = value
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(name, samples):
+    print(f"  {name:<28} median {statistics.median(samples):8.3f} ms   max {max(samples):8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--switches", type=int, default=20, help="theme switches to time")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as config_dir:
+        print("stylesheet lookup")
+        report("render (format template)", timed(lambda: render_stylesheet("dark"), 50))
+
+        def disk_hit():
+            ThemeEngine(config_dir).stylesheet("dark")
+        ThemeEngine(config_dir).stylesheet("dark")
+        report("disk cache hit", timed(disk_hit, 50))
+
+        engine = ThemeEngine(config_dir)
+        engine.stylesheet("dark")
+        report("memory cache hit", timed(lambda: engine.stylesheet("dark"), 1000))
+
+        from src.ui.main_window import MainWindow
+        # No croc here: skip the background check and its error dialog
+        MainWindow.revalidate_croc = lambda self: None
+        window = MainWindow(BenchConfig(config_dir))
+        for index in list(window.tab_builders):
+            window.ensure_tab(index)
+        window.show()
+        app.processEvents()
+
+        themes = ["dark", "light"]
+        state = {"next": 0}
+
+        def switch():
+            window.on_theme_changed(themes[state["next"] % 2])
+            state["next"] += 1
+            app.processEvents()
+
+        print(f"main window ({len(window.findChildren(object))} objects, all tabs built)")
+        report("theme switch + repolish", timed(switch, args.switches))
+        report("same theme again", timed(lambda: window.on_theme_changed(window.current_theme), 100))
+
+        file_list = window.send_widget.file_list
+        state["drag"] = False
+
+        def toggle_drag():
+            state["drag"] = not state["drag"]
+            file_list.set_drag_active(state["drag"])
+            app.processEvents()
+
+        report("file list drag highlight", timed(toggle_drag, 200))
+        window.close()
+        window.config.history.close()
+
+
+if __name__ == "__main__":
+    main()
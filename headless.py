@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""Sirodrop without a display: croc sends and receives with JSON-lines output.
+
+    python headless.py send FILE... [--code CODE] [--shards N]
+    python headless.py receive CODE [--out DIR]
+    python headless.py run QUEUE [--parallel N]
+    python headless.py watch FOLDER [--code CODE] [--existing]
+    python headless.py send FILE... --to NAME --dedup
+    python headless.py verify MANIFEST... [--root DIR]
+
+A queue file holds one JSON object per line (or a single JSON array), e.g.
+{"send": ["a.iso", "docs"], "code": "abc123", "shards": 2, "archive": true,
+"compress": "auto", "to": "mina", "dedup": true} or
+{"receive": "abc123", "out": "/srv/incoming"}. With "-" jobs are read from
+stdin and start as they arrive, so another program can feed a long-running
+instance. ``watch`` sends whatever settles in a folder, batched (see
+src/utils/watch_folder.py), until interrupted. ``--dedup`` leaves out files
+the ``--to`` recipient already received (src/utils/dedup.py); ``verify``
+checks a received dedup manifest against the files on disk.
+
+Every transfer event is printed to stdout as one JSON object per line;
+progress redraws are thinned to one per --progress-interval seconds.
+Transfers are recorded in the same history store the GUI shows. Only
+src.utils is imported, never Qt.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import string
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from src.utils.config import Config
+from src.utils.croc_utils import CrocUtils
+from src.utils.dedup import verify_manifest
+from src.utils.hashing import create_hasher
+from src.utils.logger import configure_logging, shutdown_logging
+from src.utils.transfer_job import TransferJob
+from src.utils.transfer_record import TransferRecorder
+from src.utils.watch_folder import FolderWatcher, QUIET_PERIOD, BATCH_WINDOW
+
+PROGRESS_STATUSES = ("transferring", "receiving", "hashing")
+PROGRESS_INTERVAL = 0.5
+# --compress / queue "compress" values -> TransferJob's "compress" option
+COMPRESS_MODES = {"auto": "auto", "on": True, "off": False}
+
+EXIT_FAILED = 1
+EXIT_INTERRUPTED = 130
+
+
+def generate_code():
+    """Random code like the send panel's (sharded sends derive theirs from it)"""
+    return "".join(random.choices(string.ascii_uppercase + string.digits, k=6))
+
+
+class EventPrinter:
+    """Writes transfer events to a stream as JSON lines, thinning out progress redraws"""
+
+    def __init__(self, stream, interval=PROGRESS_INTERVAL):
+        self.stream = stream
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._last_progress = {}
+
+    def publish(self, transfer_id, event):
+        now = time.monotonic()
+        with self._lock:
+            status = event.get("status")
+            if status in PROGRESS_STATUSES and not event.get("hash_complete"):
+                last = self._last_progress.get((transfer_id, status))
+                if last is not None and now - last < self.interval:
+                    return
+                self._last_progress[(transfer_id, status)] = now
+            else:
+                for progress_status in PROGRESS_STATUSES:
+                    self._last_progress.pop((transfer_id, progress_status), None)
+            line = json.dumps(dict(event, time=round(time.time(), 3)), ensure_ascii=False, default=str)
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class HeadlessRunner:
+    """Runs transfer jobs on a thread pool and reports their events"""
+
+    def __init__(self, croc_utils, printer, recorder=None, retry_policy=None, parallel=1, observers=(),
+                 hasher=None):
+        self.croc_utils = croc_utils
+        self.printer = printer
+        self.recorder = recorder
+        self.hasher = hasher
+        self.retry_policy = retry_policy or {}
+        self.observers = list(observers)
+        self.failed = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._jobs = {}
+        # future -> transfer id
+        self._futures = {}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="transfer")
+
+    def submit(self, direction, code, options):
+        """Queue a send or receive; returns its transfer id"""
+        transfer_id = f"{direction}-{next(self._ids)}"
+        job = TransferJob(
+            transfer_id, self.croc_utils, direction, code, options, self._publish,
+            self.retry_policy, self.recorder, self.hasher
+        )
+        self.printer.publish(transfer_id, dict(
+            options, status="queued", transfer_id=transfer_id, direction=direction, code=code
+        ))
+        with self._lock:
+            self._jobs[transfer_id] = job
+            self._futures[self._pool.submit(self._run, job)] = transfer_id
+        return transfer_id
+
+    def reject(self, message, **fields):
+        """Report a queue entry that could not be started"""
+        with self._lock:
+            self.failed += 1
+        self.printer.publish(None, dict(fields, status="error", message=message))
+
+    def _run(self, job):
+        try:
+            job.run()
+        finally:
+            with self._lock:
+                self._jobs.pop(job.transfer_id, None)
+
+    def _publish(self, transfer_id, event):
+        if event.get("status") == "error":
+            with self._lock:
+                self.failed += 1
+        for observer in self.observers:
+            observer(transfer_id, event)
+        self.printer.publish(transfer_id, event)
+
+    def wait(self):
+        """Block until every submitted job has finished"""
+        while True:
+            with self._lock:
+                pending = set(self._futures)
+            if not pending:
+                return
+            # A timeout keeps Ctrl+C responsive on the main thread
+            done, _ = wait(pending, timeout=0.5)
+            with self._lock:
+                for future in done:
+                    self._futures.pop(future, None)
+
+    def cancel(self):
+        """Drop queued jobs and stop the running ones"""
+        with self._lock:
+            futures = list(self._futures.items())
+            jobs = list(self._jobs.values())
+        for future, transfer_id in futures:
+            if future.cancel():
+                self.printer.publish(transfer_id, {
+                    "status": "error", "reason": "cancelled", "message": "Cancelled before it started",
+                    "transfer_id": transfer_id,
+                })
+        for job in jobs:
+            job.cancel()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def parse_job(spec, save_directory=None):
+    """(direction, code, options) from a queue entry; raises ValueError"""
+    if not isinstance(spec, dict):
+        raise ValueError("queue entries must be JSON objects")
+    if "send" in spec:
+        files = spec["send"]
+        files = [files] if isinstance(files, str) else list(files or ())
+        if not files:
+            raise ValueError("nothing to send")
+        shards = int(spec.get("shards", 1))
+        code = spec.get("code") or (generate_code() if shards > 1 else None)
+        if spec.get("dedup") and not spec.get("to"):
+            raise ValueError('dedup needs a recipient ("to")')
+        return "send", code, {
+            "files": [os.path.abspath(path) for path in files],
+            "shards": shards,
+            # Same option key as the send panel's checkbox
+            "zip": bool(spec.get("archive")),
+            "compress": parse_compress(spec.get("compress", "auto")),
+            "recipient": spec.get("to"),
+            "dedup": bool(spec.get("dedup")),
+        }
+    if "receive" in spec:
+        if not spec["receive"]:
+            raise ValueError("a receive needs a code")
+        save_path = spec.get("out") or save_directory or os.getcwd()
+        return "receive", spec["receive"], {"save_path": os.path.abspath(save_path)}
+    raise ValueError('queue entries need "send" or "receive"')
+
+
+def parse_compress(value):
+    """"auto", "on"/"off" or a JSON boolean -> the "compress" option"""
+    if isinstance(value, bool):
+        return value
+    try:
+        return COMPRESS_MODES[value]
+    except (KeyError, TypeError):
+        raise ValueError(f"compress must be one of {', '.join(COMPRESS_MODES)} or a boolean") from None
+
+
+def read_queue(path):
+    """Yield queue entries from a file or stdin ("-") as they are read"""
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        first = None
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            if first is None and line.startswith("["):
+                # A whole JSON array instead of JSON lines
+                yield from json.loads(line + stream.read())
+                return
+            first = line
+            yield json.loads(line)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="headless.py", description="Send and receive with croc, no display needed.")
+    parser.add_argument("--parallel", type=int, default=1, help="transfers to run at once (default 1)")
+    parser.add_argument("--progress-interval", type=float, default=PROGRESS_INTERVAL,
+                        help="seconds between printed progress events per transfer (0 prints all)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    send = commands.add_parser("send", help="send files and folders in one croc session")
+    send.add_argument("files", nargs="+")
+    send.add_argument("--code", help="code phrase (croc picks one if left out)")
+    send.add_argument("--shards", type=int, default=1, help="parallel croc sessions for the files")
+    send.add_argument("--archive", action="store_true", help="stream everything into croc as one tar")
+    send.add_argument("--compress", choices=COMPRESS_MODES, default="auto",
+                      help="let croc compress (auto: only if a sample of the files compresses well)")
+    send.add_argument("--to", help="recipient name; files sent to them are remembered")
+    send.add_argument("--dedup", action="store_true", help="leave out files --to already received")
+
+    receive = commands.add_parser("receive", help="receive with a code")
+    receive.add_argument("code")
+    receive.add_argument("--out", help="folder to save into (default: the save_directory setting)")
+
+    run = commands.add_parser("run", help="run the jobs of a queue file")
+    run.add_argument("queue", help='JSON lines or a JSON array of jobs; "-" reads stdin')
+
+    watch = commands.add_parser("watch", help="send what lands in a folder until interrupted")
+    watch.add_argument("folder")
+    watch.add_argument("--code", help="code phrase for every batch (default: one random code)")
+    watch.add_argument("--shards", type=int, default=1, help="parallel croc sessions per batch")
+    watch.add_argument("--archive", action="store_true", help="send each batch as one streamed tar")
+    watch.add_argument("--compress", choices=COMPRESS_MODES, default="auto",
+                       help="let croc compress (auto: decided per batch from a sample)")
+    watch.add_argument("--to", help="recipient name; files sent to them are remembered")
+    watch.add_argument("--dedup", action="store_true", help="leave out files --to already received")
+    watch.add_argument("--quiet", type=float, default=QUIET_PERIOD,
+                       help=f"seconds an item must stay unchanged before it is sent (default {QUIET_PERIOD:g})")
+    watch.add_argument("--window", type=float, default=BATCH_WINDOW,
+                       help=f"seconds to gather settled items into one send (default {BATCH_WINDOW:g})")
+    watch.add_argument("--existing", action="store_true", help="also send what is already in the folder")
+
+    verify = commands.add_parser("verify", help="check that the files a dedup manifest left out are here")
+    verify.add_argument("manifests", nargs="+")
+    verify.add_argument("--root", help="folder the files were received into (default: each manifest's folder)")
+    return parser
+
+
+def watch_folder(runner, args):
+    """Submit a send for each batch of settled items until interrupted"""
+    # The same code for every batch, so the receiving side can loop on one code
+    code = args.code or generate_code()
+    runner.printer.publish(None, {"status": "watching", "folder": os.path.abspath(args.folder), "code": code})
+    watcher = FolderWatcher(
+        args.folder,
+        lambda paths: runner.submit(*parse_job({
+            "send": paths, "code": code, "shards": args.shards, "archive": args.archive,
+            "compress": args.compress, "to": args.to, "dedup": args.dedup,
+        })),
+        quiet_period=args.quiet,
+        batch_window=args.window,
+        include_existing=args.existing,
+    )
+    watcher.run()
+
+
+def verify_manifests(args, config):
+    """Print one line per manifest; fails if any left-out file is missing"""
+    printer = EventPrinter(sys.stdout)
+    hasher = create_hasher(config)
+    exit_code = 0
+    for path in args.manifests:
+        try:
+            check = verify_manifest(path, args.root, hasher)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            printer.publish(None, {"status": "error", "manifest": path, "message": str(e)})
+            exit_code = EXIT_FAILED
+            continue
+        printer.publish(None, {
+            "status": "verified" if not check.missing else "incomplete",
+            "manifest": check.manifest,
+            "present": check.present,
+            "present_bytes": check.present_bytes,
+            "missing": check.missing,
+        })
+        if check.missing:
+            exit_code = EXIT_FAILED
+    return exit_code
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    config = Config()
+    configure_logging(config.log_dir, config.get_value("verbose_log", False))
+    if args.command == "verify":
+        # Only reads local files; croc is not needed
+        exit_code = verify_manifests(args, config)
+        shutdown_logging()
+        return exit_code
+    try:
+        croc_utils = CrocUtils(config)
+    except (FileNotFoundError, RuntimeError) as e:
+        print(f"croc unavailable: {e}", file=sys.stderr)
+        shutdown_logging()
+        return EXIT_FAILED
+
+    metrics_exporter = None
+    if config.get_value("metrics_port") or config.get_value("metrics_textfile"):
+        # http.server is only worth importing when metrics are on
+        from src.utils.metrics import start_metrics
+        metrics_exporter = start_metrics(config)
+    runner = HeadlessRunner(
+        croc_utils,
+        EventPrinter(sys.stdout, args.progress_interval),
+        recorder=TransferRecorder(config.history),
+        retry_policy={
+            "max_retries": config.get_value("retry_max", 3),
+            "base_delay": config.get_value("retry_base_delay", 2.0),
+        },
+        parallel=args.parallel,
+        observers=[metrics_exporter.metrics.observe] if metrics_exporter is not None else (),
+        hasher=create_hasher(config),
+    )
+    save_directory = config.get_value("save_directory")
+
+    exit_code = 0
+    try:
+        if args.command == "send":
+            runner.submit(*parse_job({
+                "send": args.files, "code": args.code, "shards": args.shards, "archive": args.archive,
+                "compress": args.compress, "to": args.to, "dedup": args.dedup,
+            }))
+        elif args.command == "receive":
+            runner.submit(*parse_job({"receive": args.code, "out": args.out}, save_directory))
+        elif args.command == "watch":
+            watch_folder(runner, args)
+        else:
+            for index, spec in enumerate(read_queue(args.queue), 1):
+                try:
+                    job = parse_job(spec, save_directory)
+                except (ValueError, TypeError) as e:
+                    runner.reject(str(e), entry=index)
+                    continue
+                runner.submit(*job)
+        runner.wait()
+    except KeyboardInterrupt:
+        runner.cancel()
+        runner.wait()
+        exit_code = EXIT_INTERRUPTED
+    except (OSError, ValueError) as e:
+        # Unreadable queue file or watched folder: stop what was started from it
+        print(f"error: {e}", file=sys.stderr)
+        runner.cancel()
+        runner.wait()
+        exit_code = EXIT_FAILED
+    finally:
+        runner.shutdown()
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+        config.save()
+        shutdown_logging()
+
+    if exit_code == 0 and runner.failed:
+        exit_code = EXIT_FAILED
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,38 +1,55 @@
 #!/usr/bin/env python3
 import sys
 import os
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtGui import QIcon
-from PyQt6.QtCore import QDir
-import qdarktheme
 
-from src.ui.main_window import MainWindow
-from src.utils.config import Config
+from src.utils.startup import StartupTimer
 
 def main():
+    # --startup-report prints an import/construct/show timing breakdown
+    startup = StartupTimer(enabled="--startup-report" in sys.argv)
+    argv = [arg for arg in sys.argv if arg != "--startup-report"]
+
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtCore import QDir, QTimer
+    startup.mark("import Qt")
+
+    from src.utils.config import Config
+    from src.utils.logger import configure_logging, shutdown_logging
+    from src.ui.main_window import MainWindow
+    startup.mark("import app modules")
+
     # Initialize configuration
     config = Config()
-    
+
+    # Initialize logging (file output only when verbose logging is enabled)
+    configure_logging(config.log_dir, config.get_value("verbose_log", False))
+    startup.mark("config and logging")
+
     # Create application
-    app = QApplication(sys.argv)
+    app = QApplication(argv)
     app.setApplicationName("Siro File Transfer")
-    
-    # Set application style
-    theme = config.get_theme()
-    if theme == "dark":
-        app.setStyleSheet(qdarktheme.load_stylesheet())
-    else:
-        app.setStyleSheet(qdarktheme.load_stylesheet("light"))
-    
+    startup.mark("create QApplication")
+
     # Set current directory for file dialogs
     QDir.setCurrent(os.path.expanduser("~"))
-    
-    # Create and show main window
+
+    # Create and show main window (the window applies its own stylesheet)
     main_window = MainWindow(config)
+    startup.mark("construct main window")
     main_window.show()
-    
+    startup.mark("show main window")
+
+    # The first event loop iteration runs after the window is painted
+    def first_event_loop_pass():
+        startup.mark("first event loop pass")
+        startup.report()
+    QTimer.singleShot(0, first_event_loop_pass)
+
     # Execute application
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    config.save()
+    shutdown_logging()
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
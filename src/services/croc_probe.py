@@ -0,0 +1,22 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.utils.croc_discovery import CrocDiscovery, check_version
+
+
+class CrocProbeWorker(QThread):
+    """Re-probes the croc binary in the background and refreshes the cache"""
+    probed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, cache_dir, croc_path=None, parent=None):
+        super().__init__(parent)
+        self.discovery = CrocDiscovery(cache_dir, croc_path)
+
+    def run(self):
+        try:
+            info = self.discovery.probe()
+            check_version(info)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.probed.emit(info)
@@ -0,0 +1,28 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.utils.watch_folder import FolderWatcher, QUIET_PERIOD, BATCH_WINDOW
+
+
+class FolderWatchThread(QThread):
+    """Watches an outbox folder in the background
+
+    Emits each batch of settled files and folders (a list of paths) to be
+    sent together, or ``failed`` if the folder cannot be watched any more.
+    """
+    batch_ready = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path, quiet_period=QUIET_PERIOD, batch_window=BATCH_WINDOW, parent=None):
+        super().__init__(parent)
+        self.watcher = FolderWatcher(path, self.batch_ready.emit, quiet_period, batch_window)
+
+    def stop(self):
+        """Stop watching and wait for the thread"""
+        self.watcher.stop()
+        self.wait()
+
+    def run(self):
+        try:
+            self.watcher.run()
+        except OSError as e:
+            self.failed.emit(str(e))
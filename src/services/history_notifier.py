@@ -0,0 +1,50 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+# How often to check for changes made by another app instance while watched
+EXTERNAL_POLL_MS = 3000
+
+
+class HistoryNotifier(QObject):
+    """Relays history store changes to the GUI thread as signals
+
+    The store calls its listeners on whichever thread wrote (usually a
+    transfer worker); emitting from there queues the signals to this
+    object's thread. Changes made by other processes are only visible
+    through ``PRAGMA data_version``, which is polled while ``watch`` is on
+    and turned into ``reset``.
+    """
+    appended = pyqtSignal(object)
+    updated = pyqtSignal(object)
+    deleted = pyqtSignal(object)
+    reset = pyqtSignal()
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._poll_timer = QTimer(self)
+        self._poll_timer.setInterval(EXTERNAL_POLL_MS)
+        self._poll_timer.timeout.connect(self.poll)
+        store.add_listener(self._on_change)
+        self.destroyed.connect(lambda: store.remove_listener(self._on_change))
+
+    def _on_change(self, kind, payload):
+        if kind == "appended":
+            self.appended.emit(payload)
+        elif kind == "updated":
+            self.updated.emit(payload)
+        elif kind == "deleted":
+            self.deleted.emit(payload)
+        else:
+            self.reset.emit()
+
+    def poll(self):
+        """Check once for changes from other processes"""
+        self.store.poll_external_changes()
+
+    def watch(self, enabled):
+        """Poll for outside changes while something is showing the history"""
+        if enabled:
+            self.poll()
+            self._poll_timer.start()
+        else:
+            self._poll_timer.stop()
@@ -0,0 +1,42 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from src.utils.compressibility import estimate_compressibility
+from src.utils.manifest import scan_paths, ScanCancelled, DEFAULT_CACHE
+
+
+class ManifestScanner(QThread):
+    """Walks the selected files and folders in the background
+
+    Emits running totals while scanning and the final totals at the end.
+    Results are cached per directory, so scanning the same tree again only
+    costs one stat per directory. Then samples the largest files the scan
+    found and emits a CompressionEstimate.
+    """
+    progress = pyqtSignal(object)
+    scanned = pyqtSignal(object)
+    estimated = pyqtSignal(object)
+
+    def __init__(self, paths, cache=DEFAULT_CACHE, parent=None):
+        super().__init__(parent)
+        self.paths = list(paths)
+        self.cache = cache
+        self._cancelled = False
+
+    def cancel(self):
+        """Stop at the next directory boundary"""
+        self._cancelled = True
+
+    def run(self):
+        try:
+            totals = scan_paths(
+                self.paths,
+                self.cache,
+                progress=self.progress.emit,
+                cancelled=lambda: self._cancelled
+            )
+            self.scanned.emit(totals)
+            # 방금 훑은 결과의 큰 파일로 표본을 뽑으므로 다시 훑지 않음
+            estimate = estimate_compressibility(self.paths, totals=totals)
+        except ScanCancelled:
+            return
+        self.estimated.emit(estimate)
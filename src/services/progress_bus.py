@@ -0,0 +1,71 @@
+import threading
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+# Statuses that change what the user sees beyond a number moving. These
+# are never coalesced or delayed.
+STATE_TRANSITIONS = frozenset({
+    "waiting", "connected", "connecting", "confirmation", "retrying", "completed", "error"
+})
+
+DEFAULT_RATE_HZ = 30
+
+
+class ProgressBus(QObject):
+    """Coalesces transfer events and delivers them to the UI at a fixed rate
+
+    ``publish`` may be called from any thread. Progress events are
+    coalesced per transfer and status (the latest event wins), so e.g.
+    checksum progress never hides transfer progress, and flushed on a
+    timer in the bus's own thread; state transitions flush the pending
+    updates for their transfer and are delivered right away, so ordering
+    per transfer is preserved.
+    """
+    delivered = pyqtSignal(str, object)
+
+    def __init__(self, rate_hz=DEFAULT_RATE_HZ, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self.set_rate(rate_hz)
+
+    def set_rate(self, rate_hz):
+        """Change the delivery rate for coalesced progress updates"""
+        rate_hz = max(1, int(rate_hz))
+        self._timer.setInterval(max(1, round(1000 / rate_hz)))
+
+    def start(self):
+        """Start periodic delivery (call from the bus's thread)"""
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def stop(self):
+        """Stop periodic delivery after handing out what is pending"""
+        self._timer.stop()
+        self.flush()
+
+    def publish(self, transfer_id, event):
+        """Queue an event for delivery; thread safe"""
+        status = event.get("status")
+        if status in STATE_TRANSITIONS:
+            with self._lock:
+                stale = [self._pending.pop(key) for key in list(self._pending) if key[0] == transfer_id]
+            for pending in stale:
+                self.delivered.emit(transfer_id, pending)
+            self.delivered.emit(transfer_id, event)
+            return
+
+        with self._lock:
+            # Replace rather than merge, so no keys of older redraws linger
+            self._pending[(transfer_id, status)] = dict(event)
+
+    def flush(self):
+        """Deliver the latest pending update of every transfer"""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+        for (transfer_id, _status), event in pending.items():
+            self.delivered.emit(transfer_id, event)
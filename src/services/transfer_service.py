@@ -0,0 +1,96 @@
+import itertools
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+from src.services.progress_bus import ProgressBus, DEFAULT_RATE_HZ
+from src.utils.transfer_job import TransferJob
+from src.utils.transfer_record import TransferRecorder
+
+
+class TransferWorker(QThread):
+    """Runs a single croc send/receive off the GUI thread"""
+
+    def __init__(self, transfer_id, croc_utils, bus, direction, code, options,
+                 retry_policy=None, recorder=None, hasher=None, parent=None):
+        super().__init__(parent)
+        self.transfer_id = transfer_id
+        self.job = TransferJob(
+            transfer_id, croc_utils, direction, code, options, bus.publish, retry_policy, recorder, hasher
+        )
+
+    def cancel(self):
+        """Stop retrying and terminate this transfer's croc processes"""
+        self.job.cancel()
+
+    def run(self):
+        self.job.run()
+
+
+class TransferManager(QObject):
+    """Owns the running transfer workers and relays their events to the UI"""
+    transfer_event = pyqtSignal(str, object)
+    transfer_finished = pyqtSignal(str)
+
+    def __init__(self, croc_utils, rate_hz=DEFAULT_RATE_HZ, retry_policy=None, history=None,
+                 hasher=None, parent=None):
+        super().__init__(parent)
+        self.croc_utils = croc_utils
+        self.retry_policy = retry_policy or {}
+        # 보내는 파일의 체크섬 계산 (hashing.FileHasher, 없으면 계산하지 않음)
+        self.hasher = hasher
+        # 끝난 전송은 워커 스레드에서 기록 저장소에 추가됨
+        self.recorder = TransferRecorder(history) if history is not None else None
+        self.workers = {}
+        self._ids = itertools.count(1)
+        self.bus = ProgressBus(rate_hz, self)
+        self.bus.delivered.connect(self.transfer_event)
+
+    def start_send(self, code, options):
+        """Start sending options['files'] and return the transfer id
+
+        options['shards'] > 1 splits the files by size into that many parallel
+        croc sessions with codes '<code>-1', '<code>-2', ...
+        """
+        return self._start("send", code, options)
+
+    def start_receive(self, code, options):
+        """Start receiving with the given code and return the transfer id"""
+        return self._start("receive", code, options)
+
+    def _start(self, direction, code, options):
+        transfer_id = f"{direction}-{next(self._ids)}"
+        worker = TransferWorker(
+            transfer_id, self.croc_utils, self.bus, direction, code, options,
+            self.retry_policy, self.recorder, self.hasher, self
+        )
+        worker.finished.connect(lambda tid=transfer_id: self._on_worker_finished(tid))
+        self.workers[transfer_id] = worker
+        self.bus.start()
+        worker.start()
+        return transfer_id
+
+    def _on_worker_finished(self, transfer_id):
+        worker = self.workers.pop(transfer_id, None)
+        if worker is not None:
+            worker.deleteLater()
+        if not self.workers:
+            self.bus.stop()
+        self.transfer_finished.emit(transfer_id)
+
+    def active_count(self):
+        """Number of transfers still running"""
+        return len(self.workers)
+
+    def cancel(self, transfer_id):
+        """Cancel one running transfer"""
+        worker = self.workers.get(transfer_id)
+        if worker is not None:
+            worker.cancel()
+
+    def shutdown(self, timeout_ms=3000):
+        """Stop all croc processes and wait for the worker threads"""
+        for worker in list(self.workers.values()):
+            worker.cancel()
+        self.croc_utils.terminate_all()
+        for worker in list(self.workers.values()):
+            worker.wait(timeout_ms)
@@ -0,0 +1,238 @@
+from datetime import datetime
+
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+from src.utils.history_search import matches_search
+from src.utils.history_store import PAGE_SIZE
+from src.utils.units import format_size
+
+# (정렬 키, 헤더) - 정렬 키는 HistoryStore.page의 sort 값
+COLUMNS = (
+    ("timestamp", "날짜"),
+    ("file_name", "파일"),
+    ("size", "크기"),
+    ("direction", "유형"),
+)
+
+# 저장소의 SORT_KEYS와 같은 순서를 내는 파이썬 정렬 키
+SORT_KEY_FUNCTIONS = {
+    "timestamp": lambda e: (e.get("timestamp") or 0, e["id"]),
+    "file_name": lambda e: (e.get("file_name") or "", e["id"]),
+    "size": lambda e: (e["size"] if e.get("size") is not None else -1, e["id"]),
+    "direction": lambda e: (e.get("direction") or "", e.get("timestamp") or 0, e["id"]),
+}
+
+DIRECTION_LABELS = {"send": "보냄", "receive": "받음"}
+DIRECTION_COLORS = {"send": QColor("#7b68ee"), "receive": QColor("#4CAF50")}
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """전송 기록 테이블 모델
+
+    기록 저장소에서 한 페이지씩 필요할 때만 읽어옴 (canFetchMore/fetchMore).
+    정렬, 유형 필터, 검색은 저장소의 인덱스로 처리하므로 기록이 많아도
+    탭을 열 때는 첫 페이지만 읽음.
+    
+    저장소 변경 알림(entry_appended/updated/deleted)은 이미 읽은 범위에
+    해당하는 행만 넣고 고치고 빼며, 전체를 다시 읽는 것은 reload 뿐임.
+    """
+
+    def __init__(self, store, page_size=PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self.sort_key = "timestamp"
+        self.descending = True
+        self.direction = None
+        # history_search.parse_search 결과 (없으면 None)
+        self.search = None
+        # 행마다 표시용 값을 미리 만들어 둔 튜플 (id, 날짜, 파일, 크기, 유형, 정렬 키)
+        self._rows = []
+        # id -> 정렬 키 (알림으로 받은 항목의 행 위치를 이진 탐색으로 찾기 위함)
+        self._keys = {}
+        self._last_entry = None
+        self._exhausted = False
+        self._total = 0
+
+    def _display_row(self, entry):
+        """저장소 항목을 표시용 튜플로 변환"""
+        timestamp = entry.get("timestamp")
+        date = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M") if timestamp else ""
+        size = entry.get("size")
+        size_text = format_size(size) if size is not None else entry.get("size_text", "")
+        key = SORT_KEY_FUNCTIONS[self.sort_key](entry)
+        self._keys[entry["id"]] = key
+        return (entry["id"], date, entry.get("file_name") or "", size_text, entry.get("direction"), key)
+
+    def _fetch_page(self):
+        entries = self.store.page(
+            self.page_size, after=self._last_entry, direction=self.direction,
+            sort=self.sort_key, descending=self.descending, search=self.search
+        )
+        if len(entries) < self.page_size:
+            self._exhausted = True
+        if entries:
+            self._last_entry = entries[-1]
+        return [self._display_row(entry) for entry in entries]
+
+    def reload(self):
+        """처음부터 다시 읽기 (첫 페이지만)"""
+        self.beginResetModel()
+        self._rows = []
+        self._keys = {}
+        self._last_entry = None
+        self._exhausted = False
+        self._rows = self._fetch_page()
+        self._total = self.store.count(self.direction, self.search)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        rows = self._fetch_page()
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 3:
+                return DIRECTION_LABELS.get(row[4], row[4])
+            return row[column + 1]
+        if role == Qt.ItemDataRole.ForegroundRole and column == 3:
+            # 보낸 파일은 보라색, 받은 파일은 초록색
+            return DIRECTION_COLORS.get(row[4])
+        if role == Qt.ItemDataRole.ToolTipRole and column == 1:
+            return row[2]
+        if role == Qt.ItemDataRole.UserRole:
+            return row[0]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNS[section][1]
+        return None
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """헤더 클릭 정렬 - 저장소에서 해당 순서로 다시 읽음"""
+        sort_key = COLUMNS[column][0]
+        descending = order == Qt.SortOrder.DescendingOrder
+        if (sort_key, descending) == (self.sort_key, self.descending):
+            return
+        self.sort_key = sort_key
+        self.descending = descending
+        self.reload()
+
+    def set_direction_filter(self, direction):
+        """유형 필터 ("send", "receive" 또는 전체는 None)"""
+        if direction == self.direction:
+            return
+        self.direction = direction
+        self.reload()
+
+    def set_search(self, search):
+        """검색 조건 (history_search.parse_search 결과, 없으면 None)"""
+        if search == self.search:
+            return
+        self.search = search
+        self.reload()
+
+    def total_count(self):
+        """현재 필터에 해당하는 전체 기록 수"""
+        return self._total
+
+    def entry_id(self, row):
+        """행의 기록 id"""
+        return self._rows[row][0]
+
+    def _remove_row(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        removed = self._rows.pop(row)
+        self._keys.pop(removed[0], None)
+        self.endRemoveRows()
+    
+    def _position(self, key):
+        """정렬 순서에서 key가 들어갈 행 위치 (이진 탐색)"""
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            current = self._rows[middle][5]
+            if (current > key) if self.descending else (current < key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+    
+    def _matches(self, entry):
+        if self.direction is not None and entry.get("direction") != self.direction:
+            return False
+        return matches_search(entry, self.search)
+    
+    def _insert(self, entry):
+        """읽어 둔 범위 안이면 정렬 위치에 한 행 삽입 (범위 밖은 나중에 fetchMore로)"""
+        row = self._position(SORT_KEY_FUNCTIONS[self.sort_key](entry))
+        if row == len(self._rows) and not self._exhausted:
+            return
+        display = self._display_row(entry)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.insert(row, display)
+        self.endInsertRows()
+    
+    def entry_appended(self, entry):
+        """새 기록 알림"""
+        if not self._matches(entry) or entry["id"] in self._keys:
+            return
+        self._total += 1
+        self._insert(entry)
+    
+    def entry_updated(self, entry):
+        """바뀐 기록 알림 - 해당 행만 갱신 (정렬 위치가 바뀌면 옮김)"""
+        old_key = self._keys.get(entry["id"])
+        if old_key is None:
+            # 읽지 않은 범위의 기록: 필터 해당 여부가 바뀌었을 수 있으니 개수만 다시 셈
+            if self._matches(entry):
+                self._insert(entry)
+            self._total = self.store.count(self.direction, self.search)
+            return
+        row = self._position(old_key)
+        if not self._matches(entry):
+            self._remove_row(row)
+            self._total -= 1
+        elif SORT_KEY_FUNCTIONS[self.sort_key](entry) != old_key:
+            self._remove_row(row)
+            self._insert(entry)
+        else:
+            self._rows[row] = self._display_row(entry)
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
+    
+    def entries_deleted(self, entry_ids):
+        """삭제된 기록 알림 - 읽어 둔 행만 제거"""
+        unloaded = False
+        for entry_id in entry_ids:
+            key = self._keys.get(entry_id)
+            if key is None:
+                unloaded = True
+                continue
+            self._remove_row(self._position(key))
+            self._total -= 1
+        if unloaded:
+            # 읽지 않은 범위의 기록은 필터 해당 여부를 모르므로 개수를 다시 셈
+            self._total = self.store.count(self.direction, self.search)
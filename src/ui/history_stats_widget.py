@@ -0,0 +1,113 @@
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+)
+from PyQt6.QtCore import Qt, QTimer
+
+from src.utils.units import format_rate, format_size
+
+# (기간 키, 표시 이름, 보여줄 기간 수)
+PERIOD_CHOICES = (
+    ("day", "일별", 14),
+    ("week", "주별", 12),
+)
+
+COLUMNS = ("기간", "보냄", "받음", "전송", "실패율", "평균 속도", "p95 속도", "연결 시간")
+
+# 기록이 바뀐 뒤 통계를 다시 읽기까지의 지연 (연속 변경을 한 번에 반영)
+REFRESH_DELAY_MS = 300
+
+
+def _format_rate(rate):
+    return format_rate(rate) if rate else "-"
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.1f}초"
+
+
+class HistoryStatsWidget(QWidget):
+    """일별/주별 전송 통계
+
+    기록 저장소가 전송을 기록할 때 함께 갱신하는 집계 테이블만 읽으므로
+    (history_stats) 기록이 아무리 많아도 기간 수만큼의 행만 읽음.
+    보이는 동안에만 읽고, 기록 변경 알림은 모아서 한 번 다시 읽음.
+    """
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._stale = True
+
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(REFRESH_DELAY_MS)
+        self._refresh_timer.timeout.connect(self.refresh)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(8)
+
+        # 기간 선택
+        top_layout = QHBoxLayout()
+        title_label = QLabel("전송 통계")
+        self.period_combo = QComboBox()
+        for key, label, count in PERIOD_CHOICES:
+            self.period_combo.addItem(label, (key, count))
+        self.period_combo.currentIndexChanged.connect(self.refresh)
+        top_layout.addWidget(title_label)
+        top_layout.addStretch(1)
+        top_layout.addWidget(self.period_combo)
+        layout.addLayout(top_layout)
+
+        # 통계 표
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.horizontalHeaderItem(5).setToolTip("완료된 전송의 평균 속도 (상대 연결 대기 시간 제외)")
+        self.table.horizontalHeaderItem(6).setToolTip("완료된 전송 중 상위 5% 경계의 속도 (근사값)")
+        self.table.horizontalHeaderItem(7).setToolTip("받을 때 보내는 쪽과 연결되기까지 걸린 시간의 중앙값 (근사값)")
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.table.setMaximumHeight(220)
+        layout.addWidget(self.table)
+
+    def schedule_refresh(self, *args):
+        """기록 변경 알림 - 보이는 중이면 잠시 후 다시 읽고, 아니면 다음에 보일 때 읽음"""
+        self._stale = True
+        if self.isVisible():
+            self._refresh_timer.start()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._stale:
+            self.refresh()
+
+    def refresh(self, *args):
+        """집계 테이블에서 통계를 읽어 표시"""
+        self._refresh_timer.stop()
+        self._stale = False
+        period, count = self.period_combo.currentData()
+        rows = self.store.stats(period, count)
+
+        self.table.setRowCount(len(rows))
+        for row, stats in enumerate(rows):
+            values = (
+                stats["period"] if period == "day" else f"{stats['period']} 주",
+                format_size(stats["sent_bytes"]),
+                format_size(stats["received_bytes"]),
+                f"{stats['transfers']:,}",
+                f"{stats['failure_rate'] * 100:.0f}%",
+                _format_rate(stats["average_rate"]),
+                _format_rate(stats["p95_rate"]),
+                _format_seconds(stats["median_connect"]),
+            )
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row, column, item)
+        self.table.resizeRowsToContents()
@@ -4,19 +4,26 @@ from datetime import datetime
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
-    QPushButton, QFileDialog, QFrame, QTableWidget,
-    QTableWidgetItem, QHeaderView, QMenu, QMessageBox,
-    QAbstractItemView
+    QPushButton, QFileDialog, QFrame, QTableView,
+    QHeaderView, QMenu, QMessageBox, QAbstractItemView,
+    QComboBox
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QSize, QPoint
-from PyQt6.QtGui import QIcon, QAction, QColor, QCursor, QFont
+from PyQt6.QtCore import Qt, pyqtSignal, QSize, QPoint, QUrl, QTimer
+from PyQt6.QtGui import QIcon, QAction, QColor, QCursor, QFont, QDesktopServices
+
+from src.ui.history_model import HistoryTableModel
+from src.ui.history_stats_widget import HistoryStatsWidget
+from src.utils.history_search import parse_search
+from src.services.history_notifier import HistoryNotifier
+
+# 검색어 입력이 멈춘 뒤 검색하기까지의 지연
+SEARCH_DELAY_MS = 150
 
 class HistoryWidget(QWidget):
     def __init__(self, config):
         super().__init__()
         self.config = config
         self.init_ui()
-        self.update_theme(self.config.get_value("theme", "light"))
         self.refresh_history()
     
     def init_ui(self):
@@ -40,6 +47,19 @@ class HistoryWidget(QWidget):
         button_layout.setContentsMargins(0, 0, 0, 0)
         button_layout.setSpacing(10)
         
+        # 유형 필터
+        self.direction_combo = QComboBox()
+        self.direction_combo.addItem("전체", None)
+        self.direction_combo.addItem("보냄", "send")
+        self.direction_combo.addItem("받음", "receive")
+        self.direction_combo.currentIndexChanged.connect(self.on_direction_changed)
+        
+        # 통계 보기 (켰을 때만 집계를 읽음)
+        self.stats_button = QPushButton("통계")
+        self.stats_button.setCheckable(True)
+        self.stats_button.toggled.connect(self.toggle_stats)
+        self.stats_button.setFixedSize(100, 36)
+        
         # 새로고침 버튼
         self.refresh_button = QPushButton("새로고침")
         self.refresh_button.clicked.connect(self.refresh_history)
@@ -50,27 +70,69 @@ class HistoryWidget(QWidget):
         self.clear_button.clicked.connect(self.clear_history)
         self.clear_button.setFixedSize(100, 36)
         
+        button_layout.addWidget(self.direction_combo)
+        button_layout.addWidget(self.stats_button)
         button_layout.addWidget(self.refresh_button)
         button_layout.addWidget(self.clear_button)
         
+        # 기록 수
+        self.count_label = QLabel()
+        self.count_label.setStyleSheet("color: #666666;")
+        
         top_layout.addWidget(title_label)
+        top_layout.addWidget(self.count_label)
         top_layout.addStretch(1)
         top_layout.addWidget(button_container)
         
         self.main_layout.addWidget(top_container)
         
+        # 검색창 (입력할 때마다 검색하되 타이핑 중에는 마지막 입력만 반영)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("파일명·코드·상대 검색 (3글자 이상)  >10MB  <1GB  from:2025-01-01  to:2025-12-31")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(self.on_search_text_changed)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.main_layout.addWidget(self.search_edit)
+        
+        # 통계 (기본은 숨김)
+        self.stats_widget = HistoryStatsWidget(self.config.history, self)
+        self.stats_widget.hide()
+        self.main_layout.addWidget(self.stats_widget)
+        
         # 기록 테이블
         self.create_history_table()
     
     def create_history_table(self):
-        """기록 테이블 생성"""
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(4)
-        self.history_table.setHorizontalHeaderLabels(["날짜", "파일", "크기", "유형"])
-        self.history_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
-        self.history_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
-        self.history_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
-        self.history_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
+        """기록 테이블 생성 (저장소에서 페이지 단위로 읽는 모델/뷰)"""
+        self.history_model = HistoryTableModel(self.config.history, parent=self)
+        
+        # 저장소 변경 알림을 받아 행 단위로 반영 (다른 인스턴스의 변경은 전체 다시 읽기)
+        self.notifier = HistoryNotifier(self.config.history, self)
+        self.notifier.appended.connect(self.history_model.entry_appended)
+        self.notifier.updated.connect(self.history_model.entry_updated)
+        self.notifier.deleted.connect(self.history_model.entries_deleted)
+        self.notifier.reset.connect(self.history_model.reload)
+        for signal in (self.notifier.appended, self.notifier.updated, self.notifier.deleted, self.notifier.reset):
+            signal.connect(self.stats_widget.schedule_refresh)
+        self.history_model.rowsInserted.connect(self.update_count)
+        self.history_model.rowsRemoved.connect(self.update_count)
+        self.history_model.modelReset.connect(self.update_count)
+        
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
+        
+        # 행 높이와 열 너비를 내용으로 계산하지 않도록 고정 (전체 행 검사 방지)
+        header = self.history_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.history_table.setColumnWidth(0, 140)
+        self.history_table.setColumnWidth(2, 90)
+        self.history_table.setColumnWidth(3, 70)
+        self.history_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.history_table.verticalHeader().hide()
         
         # 테이블 설정
         self.history_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
@@ -78,57 +140,48 @@ class HistoryWidget(QWidget):
         self.history_table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.history_table.customContextMenuRequested.connect(self.show_context_menu)
         
+        # 헤더 클릭 정렬 (기본: 최신순)
+        header.setSortIndicator(0, Qt.SortOrder.DescendingOrder)
+        self.history_table.setSortingEnabled(True)
+        
         self.main_layout.addWidget(self.history_table)
     
-    def update_theme(self, theme):
-        """테마에 따라 위젯 스타일 업데이트"""
-        is_dark = theme == "dark"
-        
-        # 테마 색상 정의
-        if is_dark:
-            # 다크 테마
-            primary_color = "#7b68ee"
-            text_color = "#f0f0f0"
-            secondary_text = "#a0a0a0"
-        else:
-            # 라이트 테마
-            primary_color = "#7b68ee"
-            text_color = "#333333"
-            secondary_text = "#666666"
-        
-        # 섹션 제목 스타일
-        for widget in self.findChildren(QLabel):
-            if widget.objectName() == "sectionTitle":
-                widget.setStyleSheet(f"font-size: 22px; font-weight: bold; color: {primary_color};")
-    
     def refresh_history(self):
-        """기록 새로고침"""
-        # 실제 구현에서는 설정이나 DB에서 기록 로드
-        self.history_table.setRowCount(0)  # 테이블 초기화
-        
-        # 샘플 데이터 (실제로는 저장된 기록 사용)
-        sample_data = [
-            {"date": "2025-03-01 14:30", "file": "project_report.pdf", "size": "2.5 MB", "type": "보냄"},
-            {"date": "2025-03-01 12:15", "file": "presentation.pptx", "size": "4.8 MB", "type": "받음"},
-            {"date": "2025-02-28 18:45", "file": "source_code.zip", "size": "1.2 MB", "type": "보냄"},
-            {"date": "2025-02-28 10:20", "file": "meeting_notes.docx", "size": "0.5 MB", "type": "받음"},
-            {"date": "2025-02-27 16:10", "file": "images.zip", "size": "8.7 MB", "type": "보냄"}
-        ]
-        
-        # 테이블에 데이터 추가
-        for row, data in enumerate(sample_data):
-            self.history_table.insertRow(row)
-            self.history_table.setItem(row, 0, QTableWidgetItem(data["date"]))
-            self.history_table.setItem(row, 1, QTableWidgetItem(data["file"]))
-            self.history_table.setItem(row, 2, QTableWidgetItem(data["size"]))
-            
-            type_item = QTableWidgetItem(data["type"])
-            if data["type"] == "보냄":
-                type_item.setForeground(QColor("#7b68ee"))  # 보낸 파일은 보라색
-            else:
-                type_item.setForeground(QColor("#4CAF50"))  # 받은 파일은 초록색
-            
-            self.history_table.setItem(row, 3, type_item)
+        """기록 새로고침 (첫 페이지만 다시 읽음)"""
+        self.history_model.reload()
+    
+    def update_count(self, *args):
+        """기록 수 표시"""
+        self.count_label.setText(f"{self.history_model.total_count():,}건")
+    
+    def showEvent(self, event):
+        """탭이 보이는 동안만 다른 인스턴스의 변경 확인"""
+        super().showEvent(event)
+        self.notifier.watch(True)
+    
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.notifier.watch(False)
+    
+    def on_direction_changed(self, index):
+        """유형 필터 변경"""
+        self.history_model.set_direction_filter(self.direction_combo.itemData(index))
+    
+    def toggle_stats(self, checked):
+        """통계 보이기/숨기기"""
+        self.stats_widget.setVisible(checked)
+    
+    def on_search_text_changed(self, text):
+        """검색어 변경 - 입력이 잠시 멈추면 검색"""
+        self.search_timer.start()
+    
+    def apply_search(self):
+        """검색어를 해석해 모델에 적용 (조건이 같으면 다시 읽지 않음)"""
+        self.history_model.set_search(parse_search(self.search_edit.text()))
+    
+    def selected_rows(self):
+        """선택된 행 번호 목록"""
+        return [index.row() for index in self.history_table.selectionModel().selectedRows()]
     
     def clear_history(self):
         """기록 삭제"""
@@ -140,15 +193,14 @@ class HistoryWidget(QWidget):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            self.history_table.setRowCount(0)
-            # 실제 구현에서는 저장된 기록 삭제
+            self.config.history.clear()
     
     def show_context_menu(self, position):
         """테이블에 컨텍스트 메뉴 표시"""
         menu = QMenu(self)
         
         # 선택된 행 확인
-        if self.history_table.selectedItems():
+        if self.selected_rows():
             # 액션 추가
             open_location_action = QAction("저장 위치 열기", self)
             open_location_action.triggered.connect(self.open_file_location)
@@ -165,26 +217,22 @@ class HistoryWidget(QWidget):
     
     def open_file_location(self):
         """선택한 파일 위치 열기"""
-        if not self.history_table.selectedItems():
+        rows = self.selected_rows()
+        if not rows:
             return
         
-        # 실제 구현에서는 파일 경로 가져오기
-        row = self.history_table.currentRow()
-        file_name = self.history_table.item(row, 1).text()
-        
-        # 임시로 경로 지정 (실제로는 저장된 경로 사용)
-        downloads_path = str(Path.home() / "Downloads")
+        entry = self.config.history.get(self.history_model.entry_id(rows[0]))
+        location = entry.get("save_path") if entry else None
+        if not location or not os.path.isdir(location):
+            QMessageBox.information(self, "파일 위치", "이 기록에는 열 수 있는 저장 위치가 없습니다.")
+            return
         
-        # 파일 위치 열기 (실제로는 OS에 맞게 처리)
-        QMessageBox.information(
-            self, 
-            "파일 위치", 
-            f"이 기능은 데모입니다. 실제로는 다음 경로가 열립니다:\n{downloads_path}"
-        )
+        QDesktopServices.openUrl(QUrl.fromLocalFile(location))
     
     def delete_selected_items(self):
         """선택한 항목 삭제"""
-        if not self.history_table.selectedItems():
+        rows = self.selected_rows()
+        if not rows:
             return
         
         reply = QMessageBox.question(
@@ -196,8 +244,5 @@ class HistoryWidget(QWidget):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
-            # 선택된 행 제거 (역순으로 삭제하여 인덱스 문제 방지)
-            rows = sorted(set(item.row() for item in self.history_table.selectedItems()), reverse=True)
-            for row in rows:
-                self.history_table.removeRow(row)
-            # 실제 구현에서는 DB에서 삭제 
\ No newline at end of file
+            # 저장소의 삭제 알림으로 모델에서도 해당 행이 빠짐
+            self.config.history.delete_many([self.history_model.entry_id(row) for row in rows])
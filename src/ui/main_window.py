@@ -14,13 +14,15 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QSize, QTimer, QPropertyAnimation, QEasingCurve, QPoint, QRectF
 from PyQt6.QtGui import QIcon, QAction, QPixmap, QColor, QPalette, QFont, QPainter, QPainterPath
 
-import qdarktheme
-
 from src.utils.croc_utils import CrocUtils
+from src.services.transfer_service import TransferManager
+from src.services.progress_bus import DEFAULT_RATE_HZ
+from src.services.croc_probe import CrocProbeWorker
+from src.utils.croc_discovery import CrocDiscovery
+from src.utils.hashing import create_hasher
+from src.utils.metrics import start_metrics
 from src.ui.send_widget import SendWidget
-from src.ui.receive_widget import ReceiveWidget
-from src.ui.history_widget import HistoryWidget
-from src.ui.settings_widget import SettingsWidget
+from src.ui.theme import ThemeEngine
 
 
 class MainWindow(QMainWindow):
@@ -28,18 +30,87 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.config = config
         self.croc_utils = None
+        self.transfer_manager = None
         self.animations = {}
+        self.current_theme = self.config.get_value("theme", "light")
+        self.theme_engine = ThemeEngine(self.config.config_dir)
+        self.applied_theme = None
         
         # UI 초기화
         self.init_ui()
         
-        # Croc 초기화
+        # 메트릭 내보내기 (metrics_port / metrics_textfile 설정 시에만, 아니면 None)
+        self.metrics_exporter = start_metrics(self.config)
+        
+        # Croc 초기화 (캐시된 정보만 사용, 실제 확인은 창 표시 후 백그라운드에서)
+        self.croc_probe = None
+        cached_info = CrocDiscovery(
+            self.config.config_dir, self.config.get_value("croc_path")
+        ).cached()
+        if cached_info:
+            try:
+                self.init_croc(cached_info)
+            except Exception as e:
+                self.statusBar().showMessage(str(e))
+        QTimer.singleShot(0, self.revalidate_croc)
+    
+    def init_croc(self, info):
+        """확인된 croc 정보로 CrocUtils와 전송 관리자 준비"""
+        if self.croc_utils:
+            self.croc_utils.apply_info(info)
+        else:
+            self.croc_utils = CrocUtils(self.config, info)
+            
+            # 백그라운드 전송 관리자
+            self.transfer_manager = TransferManager(
+                self.croc_utils,
+                rate_hz=self.config.get_value("progress_rate_hz", DEFAULT_RATE_HZ),
+                retry_policy={
+                    "max_retries": self.config.get_value("retry_max", 3),
+                    "base_delay": self.config.get_value("retry_base_delay", 2.0),
+                },
+                history=self.config.history,
+                hasher=create_hasher(self.config),
+                parent=self
+            )
+            self.transfer_manager.transfer_event.connect(self.on_transfer_event)
+            if self.metrics_exporter is not None:
+                self.transfer_manager.transfer_event.connect(self.metrics_exporter.metrics.observe)
+        
+        version = self.croc_utils.get_version()
+        self.version_label.setText(f"Croc v{version}")
+        self.statusBar().showMessage(f"Croc version: {version}")
+    
+    def revalidate_croc(self):
+        """croc 바이너리를 백그라운드에서 다시 확인 (설정 변경 시에도 호출)"""
+        if self.croc_probe is not None:
+            return
+        probe = CrocProbeWorker(self.config.config_dir, self.config.get_value("croc_path"), self)
+        probe.probed.connect(self.on_croc_probed)
+        probe.failed.connect(self.on_croc_probe_failed)
+        probe.finished.connect(self.on_croc_probe_finished)
+        self.croc_probe = probe
+        probe.start()
+    
+    def on_croc_probed(self, info):
+        """백그라운드 croc 확인 완료"""
         try:
-            self.croc_utils = CrocUtils(self.config)
-            self.statusBar().showMessage(f"Croc version: {self.croc_utils.get_version()}")
+            self.init_croc(info)
         except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+            self.on_croc_probe_failed(str(e))
+    
+    def on_croc_probe_failed(self, message):
+        """croc를 찾지 못했거나 버전이 맞지 않음"""
+        if self.croc_utils is None:
+            QMessageBox.critical(self, "Error", message)
             self.statusBar().showMessage("Croc not found or error initializing")
+        else:
+            self.statusBar().showMessage(f"Croc check failed: {message}")
+    
+    def on_croc_probe_finished(self):
+        probe, self.croc_probe = self.croc_probe, None
+        if probe is not None:
+            probe.deleteLater()
     
     def init_ui(self):
         # 창 속성 설정
@@ -67,7 +138,7 @@ class MainWindow(QMainWindow):
         self.create_tabs()
         
         # 통합 스타일 적용
-        self.apply_global_style(is_dark=self.config.get_value("theme", "light") == "dark")
+        self.apply_global_style(self.current_theme)
         
         # 서비스 초기화
         self.init_services()
@@ -104,22 +175,27 @@ class MainWindow(QMainWindow):
         self.main_layout.addWidget(header_widget)
     
     def create_tabs(self):
-        """탭 영역 생성"""
+        """탭 영역 생성 (첫 번째 탭 외에는 처음 열 때 생성)"""
         self.tab_widget = QTabWidget()
         self.tab_widget.setDocumentMode(True)
         self.tab_widget.setObjectName("mainTabs")
         
-        # 탭 생성
+        # 탭 생성 - 시작 시 보이는 전송 탭만 바로 만들고 나머지는 자리표시자
         self.send_widget = SendWidget(self.config)
-        self.receive_widget = ReceiveWidget(self.config)
-        self.history_widget = HistoryWidget(self.config)
-        self.settings_widget = SettingsWidget(self.config, self)
+        self.receive_widget = None
+        self.history_widget = None
+        self.settings_widget = None
+        self.tab_builders = {
+            1: self.build_receive_tab,
+            2: self.build_history_tab,
+            3: self.build_settings_tab,
+        }
         
         # 탭 추가
         self.tab_widget.addTab(self.send_widget, "Send")
-        self.tab_widget.addTab(self.receive_widget, "Receive")
-        self.tab_widget.addTab(self.history_widget, "History")
-        self.tab_widget.addTab(self.settings_widget, "Settings")
+        self.tab_widget.addTab(QWidget(), "Receive")
+        self.tab_widget.addTab(QWidget(), "History")
+        self.tab_widget.addTab(QWidget(), "Settings")
         
         # 탭 변경 시그널 연결
         self.tab_widget.currentChanged.connect(self.on_tab_changed)
@@ -127,310 +203,54 @@ class MainWindow(QMainWindow):
         # 메인 레이아웃에 탭 위젯 추가
         self.main_layout.addWidget(self.tab_widget, 1)
     
-    def apply_global_style(self, is_dark=False):
-        """통합 스타일 적용"""
-        # 테마 색상 정의
-        if is_dark:
-            # 다크 테마
-            primary_color = "#7b68ee"
-            primary_light = "#9281f0"  # 그라데이션용 라이트 컬러
-            primary_dark = "#6550e1"   # 그라데이션용 다크 컬러
-            bg_color = "#191919"
-            bg_color_light = "#232323"  # 라이트 배경
-            text_color = "#f0f0f0"
-            secondary_text = "#a0a0a0"
-            border_color = "#333333"
-        else:
-            # 라이트 테마
-            primary_color = "#7b68ee"
-            primary_light = "#9281f0"  # 그라데이션용 라이트 컬러
-            primary_dark = "#6550e1"   # 그라데이션용 다크 컬러
-            bg_color = "#ffffff"
-            bg_color_light = "#f5f5f5"  # 라이트 배경
-            text_color = "#333333"
-            secondary_text = "#666666"
-            border_color = "#e5e5e5"
-        
-        # 통합 스타일시트
-        self.setStyleSheet(f"""
-            /* 전체 앱 기본 스타일 */
-            QMainWindow, QWidget, QTabWidget, QFrame, QLabel, QPushButton, QLineEdit, QTextEdit, QComboBox, QProgressBar, QTableWidget {{
-                background-color: {bg_color};
-                font-family: -apple-system, BlinkMacSystemFont, 'SF Pro', 'Helvetica Neue', Arial, sans-serif;
-                font-size: 13px;
-                color: {text_color};
-                border: none;
-            }}
-            
-            /* 헤더 */
-            #headerWidget {{
-                background-color: {bg_color};
-            }}
-            
-            #appTitle {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {primary_color};
-            }}
-            
-            #versionLabel {{
-                color: {secondary_text};
-                font-size: 12px;
-            }}
-            
-            /* 탭 위젯 */
-            #mainTabs {{
-                background-color: {bg_color};
-            }}
-            
-            /* 탭 바 */
-            QTabBar::tab {{
-                background-color: {bg_color};
-                color: {text_color};
-                padding: 10px 20px;
-                border: none;
-                min-width: 80px;
-                border-top-left-radius: 6px;
-                border-top-right-radius: 6px;
-            }}
-            
-            QTabBar::tab:selected {{
-                color: {primary_color};
-                border-bottom: 2px solid {primary_color};
-                font-weight: bold;
-                background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 {bg_color_light}, stop:1 {bg_color});
-            }}
-            
-            QTabBar::tab:hover:!selected {{
-                color: {primary_color};
-                background-color: {bg_color_light}50;
-            }}
-            
-            /* 탭 콘텐츠 영역 */
-            QTabWidget::pane {{
-                border: none;
-                background-color: {bg_color};
-            }}
-            
-            /* 입력 필드 */
-            QLineEdit, QTextEdit, QPlainTextEdit {{
-                padding: 10px;
-                background-color: {bg_color_light};
-                color: {text_color};
-                selection-background-color: {primary_color};
-                selection-color: white;
-                border: 1px solid {border_color};
-                border-radius: 8px;
-            }}
-            
-            QLineEdit:focus, QTextEdit:focus, QPlainTextEdit:focus {{
-                border: 1px solid {primary_color};
-                background-color: {bg_color};
-            }}
-            
-            /* 버튼 */
-            QPushButton {{
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 {primary_light}, stop:1 {primary_dark});
-                color: white;
-                padding: 10px 18px;
-                border-radius: 10px;
-                font-weight: bold;
-                border: none;
-                min-height: 20px;
-            }}
-            
-            QPushButton:hover {{
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 {primary_light}, stop:0.4 {primary_color}, stop:1 {primary_dark});
-            }}
-            
-            QPushButton:pressed {{
-                background: qlineargradient(x1:0, y1:1, x2:0, y2:0,
-                    stop:0 {primary_light}, stop:0.6 {primary_color}, stop:1 {primary_dark});
-                padding-top: 12px;
-                padding-bottom: 8px;
-            }}
-            
-            QPushButton:disabled {{
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 {secondary_text}, stop:1 {secondary_text}80);
-                color: {bg_color};
-            }}
-            
-            /* 프로그레스바 */
-            QProgressBar {{
-                border: 1px solid {border_color};
-                background-color: {bg_color_light};
-                text-align: center;
-                color: {text_color};
-                border-radius: 8px;
-                height: 20px;
-            }}
-            
-            QProgressBar::chunk {{
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 {primary_dark}, stop:1 {primary_light});
-                border-radius: 6px;
-            }}
-            
-            /* 콤보박스 */
-            QComboBox {{
-                padding: 8px 12px;
-                background-color: {bg_color_light};
-                color: {text_color};
-                border: 1px solid {border_color};
-                border-radius: 8px;
-                selection-background-color: {primary_color};
-                selection-color: white;
-                min-height: 20px;
-            }}
-            
-            QComboBox:focus {{
-                border: 1px solid {primary_color};
-                background-color: {bg_color};
-            }}
-            
-            QComboBox::drop-down {{
-                border: none;
-                width: 20px;
-            }}
-            
-            QComboBox QAbstractItemView {{
-                background-color: {bg_color};
-                color: {text_color};
-                selection-background-color: {primary_color};
-                selection-color: white;
-                border: 1px solid {border_color};
-                border-radius: 8px;
-            }}
-            
-            /* 체크박스 */
-            QCheckBox {{
-                spacing: 8px;
-                background-color: transparent;
-            }}
-            
-            QCheckBox::indicator {{
-                width: 18px;
-                height: 18px;
-                background-color: {bg_color_light};
-                border: 1px solid {border_color};
-                border-radius: 4px;
-            }}
-            
-            QCheckBox::indicator:checked {{
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 {primary_light}, stop:1 {primary_dark});
-                border: none;
-            }}
-            
-            /* 스크롤바 */
-            QScrollBar:vertical {{
-                background: {bg_color};
-                width: 8px;
-                margin: 2px;
-                border-radius: 4px;
-            }}
-            
-            QScrollBar::handle:vertical {{
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                    stop:0 {primary_color}70, stop:1 {primary_light}70);
-                min-height: 30px;
-                border-radius: 4px;
-            }}
-            
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{
-                height: 0px;
-            }}
-            
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {{
-                background: none;
-            }}
-            
-            /* 테이블 위젯 */
-            QTableWidget {{
-                background-color: {bg_color};
-                gridline-color: {border_color};
-                border-radius: 8px;
-                border: 1px solid {border_color};
-            }}
-            
-            QTableWidget::item {{
-                padding: 6px;
-                border-bottom: 1px solid {border_color};
-            }}
-            
-            QTableWidget::item:selected {{
-                background-color: {primary_color}20;
-                color: {text_color};
-                border-radius: 4px;
-            }}
-            
-            QHeaderView::section {{
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 {bg_color_light}, stop:1 {bg_color});
-                color: {secondary_text};
-                padding: 8px;
-                border: none;
-                border-bottom: 1px solid {primary_color}50;
-                font-weight: bold;
-            }}
-            
-            /* 그룹 박스 */
-            QGroupBox {{
-                border: 1px solid {border_color};
-                border-radius: 10px;
-                margin-top: 20px;
-                background-color: {bg_color};
-            }}
-            
-            QGroupBox::title {{
-                subcontrol-origin: margin;
-                subcontrol-position: top left;
-                padding: 0 8px;
-                color: {primary_color};
-                font-weight: bold;
-            }}
-            
-            /* 상태바 */
-            QStatusBar {{
-                background-color: {bg_color};
-                color: {secondary_text};
-            }}
-            
-            /* 내용 패딩 */
-            #mainTabs > QWidget {{
-                padding: 15px;
-            }}
-            
-            /* 섹션 제목 스타일 */
-            #sectionTitle {{
-                font-size: 18px;
-                font-weight: bold;
-                color: {primary_color};
-            }}
-            
-            /* 설정 라벨 */
-            #settingLabel {{
-                font-size: 14px;
-                font-weight: bold;
-                color: {text_color};
-            }}
-            
-            /* 설정 섹션 */
-            #settingsSection {{
-                border: 1px solid {border_color};
-                border-radius: 10px;
-                background-color: {bg_color};
-            }}
-        """)
+    def ensure_tab(self, index):
+        """자리표시자 탭을 실제 위젯으로 교체"""
+        builder = self.tab_builders.pop(index, None)
+        if builder is None:
+            return
+        
+        widget = builder()
+        title = self.tab_widget.tabText(index)
+        current = self.tab_widget.currentIndex()
+        placeholder = self.tab_widget.widget(index)
+        
+        self.tab_widget.blockSignals(True)
+        self.tab_widget.removeTab(index)
+        self.tab_widget.insertTab(index, widget, title)
+        self.tab_widget.setCurrentIndex(current)
+        self.tab_widget.blockSignals(False)
+        placeholder.deleteLater()
+    
+    def build_receive_tab(self):
+        from src.ui.receive_widget import ReceiveWidget
+        self.receive_widget = ReceiveWidget(self.config)
+        self.receive_widget.receive_requested.connect(self.on_receive_requested)
+        return self.receive_widget
+    
+    def build_history_tab(self):
+        from src.ui.history_widget import HistoryWidget
+        self.history_widget = HistoryWidget(self.config)
+        return self.history_widget
+    
+    def build_settings_tab(self):
+        from src.ui.settings_widget import SettingsWidget
+        self.settings_widget = SettingsWidget(self.config, self)
+        self.settings_widget.theme_changed.connect(self.on_theme_changed)
+        return self.settings_widget
+    
+    def apply_global_style(self, theme="light"):
+        """통합 스타일 적용 (테마별로 한 번만 만들어 둔 스타일시트 사용)"""
+        if theme == self.applied_theme:
+            return
+        self.setStyleSheet(self.theme_engine.stylesheet(theme))
+        self.applied_theme = theme
     
     def on_tab_changed(self, index):
         """탭 변경 처리"""
-        if index == 2:  # 기록 탭
-            self.history_widget.refresh_history()
+        if index in self.tab_builders:
+            # 처음 여는 탭은 생성 시 최신 기록을 불러옴
+            # (이후 기록 탭은 저장소 변경 알림으로 갱신되므로 다시 읽지 않음)
+            self.ensure_tab(index)
     
     def center_window(self):
         """화면 중앙에 창 배치"""
@@ -442,47 +262,64 @@ class MainWindow(QMainWindow):
     def init_services(self):
         """서비스 초기화"""
         # 위젯 시그널 연결
+        # (수신/설정 탭 시그널은 탭 생성 시 연결)
         self.send_widget.send_requested.connect(self.on_send_requested)
-        self.receive_widget.receive_requested.connect(self.on_receive_requested)
-        
-        # 테마 변경 시그널 연결
-        self.settings_widget.theme_changed.connect(self.on_theme_changed)
-        
-        # 버전 정보 설정
-        if hasattr(self, 'croc_utils') and self.croc_utils:
-            version = self.croc_utils.get_version()
-            if version and hasattr(self, 'version_label'):
-                self.version_label.setText(f"Croc v{version}")
         
         # 상태바 메시지
         self.statusBar().showMessage("Sirodrop - Secure File Transfer")
     
     def on_theme_changed(self, theme):
         """테마 변경 처리"""
-        # 통합 스타일 업데이트
-        self.apply_global_style(is_dark=theme == "dark")
+        self.current_theme = theme
         
-        # 위젯 테마 업데이트
-        self.send_widget.update_theme(theme)
-        self.receive_widget.update_theme(theme)
-        self.history_widget.update_theme(theme)
+        # 통합 스타일 업데이트 (하위 위젯과 아직 만들지 않은 탭도 이 스타일을 따름)
+        self.apply_global_style(theme)
         
         # 상태바 메시지
         self.statusBar().showMessage(f"Theme changed to {theme} mode", 3000)
-        
-        # qdarktheme 설정 제거 (자체 테마 사용)
-        QApplication.instance().setStyleSheet("")
     
     def on_send_requested(self, code, options):
         """전송 요청 처리"""
-        pass
+        if not self.transfer_manager:
+            if self.croc_probe is not None:
+                self.send_widget.status_label.setText("Croc 확인 중입니다. 잠시 후 다시 시도해주세요")
+            else:
+                self.send_widget.status_label.setText("Croc을 찾을 수 없어 전송할 수 없습니다")
+            return
+        
+        transfer_id = self.transfer_manager.start_send(code, options)
+        self.send_widget.track_transfer(transfer_id)
     
     def on_receive_requested(self, code, options):
         """수신 요청 처리"""
-        pass
+        if not self.transfer_manager:
+            if self.croc_probe is not None:
+                self.receive_widget.status_label.setText("Croc 확인 중입니다. 잠시 후 다시 시도해주세요")
+            else:
+                self.receive_widget.status_label.setText("Croc을 찾을 수 없어 수신할 수 없습니다")
+            return
+        
+        transfer_id = self.transfer_manager.start_receive(code, options)
+        self.receive_widget.track_transfer(transfer_id)
+    
+    def on_transfer_event(self, transfer_id, event):
+        """백그라운드 전송 이벤트를 해당 위젯으로 전달"""
+        if event.get("direction") == "send":
+            self.send_widget.handle_transfer_event(event)
+        elif self.receive_widget is not None:
+            self.receive_widget.handle_transfer_event(event)
     
     def closeEvent(self, event):
         """창 닫기 이벤트 처리"""
+        # 폴더 감시와 진행 중인 전송 정리
+        self.send_widget.stop_watching()
+        if self.transfer_manager:
+            self.transfer_manager.shutdown()
+        if self.croc_probe is not None:
+            self.croc_probe.wait()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        
         # 창 위치 및 크기 저장
         self.config.set_value("window_geometry", [
             self.x(), self.y(), self.width(), self.height()
@@ -492,7 +329,10 @@ class MainWindow(QMainWindow):
         event.accept()
     
     def create_app_icon(self):
-        """앱 아이콘 생성"""
+        """앱 아이콘 생성 (한 번 그린 뒤 재사용)"""
+        if getattr(self, "_app_icon", None) is not None:
+            return self._app_icon
+        
         icon_size = 256
         pixmap = QPixmap(icon_size, icon_size)
         pixmap.fill(Qt.GlobalColor.transparent)
@@ -521,4 +361,5 @@ class MainWindow(QMainWindow):
         painter.drawPath(arrow_path)
         painter.end()
         
+        self._app_icon = pixmap
         return pixmap 
\ No newline at end of file
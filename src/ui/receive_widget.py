@@ -9,6 +9,9 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, pyqtSignal, QSize, QTimer, QPoint, QPropertyAnimation, QEasingCurve
 from PyQt6.QtGui import QIcon, QDragEnterEvent, QDropEvent, QColor
 
+from src.ui.sparkline import Sparkline
+from src.utils.units import format_duration, format_rate
+
 class ReceiveWidget(QWidget):
     # Define signals
     receive_requested = pyqtSignal(str, object)
@@ -17,8 +20,8 @@ class ReceiveWidget(QWidget):
         super().__init__()
         self.config = config
         self.animations = {}  # 애니메이션 객체 저장
+        self.active_transfer_id = None
         self.init_ui()
-        self.update_theme(self.config.get_value("theme", "light"))
     
     def init_ui(self):
         # Main layout
@@ -177,7 +180,11 @@ class ReceiveWidget(QWidget):
         self.status_label.setStyleSheet("color: #666666;")
         
         progress_layout.addWidget(self.file_info_label)
+        # 전송 속도 스파크라인
+        self.sparkline = Sparkline()
+        
         progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.sparkline)
         progress_layout.addWidget(self.status_label)
         
         # 전체 레이아웃
@@ -189,27 +196,6 @@ class ReceiveWidget(QWidget):
         
         self.main_layout.addLayout(section_layout)
     
-    def update_theme(self, theme):
-        """테마에 따라 위젯 스타일 업데이트"""
-        is_dark = theme == "dark"
-        
-        # 테마 색상 정의
-        if is_dark:
-            # 다크 테마
-            primary_color = "#7b68ee"
-            text_color = "#f0f0f0"
-            secondary_text = "#a0a0a0"
-        else:
-            # 라이트 테마
-            primary_color = "#7b68ee"
-            text_color = "#333333"
-            secondary_text = "#666666"
-        
-        # 섹션 제목 스타일
-        for widget in self.findChildren(QLabel):
-            if widget.objectName() == "sectionTitle":
-                widget.setStyleSheet(f"font-size: 18px; font-weight: bold; color: {primary_color};")
-    
     def browse_save_location(self):
         """저장 경로 선택"""
         dir_path = QFileDialog.getExistingDirectory(
@@ -250,37 +236,84 @@ class ReceiveWidget(QWidget):
             'save_path': save_path
         }
         
-        # 수신 요청 신호 발생
-        self.receive_requested.emit(code, options)
-        
         # UI 업데이트
+        self.progress_bar.setValue(0)
         self.file_info_label.setText("연결 중...")
         self.status_label.setText("발신자를 찾는 중...")
         
-        # 실제 구현에서는 백그라운드 작업으로 처리하고 진행 상황을 업데이트함
-        # 여기서는 데모용으로 타이머 사용
-        QTimer.singleShot(1500, self.simulate_connection)
+        # 수신 요청 신호 발생 (실제 수신은 백그라운드 작업자가 처리)
+        self.receive_requested.emit(code, options)
     
-    def simulate_connection(self):
-        """연결 시뮬레이션 (데모용)"""
-        self.file_info_label.setText("파일: example_document.pdf (2.5 MB)")
-        self.status_label.setText("연결됨, 수신 시작 중...")
-        QTimer.singleShot(1000, self.simulate_progress)
+    def track_transfer(self, transfer_id):
+        """진행 상태를 표시할 수신 지정"""
+        self.active_transfer_id = transfer_id
+        self.sparkline.clear()
     
-    def simulate_progress(self):
-        """진행 상태 시뮬레이션 (데모용)"""
-        current = self.progress_bar.value()
-        if current < 100:
-            self.progress_bar.setValue(current + 10)
-            self.status_label.setText(f"파일 수신 중... {current + 10}%")
-            QTimer.singleShot(500, self.simulate_progress)
-        else:
-            self.status_label.setText("수신 완료!")
+    def handle_transfer_event(self, event):
+        """백그라운드 수신 이벤트로 진행 상태 업데이트"""
+        if event.get("transfer_id") != self.active_transfer_id:
+            return
+        
+        status = event.get("status")
+        if status == "connecting":
+            self.status_label.setText("연결됨, 수신 시작 중...")
+        elif status == "receiving":
+            file_name = event.get("file")
+            if file_name:
+                self.file_info_label.setText(f"파일: {file_name}")
+            progress = event.get("progress")
+            if progress is not None:
+                self.progress_bar.setValue(int(progress))
+                self.sparkline.add_sample(progress, event.get("rate"))
+                self.status_label.setText(f"파일 수신 중... {progress:.1f}%" + self.rate_summary(event))
+        elif status == "completed":
+            self.progress_bar.setValue(100)
+            self.status_label.setText("수신 완료!" + self.retry_summary(event) + self.manifest_summary(event))
             self.file_info_label.setText("파일이 성공적으로 저장되었습니다")
+            self.active_transfer_id = None
             QTimer.singleShot(2000, self.reset_progress)
+        elif status == "retrying":
+            self.status_label.setText(
+                f"연결 끊김 ({event.get('reason')}), {event.get('delay', 0):.0f}초 후 재시도 "
+                f"({event.get('attempt')}/{event.get('max_retries')})..."
+            )
+        elif status == "error":
+            self.status_label.setText(f"수신 실패: {event.get('message', '알 수 없는 오류')}")
+            self.active_transfer_id = None
+    
+    def rate_summary(self, event):
+        """평활한 속도와 남은 시간"""
+        rate = event.get("rate_avg")
+        if not rate:
+            return ""
+        eta = event.get("eta")
+        if eta is None:
+            return f" ({format_rate(rate)})"
+        return f" ({format_rate(rate)}, 남은 시간 {format_duration(eta)})"
+    
+    def manifest_summary(self, event):
+        """발신자가 제외한 (이미 받은) 파일 확인 결과"""
+        missing = event.get("manifest_missing")
+        if missing is None:
+            return ""
+        if not missing:
+            return f" · 이전에 받은 파일 {event.get('manifest_present', 0):,}개 확인됨"
+        names = ", ".join(missing[:3]) + (" 외" if len(missing) > 3 else "")
+        return f" · 이전에 받은 파일 중 {len(missing):,}개가 없거나 다릅니다: {names}"
+    
+    def retry_summary(self, event):
+        """재시도 횟수와 손실 시간 요약"""
+        retries = event.get("retries", 0)
+        if not retries:
+            return ""
+        return f" (재시도 {retries}회, 손실 시간 {event.get('time_lost', 0):.0f}초)"
     
     def reset_progress(self):
         """진행 상태 초기화"""
+        # 새 수신이 시작된 경우 초기화하지 않음
+        if self.active_transfer_id is not None:
+            return
         self.progress_bar.setValue(0)
+        self.sparkline.clear()
         self.status_label.setText("준비됨")
-        self.file_info_label.setText("파일 정보가 여기에 표시됩니다") 
\ No newline at end of file
+        self.file_info_label.setText("파일 정보가 여기에 표시됩니다")
\ No newline at end of file
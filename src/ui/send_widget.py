@@ -6,7 +6,7 @@ from PyQt6.QtWidgets import (
     QPushButton, QFileDialog, QProgressBar, QFrame,
     QApplication, QToolButton, QSizePolicy, QSpacerItem,
     QCheckBox, QGridLayout, QMessageBox, QListWidget,
-    QListWidgetItem, QAbstractItemView, QScrollArea
+    QListWidgetItem, QAbstractItemView, QScrollArea, QSpinBox, QComboBox
 )
 from PyQt6.QtCore import Qt, pyqtSignal, QSize, QMimeData, QTimer, QRect, QPoint
 from PyQt6.QtGui import (
@@ -14,8 +14,17 @@ from PyQt6.QtGui import (
     QPixmap, QPainterPath, QFont, QFontMetrics
 )
 
+from src.services.manifest_scanner import ManifestScanner
+from src.services.folder_watch_service import FolderWatchThread
+from src.utils.units import format_duration, format_rate, format_size
+from src.ui.theme import refresh_style
+from src.ui.sparkline import Sparkline
+
 class FileListWidget(QListWidget):
     """Custom ListWidget with drag and drop support for files"""
+    # 드롭으로 목록이 바뀌었을 때
+    files_dropped = pyqtSignal()
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setAcceptDrops(True)
@@ -23,15 +32,8 @@ class FileListWidget(QListWidget):
         self.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.setAlternatingRowColors(True)
         self.setMinimumHeight(150)
-        # Add visual cue for drag and drop area
-        self.setStyleSheet("""
-            QListWidget {
-                border: 2px dashed #7b68ee;
-                border-radius: 8px;
-                background-color: rgba(123, 104, 238, 0.05);
-                padding: 5px;
-            }
-        """)
+        # 드롭 영역 스타일은 테마 스타일시트가 담당하고, 드래그 중에는 dragActive 속성만 바꿈
+        self.setProperty("dragActive", False)
         # 드롭 영역 안내 텍스트 표시 여부
         self.isEmpty = True
         # 폴더 아이콘 생성
@@ -122,31 +124,24 @@ class FileListWidget(QListWidget):
         painter.end()
         return pixmap
         
+    def set_drag_active(self, active):
+        """드래그 강조 표시 전환 (스타일시트는 그대로 두고 속성만 변경)"""
+        if self.property("dragActive") == active:
+            return
+        self.setProperty("dragActive", active)
+        refresh_style(self)
+    
     def dragEnterEvent(self, event: QDragEnterEvent):
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
-            # Change border style during drag
-            self.setStyleSheet("""
-                QListWidget {
-                    border: 2px dashed #6550e1;
-                    border-radius: 8px;
-                    background-color: rgba(123, 104, 238, 0.1);
-                    padding: 5px;
-                }
-            """)
+            # Highlight the drop area during drag
+            self.set_drag_active(True)
         else:
             super().dragEnterEvent(event)
     
     def dragLeaveEvent(self, event):
         # Reset style when drag leaves
-        self.setStyleSheet("""
-            QListWidget {
-                border: 2px dashed #7b68ee;
-                border-radius: 8px;
-                background-color: rgba(123, 104, 238, 0.05);
-                padding: 5px;
-            }
-        """)
+        self.set_drag_active(False)
         super().dragLeaveEvent(event)
     
     def dropEvent(self, event: QDropEvent):
@@ -167,15 +162,8 @@ class FileListWidget(QListWidget):
             # 아이템이 추가되면 isEmpty 상태 업데이트
             self.isEmpty = self.count() == 0
             # Reset style after drop
-            self.setStyleSheet("""
-                QListWidget {
-                    border: 2px dashed #7b68ee;
-                    border-radius: 8px;
-                    background-color: rgba(123, 104, 238, 0.05);
-                    padding: 5px;
-                }
-            """)
-            self.update()
+            self.set_drag_active(False)
+            self.files_dropped.emit()
         else:
             super().dropEvent(event)
     
@@ -269,8 +257,16 @@ class SendWidget(QWidget):
     def __init__(self, config):
         super().__init__()
         self.config = config
+        self.active_transfer_id = None
+        self.scanner = None
+        # 선택된 항목의 압축 효과 추정 (스캔이 끝나기 전에는 None)
+        self.compress_estimate = None
+        # 폴더 감시 스레드와 전송을 기다리는 감시 폴더 항목
+        self.watcher = None
+        self.watch_queue = []
+        # 진행 중인 전송의 중복 제외 결과 (완료 메시지에 표시)
+        self.dedup_event = None
         self.init_ui()
-        self.update_theme(self.config.get_value("theme", "light"))
     
     def init_ui(self):
         # Main layout
@@ -358,6 +354,7 @@ class SendWidget(QWidget):
         # 파일 목록 위젯
         self.file_list = FileListWidget()
         self.file_list.setMinimumHeight(150)
+        self.file_list.files_dropped.connect(self.update_file_info)
         
         # 파일 목록 버튼
         list_button_layout = QHBoxLayout()
@@ -446,12 +443,96 @@ class SendWidget(QWidget):
         self.encrypt_check = QCheckBox("파일 암호화 사용")
         self.encrypt_check.setChecked(True)
         
-        # 옵션 2: 압축
-        self.zip_check = QCheckBox("ZIP 압축 적용")
-        self.zip_check.setChecked(True)
+        # 옵션 2: 하나로 묶어 보내기 (임시 파일 없이 croc 표준 입력으로 스트리밍)
+        self.zip_check = QCheckBox("하나의 tar 묶음으로 전송")
+        self.zip_check.setToolTip(
+            "선택한 파일과 폴더를 tar로 묶으면서 바로 croc에 넘깁니다. 받는 쪽에는 tar 파일 하나로 저장됩니다"
+        )
+        self.zip_check.setChecked(False)
+        
+        # 옵션 3: croc 압축 (자동: 표본을 압축해 보고 효과가 있을 때만)
+        compress_layout = QHBoxLayout()
+        compress_layout.setContentsMargins(0, 0, 0, 0)
+        compress_layout.setSpacing(8)
+        
+        compress_label = QLabel("압축")
+        self.compress_combo = QComboBox()
+        self.compress_combo.addItem("자동", "auto")
+        self.compress_combo.addItem("항상", True)
+        self.compress_combo.addItem("안 함", False)
+        self.compress_combo.setToolTip(
+            "자동: 큰 파일 몇 개를 표본으로 압축해 보고, 이미 압축된 파일(사진, 동영상, 압축 파일 등)이 "
+            "대부분이면 압축하지 않고 보냅니다 (--no-compress)"
+        )
+        self.compress_combo.currentIndexChanged.connect(self.update_compress_label)
+        self.compress_estimate_label = QLabel("")
+        
+        compress_layout.addWidget(compress_label)
+        compress_layout.addWidget(self.compress_combo)
+        compress_layout.addWidget(self.compress_estimate_label, 1)
+        
+        # 옵션 4: 병렬 세션 (크기별로 나눠 여러 croc 세션으로 동시 전송)
+        shards_layout = QHBoxLayout()
+        shards_layout.setContentsMargins(0, 0, 0, 0)
+        shards_layout.setSpacing(8)
+        
+        shards_label = QLabel("병렬 세션 수")
+        self.shards_spin = QSpinBox()
+        self.shards_spin.setRange(1, 8)
+        self.shards_spin.setValue(self.config.get_value("send_shards", 1))
+        self.shards_spin.setToolTip("2 이상이면 파일을 크기별로 나눠 각각 다른 코드로 동시에 전송합니다")
+        
+        shards_layout.addWidget(shards_label)
+        shards_layout.addWidget(self.shards_spin)
+        shards_layout.addStretch(1)
+        
+        # 옵션 5: 폴더 감시 (폴더에 들어온 항목이 다 쓰이면 모아서 자동 전송)
+        watch_layout = QHBoxLayout()
+        watch_layout.setContentsMargins(0, 0, 0, 0)
+        watch_layout.setSpacing(8)
+        
+        self.watch_check = QCheckBox("폴더 감시 자동 전송")
+        self.watch_check.setToolTip(
+            "폴더에 새로 들어온 파일이 더 이상 바뀌지 않으면 잠시 모아 한 번에 전송합니다 "
+            "(숨김 파일과 .part/.tmp 파일은 제외)"
+        )
+        self.watch_check.toggled.connect(self.toggle_watch)
+        self.watch_path_input = QLineEdit(self.config.get_value("watch_folder", ""))
+        self.watch_path_input.setPlaceholderText("감시할 폴더")
+        watch_browse_button = QPushButton("폴더 선택")
+        watch_browse_button.clicked.connect(self.browse_watch_folder)
+        
+        watch_layout.addWidget(self.watch_check)
+        watch_layout.addWidget(self.watch_path_input, 1)
+        watch_layout.addWidget(watch_browse_button)
+        
+        # 옵션 6: 받는 사람 (이름을 적으면 보낸 파일을 기억해 다음에 같은 내용은 제외할 수 있음)
+        recipient_layout = QHBoxLayout()
+        recipient_layout.setContentsMargins(0, 0, 0, 0)
+        recipient_layout.setSpacing(8)
+        
+        recipient_label = QLabel("받는 사람")
+        self.recipient_input = QLineEdit(self.config.get_value("last_recipient", ""))
+        self.recipient_input.setPlaceholderText("이름 (선택사항)")
+        self.recipient_input.textChanged.connect(self.update_dedup_check)
+        self.dedup_check = QCheckBox("이미 보낸 파일 제외")
+        self.dedup_check.setToolTip(
+            "이 사람에게 전에 보낸 것과 내용이 같은 파일은 보내지 않고, "
+            "받는 쪽에서 확인할 수 있도록 파일 목록(체크섬)만 함께 보냅니다"
+        )
+        self.dedup_check.setChecked(self.config.get_value("send_dedup", False))
+        
+        recipient_layout.addWidget(recipient_label)
+        recipient_layout.addWidget(self.recipient_input, 1)
+        recipient_layout.addWidget(self.dedup_check)
+        self.update_dedup_check()
         
         options_layout.addWidget(self.encrypt_check)
         options_layout.addWidget(self.zip_check)
+        options_layout.addLayout(compress_layout)
+        options_layout.addLayout(shards_layout)
+        options_layout.addLayout(watch_layout)
+        options_layout.addLayout(recipient_layout)
         
         # 전송 버튼
         send_button_layout = QHBoxLayout()
@@ -523,9 +604,18 @@ class SendWidget(QWidget):
         self.status_label = QLabel("준비됨")
         self.status_label.setStyleSheet("color: #666666;")
         
+        # 체크섬 계산 상태 (전송 진행률과 따로 표시)
+        self.hash_label = QLabel("")
+        self.hash_label.setStyleSheet("color: #666666;")
+        
         progress_layout.addWidget(self.file_info_label)
+        # 전송 속도 스파크라인
+        self.sparkline = Sparkline()
+        
         progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.sparkline)
         progress_layout.addWidget(self.status_label)
+        progress_layout.addWidget(self.hash_label)
         
         # 전체 레이아웃
         section_layout = QVBoxLayout()
@@ -606,61 +696,6 @@ class SendWidget(QWidget):
         painter.end()
         return QIcon(pixmap)
     
-    def update_theme(self, theme):
-        """테마에 따라 위젯 스타일 업데이트"""
-        is_dark = theme == "dark"
-        
-        # 테마 색상 정의
-        if is_dark:
-            # 다크 테마
-            primary_color = "#7b68ee"
-            bg_color = "#191919"
-            text_color = "#f0f0f0"
-            secondary_text = "#a0a0a0"
-            list_bg = "#191919"
-            list_alt_bg = "#202020"
-            drop_area_bg = "rgba(123, 104, 238, 0.1)"
-        else:
-            # 라이트 테마
-            primary_color = "#7b68ee"
-            bg_color = "#ffffff"
-            text_color = "#333333"
-            secondary_text = "#666666"
-            list_bg = "#ffffff"
-            list_alt_bg = "#f5f5f5"
-            drop_area_bg = "rgba(123, 104, 238, 0.05)"
-        
-        # 섹션 제목 스타일
-        for widget in self.findChildren(QLabel):
-            if widget.objectName() == "sectionTitle":
-                widget.setStyleSheet(f"font-size: 18px; font-weight: bold; color: {primary_color};")
-        
-        # 파일 목록 스타일 - 드래그 앤 드롭 시각적 표시 강화
-        self.file_list.setStyleSheet(f"""
-            QListWidget {{
-                background-color: {drop_area_bg};
-                color: {text_color};
-                border: 2px dashed {primary_color};
-                border-radius: 8px;
-                padding: 5px;
-            }}
-            QListWidget::item {{
-                padding: 8px;
-                border-bottom: 1px solid {secondary_text}30;
-                border-radius: 4px;
-            }}
-            QListWidget::item:selected {{
-                background-color: {primary_color}20;
-                color: {text_color};
-            }}
-            QListWidget::item:alternate {{
-                background-color: {list_alt_bg};
-            }}
-        """)
-        
-        # 버튼 스타일은 메인 윈도우의 글로벌 스타일로 처리됨
-        # 진행 바 스타일은 메인 윈도우의 글로벌 스타일로 처리됨
-    
     def browse_file(self):
         """파일 브라우저 열기"""
         file_path, _ = QFileDialog.getOpenFileName(
@@ -703,13 +738,86 @@ class SendWidget(QWidget):
     def update_file_info(self):
         """파일 정보 업데이트"""
         count = self.file_list.count()
+        self.compress_estimate = None
+        self.update_compress_label()
         if count > 0:
-            self.file_info_label.setText(f"선택된 파일: {count}개")
+            self.file_info_label.setText(f"선택된 항목: {count}개 · 크기 계산 중...")
+            self.start_manifest_scan()
         else:
+            self.stop_manifest_scan()
             self.file_info_label.setText("파일을 선택해주세요")
             self.file_list.isEmpty = True
             self.file_list.update()
     
+    def start_manifest_scan(self):
+        """선택된 파일과 폴더의 크기를 백그라운드에서 계산"""
+        self.stop_manifest_scan()
+        paths = [self.file_list.item(i).text() for i in range(self.file_list.count())]
+        scanner = ManifestScanner(paths, parent=self)
+        scanner.progress.connect(lambda totals, s=scanner: self.show_manifest(s, totals))
+        scanner.scanned.connect(lambda totals, s=scanner: self.show_manifest(s, totals))
+        scanner.estimated.connect(lambda estimate, s=scanner: self.show_compress_estimate(s, estimate))
+        scanner.finished.connect(scanner.deleteLater)
+        self.scanner = scanner
+        scanner.start()
+    
+    def stop_manifest_scan(self):
+        """진행 중인 크기 계산 취소"""
+        if self.scanner is not None:
+            self.scanner.cancel()
+            self.scanner = None
+    
+    def show_manifest(self, scanner, totals):
+        """스캔 결과(누적 합계) 표시"""
+        # 취소된 이전 스캔의 결과는 무시
+        if scanner is not self.scanner:
+            return
+        
+        text = (
+            f"선택된 항목: {self.file_list.count()}개 · "
+            f"파일 {totals.files:,}개 · {format_size(totals.bytes)}"
+        )
+        if totals.largest_path:
+            text += f" (가장 큰 파일: {os.path.basename(totals.largest_path)}, {format_size(totals.largest_size)})"
+        if not totals.complete:
+            text += " · 계산 중..."
+        self.file_info_label.setText(text)
+    
+    def show_compress_estimate(self, scanner, estimate):
+        """압축 효과 추정 결과 저장 및 표시"""
+        if scanner is not self.scanner:
+            return
+        self.compress_estimate = estimate
+        self.update_compress_label()
+    
+    def update_compress_label(self):
+        """압축 설정과 추정 결과로 압축 여부와 예상 절약량 표시"""
+        estimate = self.compress_estimate
+        if self.file_list.count() == 0:
+            self.compress_estimate_label.setText("")
+        elif estimate is None:
+            self.compress_estimate_label.setText("압축 효과 분석 중...")
+        else:
+            self.compress_estimate_label.setText(
+                self.compress_summary(self.compress_combo.currentData(), estimate.compress,
+                                      estimate.ratio, estimate.saved_bytes)
+            )
+    
+    def compress_summary(self, mode, compress, ratio, saved):
+        """압축 여부와 예상 절약량 문구 (예: 예상 절약 35% (≈1.2 GB) → 압축)"""
+        saving = f"예상 절약 {(1 - ratio) * 100:.0f}% (≈{format_size(saved)})"
+        if mode is True:
+            return f"{saving} → 항상 압축"
+        if mode is False:
+            return f"{saving} → 압축 안 함"
+        if compress:
+            return f"{saving} → 압축"
+        return f"{saving} → 이미 압축된 데이터가 대부분, 압축 안 함"
+    
+    def update_dedup_check(self):
+        """중복 제외는 받는 사람이 있을 때만 가능"""
+        self.dedup_check.setEnabled(bool(self.recipient_input.text().strip()))
+    
     def generate_code(self):
         """코드 생성"""
         # 실제로는 서비스에서 코드 생성
@@ -725,40 +833,200 @@ class SendWidget(QWidget):
             QMessageBox.warning(self, "경고", "전송할 파일을 추가해주세요.")
             return
         
+        self.request_send([self.file_list.item(i).text() for i in range(count)], self.compress_estimate)
+    
+    def request_send(self, files, estimate=None):
+        """주어진 파일과 폴더를 현재 옵션으로 전송 요청
+        
+        압축이 자동이면 이미 분석한 결과(estimate)로 정하고, 결과가 없으면 전송 작업이 직접 분석
+        """
         code = self.code_input.text().strip()
         if not code:
             self.generate_code()
             code = self.code_input.text()
         
+        recipient = self.recipient_input.text().strip()
+        self.config.set_value("last_recipient", recipient)
+        self.config.set_value("send_dedup", self.dedup_check.isChecked())
+        
         # 전송 옵션 설정
         options = {
             'encrypt': self.encrypt_check.isChecked(),
             'zip': self.zip_check.isChecked(),
-            'files': [self.file_list.item(i).text() for i in range(self.file_list.count())]
+            'compress': self.compress_combo.currentData(),
+            'shards': self.shards_spin.value(),
+            'recipient': recipient or None,
+            'dedup': bool(recipient) and self.dedup_check.isChecked(),
+            'files': list(files)
         }
-        
-        # 전송 요청 신호 발생
-        self.send_requested.emit(code, options)
+        if options['compress'] == "auto" and estimate is not None:
+            options['compress'] = estimate.compress
         
         # UI 업데이트
+        self.progress_bar.setValue(0)
         self.status_label.setText("전송 준비 중...")
         
-        # 실제 구현에서는 백그라운드 작업으로 처리하고 진행 상황을 업데이트함
-        # 여기서는 데모용으로 타이머 사용
-        QTimer.singleShot(1000, self.simulate_progress)
-    
-    def simulate_progress(self):
-        """전송 진행 상태 시뮬레이션 (데모용)"""
-        current = self.progress_bar.value()
-        if current < 100:
-            self.progress_bar.setValue(current + 10)
-            self.status_label.setText(f"전송 중... {current + 10}%")
-            QTimer.singleShot(500, self.simulate_progress)
-        else:
-            self.status_label.setText("전송 완료!")
+        # 전송 요청 신호 발생 (실제 전송은 백그라운드 작업자가 처리)
+        self.send_requested.emit(code, options)
+    
+    def browse_watch_folder(self):
+        """감시할 폴더 선택"""
+        folder = QFileDialog.getExistingDirectory(
+            self, "감시할 폴더 선택", self.watch_path_input.text() or str(Path.home())
+        )
+        if folder:
+            self.watch_path_input.setText(folder)
+    
+    def toggle_watch(self, enabled):
+        """폴더 감시 시작/중지"""
+        self.stop_watching()
+        if not enabled:
+            return
+        
+        folder = self.watch_path_input.text().strip()
+        if not os.path.isdir(folder):
+            QMessageBox.warning(self, "경고", "감시할 폴더를 선택해주세요.")
+            self.watch_check.setChecked(False)
+            return
+        
+        self.config.set_value("watch_folder", folder)
+        self.watch_path_input.setEnabled(False)
+        self.watcher = FolderWatchThread(folder, parent=self)
+        self.watcher.batch_ready.connect(self.queue_watch_batch)
+        self.watcher.failed.connect(self.watch_failed)
+        self.watcher.start()
+        self.status_label.setText(f"폴더 감시 중: {folder}")
+    
+    def stop_watching(self):
+        """폴더 감시 중지 (창을 닫을 때도 호출)"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+        self.watch_queue = []
+        self.watch_path_input.setEnabled(True)
+    
+    def watch_failed(self, message):
+        """감시 폴더가 사라지는 등 감시를 계속할 수 없음"""
+        self.watch_check.setChecked(False)
+        self.status_label.setText(f"폴더 감시 중단: {message}")
+    
+    def queue_watch_batch(self, paths):
+        """감시 폴더에서 다 쓰인 항목 - 진행 중인 전송이 끝나면 모아서 전송"""
+        for path in paths:
+            if path not in self.watch_queue:
+                self.watch_queue.append(path)
+        if self.active_transfer_id is None:
+            self.send_watch_queue()
+    
+    def send_watch_queue(self):
+        """기다리던 감시 폴더 항목을 한 번의 전송으로 보냄"""
+        if self.watcher is None or not self.watch_queue or self.active_transfer_id is not None:
+            return
+        files, self.watch_queue = self.watch_queue, []
+        self.request_send(files)
+    
+    def track_transfer(self, transfer_id):
+        """진행 상태를 표시할 전송 지정"""
+        self.active_transfer_id = transfer_id
+        self.sparkline.clear()
+        self.hash_label.setText("")
+        self.dedup_event = None
+    
+    def handle_transfer_event(self, event):
+        """백그라운드 전송 이벤트로 진행 상태 업데이트"""
+        if event.get("transfer_id") != self.active_transfer_id:
+            return
+        
+        status = event.get("status")
+        if status == "waiting":
+            codes = event.get("codes") or [event.get("code")]
+            self.status_label.setText(f"코드: {', '.join(codes)} - 수신자 연결 대기 중...")
+        elif status == "connected":
+            self.status_label.setText("연결됨, 전송 시작 중...")
+        elif status == "analyzed":
+            self.status_label.setText(
+                "압축 효과 분석 완료: "
+                + self.compress_summary("auto", event.get("compress"), event.get("compress_ratio", 1.0),
+                                        event.get("compress_saving", 0))
+            )
+        elif status == "deduplicated":
+            self.dedup_event = event
+            self.status_label.setText(self.dedup_summary(event))
+        elif status == "hashing":
+            self.hash_label.setText(self.hash_summary(event))
+        elif status == "archiving":
+            self.status_label.setText(
+                f"묶는 중... {format_size(event.get('archived', 0))} / {format_size(event.get('archive_size', 0))}"
+            )
+        elif status == "transferring":
+            progress = event.get("progress")
+            if progress is not None:
+                self.progress_bar.setValue(int(progress))
+                self.sparkline.add_sample(progress, event.get("rate"))
+                self.status_label.setText(f"전송 중... {progress:.1f}%" + self.rate_summary(event))
+        elif status == "completed":
+            self.progress_bar.setValue(100)
+            text = "전송 완료!" + self.retry_summary(event)
+            if self.dedup_event is not None:
+                text += f" · {self.dedup_summary(self.dedup_event)}"
+            self.status_label.setText(text)
+            self.active_transfer_id = None
             QTimer.singleShot(2000, self.reset_progress)
+            QTimer.singleShot(0, self.send_watch_queue)
+        elif status == "retrying":
+            self.status_label.setText(
+                f"연결 끊김 ({event.get('reason')}), {event.get('delay', 0):.0f}초 후 재시도 "
+                f"({event.get('attempt')}/{event.get('max_retries')})..."
+            )
+        elif status == "error":
+            self.status_label.setText(f"전송 실패: {event.get('message', '알 수 없는 오류')}")
+            self.active_transfer_id = None
+            QTimer.singleShot(0, self.send_watch_queue)
+    
+    def dedup_summary(self, event):
+        """중복 제외 결과"""
+        if not event.get("skipped_files"):
+            return f"{event.get('recipient')}에게 보낸 적 없는 파일 {event.get('sent_files', 0):,}개 전송"
+        return (
+            f"이미 보낸 파일 {event['skipped_files']:,}개 제외 "
+            f"({format_size(event.get('skipped_bytes', 0))} 절약), {event.get('sent_files', 0):,}개 전송"
+        )
+    
+    def hash_summary(self, event):
+        """체크섬 계산 진행 상태"""
+        text = (
+            f"체크섬: 파일 {event.get('hashed_files', 0):,} / {event.get('hash_files', 0):,} · "
+            f"{format_size(event.get('hashed_bytes', 0))} / {format_size(event.get('hash_bytes', 0))}"
+        )
+        if event.get("hash_cached"):
+            text += f" (캐시 {event['hash_cached']:,}개)"
+        if event.get("hash_complete"):
+            text += " · 완료"
+        return text
+    
+    def rate_summary(self, event):
+        """평활한 속도와 남은 시간"""
+        rate = event.get("rate_avg")
+        if not rate:
+            return ""
+        eta = event.get("eta")
+        if eta is None:
+            return f" ({format_rate(rate)})"
+        return f" ({format_rate(rate)}, 남은 시간 {format_duration(eta)})"
+    
+    def retry_summary(self, event):
+        """재시도 횟수와 손실 시간 요약"""
+        retries = event.get("retries", 0)
+        if not retries:
+            return ""
+        return f" (재시도 {retries}회, 손실 시간 {event.get('time_lost', 0):.0f}초)"
     
     def reset_progress(self):
         """진행 상태 초기화"""
+        # 새 전송이 시작된 경우 초기화하지 않음
+        if self.active_transfer_id is not None:
+            return
         self.progress_bar.setValue(0)
-        self.status_label.setText("준비됨") 
\ No newline at end of file
+        self.sparkline.clear()
+        self.hash_label.setText("")
+        self.status_label.setText("준비됨")
\ No newline at end of file
@@ -10,6 +10,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt, pyqtSignal, QSize, QTimer
 from PyQt6.QtGui import QIcon, QColor, QFont, QPalette
 
+from src.utils.logger import configure_logging
+
 class SettingsWidget(QWidget):
     # Define signals
     theme_changed = pyqtSignal(str)
@@ -234,21 +236,29 @@ class SettingsWidget(QWidget):
     
     def save_settings(self):
         """설정 저장"""
-        # 폴더 설정
-        self.config.set_value("default_dir", self.default_dir_input.text())
-        self.config.set_value("auto_create_folder", self.auto_create_check.isChecked())
-        
-        # 앱 설정
-        self.config.set_value("croc_path", self.croc_path_input.text())
-        self.config.set_value("auto_connect", self.auto_connect_check.isChecked())
-        self.config.set_value("verbose_log", self.verbose_log_check.isChecked())
-        
-        # 테마 설정
         theme = self.theme_combo.itemData(self.theme_combo.currentIndex())
-        self.config.set_value("theme", theme)
         
-        # 설정 저장
+        # 여러 값을 바꾼 뒤 한 번만 기록
+        with self.config.transaction():
+            # 폴더 설정
+            self.config.set_value("default_dir", self.default_dir_input.text())
+            self.config.set_value("auto_create_folder", self.auto_create_check.isChecked())
+            
+            # 앱 설정
+            self.config.set_value("croc_path", self.croc_path_input.text())
+            self.config.set_value("auto_connect", self.auto_connect_check.isChecked())
+            self.config.set_value("verbose_log", self.verbose_log_check.isChecked())
+            
+            # 테마 설정
+            self.config.set_value("theme", theme)
+        
+        # 설정 저장 (디바운스를 기다리지 않고 바로 기록)
         self.config.save()
+        configure_logging(self.config.log_dir, self.verbose_log_check.isChecked())
+        
+        # croc 경로가 바뀌었을 수 있으므로 백그라운드에서 다시 확인
+        if self.main_window is not None and hasattr(self.main_window, "revalidate_croc"):
+            self.main_window.revalidate_croc()
         
         # 알림 표시
         QMessageBox.information(self, "설정 저장", "설정이 성공적으로 저장되었습니다.")
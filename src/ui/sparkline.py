@@ -0,0 +1,65 @@
+from PyQt6.QtWidgets import QWidget, QSizePolicy
+from PyQt6.QtCore import Qt, QPointF
+from PyQt6.QtGui import QPainter, QPen, QColor, QPolygonF
+
+from src.utils.units import format_rate
+from src.utils.throughput import ThroughputSeries
+
+LINE_COLOR = QColor("#7b68ee")
+FILL_COLOR = QColor(123, 104, 238, 40)
+
+
+class Sparkline(QWidget):
+    """전송 속도 스파크라인
+
+    최근 샘플만 고정 크기 링 버퍼(ThroughputSeries)에 두고 그리므로
+    전송이 길어져도 메모리와 그리기 비용이 늘지 않음.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.series = ThroughputSeries()
+        self._values = []
+        self.setFixedHeight(32)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+
+    def add_sample(self, progress, rate):
+        """속도 샘플 추가 (너무 잦은 샘플은 ThroughputSeries가 건너뜀)"""
+        if rate is None or not self.series.add(progress, rate):
+            return
+        self._values = self.series.rates()
+        peak = max(self._values)
+        self.setToolTip(f"현재 {format_rate(rate)} · 최고 {format_rate(peak)}")
+        self.update()
+
+    def clear(self):
+        """새 전송을 위해 비우기"""
+        self.series = ThroughputSeries()
+        self._values = []
+        self.setToolTip("")
+        self.update()
+
+    def paintEvent(self, event):
+        if len(self._values) < 2:
+            return
+        peak = max(self._values) or 1.0
+        width = self.width() - 2
+        height = self.height() - 2
+        step = width / (len(self._values) - 1)
+        points = [
+            QPointF(1 + index * step, 1 + height - value / peak * height)
+            for index, value in enumerate(self._values)
+        ]
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # 선 아래 영역 채우기
+        area = QPolygonF(points + [QPointF(points[-1].x(), 1 + height), QPointF(1, 1 + height)])
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(FILL_COLOR)
+        painter.drawPolygon(area)
+
+        painter.setPen(QPen(LINE_COLOR, 1.5))
+        painter.drawPolyline(QPolygonF(points))
+        painter.end()
@@ -0,0 +1,427 @@
+"""Theme engine: renders each theme's global stylesheet once.
+
+The QSS template below is formatted with a theme palette the first time a
+theme is used. The result is kept in memory and written to
+``~/.siro/theme_cache`` under a name derived from the template and palette,
+so later launches read a finished stylesheet instead of formatting it.
+State that changes while the app runs (a drag hovering the file list, the
+selected row) is styled through dynamic properties and pseudo-states in
+the same stylesheet, so nothing calls ``setStyleSheet`` outside a theme
+switch.
+"""
+import glob
+import hashlib
+import os
+
+from src.utils.logger import get_logger
+
+log = get_logger("theme")
+
+CACHE_DIR_NAME = "theme_cache"
+
+# 테마별 색상 팔레트
+PALETTES = {
+    "light": {
+        "primary_color": "#7b68ee",
+        "primary_light": "#9281f0",  # 그라데이션용 라이트 컬러
+        "primary_dark": "#6550e1",   # 그라데이션용 다크 컬러
+        "bg_color": "#ffffff",
+        "bg_color_light": "#f5f5f5",  # 라이트 배경
+        "text_color": "#333333",
+        "secondary_text": "#666666",
+        "border_color": "#e5e5e5",
+        "list_alt_bg": "#f5f5f5",
+        "drop_area_bg": "rgba(123, 104, 238, 0.05)",
+        "drop_area_active_bg": "rgba(123, 104, 238, 0.1)",
+    },
+    "dark": {
+        "primary_color": "#7b68ee",
+        "primary_light": "#9281f0",
+        "primary_dark": "#6550e1",
+        "bg_color": "#191919",
+        "bg_color_light": "#232323",
+        "text_color": "#f0f0f0",
+        "secondary_text": "#a0a0a0",
+        "border_color": "#333333",
+        "list_alt_bg": "#202020",
+        "drop_area_bg": "rgba(123, 104, 238, 0.1)",
+        "drop_area_active_bg": "rgba(123, 104, 238, 0.18)",
+    },
+}
+
+# 통합 스타일시트 템플릿 (str.format 용, 중괄호는 두 번)
+STYLESHEET_TEMPLATE = """
+/* 전체 앱 기본 스타일 */
+QMainWindow, QWidget, QTabWidget, QFrame, QLabel, QPushButton, QLineEdit, QTextEdit, QComboBox, QProgressBar, QTableView {{
+    background-color: {bg_color};
+    font-family: -apple-system, BlinkMacSystemFont, 'SF Pro', 'Helvetica Neue', Arial, sans-serif;
+    font-size: 13px;
+    color: {text_color};
+    border: none;
+}}
+
+/* 헤더 */
+#headerWidget {{
+    background-color: {bg_color};
+}}
+
+#appTitle {{
+    font-size: 18px;
+    font-weight: bold;
+    color: {primary_color};
+}}
+
+#versionLabel {{
+    color: {secondary_text};
+    font-size: 12px;
+}}
+
+/* 탭 위젯 */
+#mainTabs {{
+    background-color: {bg_color};
+}}
+
+/* 탭 바 */
+QTabBar::tab {{
+    background-color: {bg_color};
+    color: {text_color};
+    padding: 10px 20px;
+    border: none;
+    min-width: 80px;
+    border-top-left-radius: 6px;
+    border-top-right-radius: 6px;
+}}
+
+QTabBar::tab:selected {{
+    color: {primary_color};
+    border-bottom: 2px solid {primary_color};
+    font-weight: bold;
+    background-color: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 {bg_color_light}, stop:1 {bg_color});
+}}
+
+QTabBar::tab:hover:!selected {{
+    color: {primary_color};
+    background-color: {bg_color_light}50;
+}}
+
+/* 탭 콘텐츠 영역 */
+QTabWidget::pane {{
+    border: none;
+    background-color: {bg_color};
+}}
+
+/* 입력 필드 */
+QLineEdit, QTextEdit, QPlainTextEdit {{
+    padding: 10px;
+    background-color: {bg_color_light};
+    color: {text_color};
+    selection-background-color: {primary_color};
+    selection-color: white;
+    border: 1px solid {border_color};
+    border-radius: 8px;
+}}
+
+QLineEdit:focus, QTextEdit:focus, QPlainTextEdit:focus {{
+    border: 1px solid {primary_color};
+    background-color: {bg_color};
+}}
+
+/* 버튼 */
+QPushButton {{
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 {primary_light}, stop:1 {primary_dark});
+    color: white;
+    padding: 10px 18px;
+    border-radius: 10px;
+    font-weight: bold;
+    border: none;
+    min-height: 20px;
+}}
+
+QPushButton:hover {{
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 {primary_light}, stop:0.4 {primary_color}, stop:1 {primary_dark});
+}}
+
+QPushButton:pressed {{
+    background: qlineargradient(x1:0, y1:1, x2:0, y2:0,
+        stop:0 {primary_light}, stop:0.6 {primary_color}, stop:1 {primary_dark});
+    padding-top: 12px;
+    padding-bottom: 8px;
+}}
+
+QPushButton:disabled {{
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 {secondary_text}, stop:1 {secondary_text}80);
+    color: {bg_color};
+}}
+
+/* 프로그레스바 */
+QProgressBar {{
+    border: 1px solid {border_color};
+    background-color: {bg_color_light};
+    text-align: center;
+    color: {text_color};
+    border-radius: 8px;
+    height: 20px;
+}}
+
+QProgressBar::chunk {{
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+        stop:0 {primary_dark}, stop:1 {primary_light});
+    border-radius: 6px;
+}}
+
+/* 콤보박스 */
+QComboBox {{
+    padding: 8px 12px;
+    background-color: {bg_color_light};
+    color: {text_color};
+    border: 1px solid {border_color};
+    border-radius: 8px;
+    selection-background-color: {primary_color};
+    selection-color: white;
+    min-height: 20px;
+}}
+
+QComboBox:focus {{
+    border: 1px solid {primary_color};
+    background-color: {bg_color};
+}}
+
+QComboBox::drop-down {{
+    border: none;
+    width: 20px;
+}}
+
+QComboBox QAbstractItemView {{
+    background-color: {bg_color};
+    color: {text_color};
+    selection-background-color: {primary_color};
+    selection-color: white;
+    border: 1px solid {border_color};
+    border-radius: 8px;
+}}
+
+/* 체크박스 */
+QCheckBox {{
+    spacing: 8px;
+    background-color: transparent;
+}}
+
+QCheckBox::indicator {{
+    width: 18px;
+    height: 18px;
+    background-color: {bg_color_light};
+    border: 1px solid {border_color};
+    border-radius: 4px;
+}}
+
+QCheckBox::indicator:checked {{
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 {primary_light}, stop:1 {primary_dark});
+    border: none;
+}}
+
+/* 스크롤바 */
+QScrollBar:vertical {{
+    background: {bg_color};
+    width: 8px;
+    margin: 2px;
+    border-radius: 4px;
+}}
+
+QScrollBar::handle:vertical {{
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+        stop:0 {primary_color}70, stop:1 {primary_light}70);
+    min-height: 30px;
+    border-radius: 4px;
+}}
+
+QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {{
+    height: 0px;
+}}
+
+QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {{
+    background: none;
+}}
+
+/* 테이블 */
+QTableView {{
+    background-color: {bg_color};
+    gridline-color: {border_color};
+    border-radius: 8px;
+    border: 1px solid {border_color};
+}}
+
+QTableView::item {{
+    padding: 6px;
+    border-bottom: 1px solid {border_color};
+}}
+
+QTableView::item:selected {{
+    background-color: {primary_color}20;
+    color: {text_color};
+    border-radius: 4px;
+}}
+
+QHeaderView::section {{
+    background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+        stop:0 {bg_color_light}, stop:1 {bg_color});
+    color: {secondary_text};
+    padding: 8px;
+    border: none;
+    border-bottom: 1px solid {primary_color}50;
+    font-weight: bold;
+}}
+
+/* 그룹 박스 */
+QGroupBox {{
+    border: 1px solid {border_color};
+    border-radius: 10px;
+    margin-top: 20px;
+    background-color: {bg_color};
+}}
+
+QGroupBox::title {{
+    subcontrol-origin: margin;
+    subcontrol-position: top left;
+    padding: 0 8px;
+    color: {primary_color};
+    font-weight: bold;
+}}
+
+/* 상태바 */
+QStatusBar {{
+    background-color: {bg_color};
+    color: {secondary_text};
+}}
+
+/* 내용 패딩 */
+#mainTabs > QWidget {{
+    padding: 15px;
+}}
+
+/* 섹션 제목 스타일 */
+#sectionTitle {{
+    font-size: 18px;
+    font-weight: bold;
+    color: {primary_color};
+}}
+
+/* 설정 라벨 */
+#settingLabel {{
+    font-size: 14px;
+    font-weight: bold;
+    color: {text_color};
+}}
+
+/* 설정 섹션 */
+#settingsSection {{
+    border: 1px solid {border_color};
+    border-radius: 10px;
+    background-color: {bg_color};
+}}
+
+/* 기록 탭 제목은 조금 더 크게 */
+HistoryWidget #sectionTitle {{
+    font-size: 22px;
+}}
+
+/* 파일 목록 드롭 영역 - 드래그 중에는 dragActive 속성으로 강조 */
+FileListWidget {{
+    background-color: {drop_area_bg};
+    color: {text_color};
+    border: 2px dashed {primary_color};
+    border-radius: 8px;
+    padding: 5px;
+}}
+
+FileListWidget[dragActive="true"] {{
+    background-color: {drop_area_active_bg};
+    border: 2px dashed {primary_dark};
+}}
+
+FileListWidget::item {{
+    padding: 8px;
+    border-bottom: 1px solid {secondary_text}30;
+    border-radius: 4px;
+}}
+
+FileListWidget::item:alternate {{
+    background-color: {list_alt_bg};
+}}
+
+FileListWidget::item:selected {{
+    background-color: {primary_color}20;
+    color: {text_color};
+}}
+"""
+
+
+def render_stylesheet(theme):
+    """Format the stylesheet template with a theme's palette"""
+    palette = PALETTES.get(theme, PALETTES["light"])
+    return STYLESHEET_TEMPLATE.format(**palette)
+
+
+class ThemeEngine:
+    """Hands out finished stylesheets, rendering each theme at most once"""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = os.path.join(cache_dir, CACHE_DIR_NAME) if cache_dir else None
+        self._stylesheets = {}
+
+    def _cache_file(self, theme):
+        palette = PALETTES.get(theme, PALETTES["light"])
+        digest = hashlib.sha1(
+            (STYLESHEET_TEMPLATE + repr(sorted(palette.items()))).encode("utf-8")
+        ).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f"{theme}-{digest}.qss")
+
+    def _load(self, cache_file):
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _store(self, theme, cache_file, stylesheet):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # 템플릿이 바뀌어 쓸모없어진 이전 캐시 정리
+            for stale in glob.glob(os.path.join(self.cache_dir, f"{theme}-*.qss")):
+                if stale != cache_file:
+                    os.remove(stale)
+            tmp_file = f"{cache_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.write(stylesheet)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            log.debug("could not cache stylesheet for %s: %s", theme, e)
+
+    def stylesheet(self, theme):
+        """The finished stylesheet for a theme (memory, then disk, then render)"""
+        stylesheet = self._stylesheets.get(theme)
+        if stylesheet is not None:
+            return stylesheet
+
+        cache_file = self._cache_file(theme) if self.cache_dir else None
+        if cache_file:
+            stylesheet = self._load(cache_file)
+        if stylesheet is None:
+            stylesheet = render_stylesheet(theme)
+            if cache_file:
+                self._store(theme, cache_file, stylesheet)
+
+        self._stylesheets[theme] = stylesheet
+        return stylesheet
+
+
+def refresh_style(widget):
+    """Re-evaluate a widget's stylesheet after one of its dynamic properties changed"""
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+    widget.update()
@@ -0,0 +1,93 @@
+"""Streaming a tar of files and folders into a pipe.
+
+``ArchiveProducer`` walks the selected paths on its own thread and writes a
+tar stream straight into a pipe (croc's stdin). Nothing is staged on disk
+on our side, and memory stays bounded: tarfile reads and writes in
+``ARCHIVE_BUFFER`` chunks, and a full pipe blocks the producer until the
+reader catches up.
+
+The archive is plain tar; croc compresses the data itself unless told not
+to, so zipping first would only compress twice.
+"""
+import os
+import tarfile
+import threading
+import time
+
+from src.utils.logger import get_logger
+
+log = get_logger("archive")
+
+ARCHIVE_BUFFER = 1024 * 1024
+PROGRESS_INTERVAL = 0.5
+
+
+class _CountingWriter:
+    """File-like sink that counts bytes and reports progress now and then"""
+
+    def __init__(self, sink, progress, interval):
+        self.sink = sink
+        self.progress = progress
+        self.interval = interval
+        self.written = 0
+        self._last_report = 0.0
+
+    def write(self, data):
+        self.sink.write(data)
+        self.written += len(data)
+        if self.progress is not None:
+            now = time.monotonic()
+            if now - self._last_report >= self.interval:
+                self._last_report = now
+                self.progress(self.written)
+        return len(data)
+
+
+class ArchiveProducer(threading.Thread):
+    """Writes a tar of ``paths`` into ``sink`` and closes it
+
+    Each path is stored under its base name, so folders keep their
+    structure below it; ``members`` ((path, name) pairs of single files)
+    replaces that with explicit names. ``progress(bytes_written)`` is called every
+    ``interval`` seconds. If reading a file fails, ``abort()`` runs
+    *before* the sink is closed, so the reader can be stopped instead of
+    taking a truncated archive as complete. ``error`` holds the exception
+    afterwards; a reader that went away first is not an error of ours and
+    leaves it None.
+    """
+
+    def __init__(self, paths, sink, progress=None, abort=None, interval=PROGRESS_INTERVAL, members=None):
+        super().__init__(name="archive-producer", daemon=True)
+        self.paths = list(paths)
+        self.members = list(members) if members is not None else None
+        self.sink = sink
+        self.abort = abort
+        self.error = None
+        self._writer = _CountingWriter(sink, progress, interval)
+
+    @property
+    def written(self):
+        return self._writer.written
+
+    def run(self):
+        try:
+            with tarfile.open(fileobj=self._writer, mode="w|", bufsize=ARCHIVE_BUFFER) as tar:
+                if self.members is not None:
+                    for path, name in self.members:
+                        tar.add(path, arcname=name, recursive=False)
+                else:
+                    for path in self.paths:
+                        tar.add(path, arcname=os.path.basename(os.path.normpath(path)))
+        except (BrokenPipeError, ValueError):
+            # The reader exited (ValueError: its pipe was closed under us)
+            log.debug("archive reader went away after %d bytes", self.written)
+        except Exception as e:
+            log.exception("archiving failed after %d bytes", self.written)
+            self.error = e
+            if self.abort is not None:
+                self.abort()
+        finally:
+            try:
+                self.sink.close()
+            except OSError:
+                pass
@@ -0,0 +1,138 @@
+"""Guessing whether compressing a send is worth the CPU.
+
+croc compresses everything it sends unless given ``--no-compress``, which
+only burns CPU on media and archives that are already compressed. Before a
+send, ``estimate_compressibility`` looks at the largest files of the
+selection (they carry most of the bytes), as found by the size scan in
+manifest.py:
+
+- files whose extension or magic bytes say "already compressed" count as
+  incompressible without reading further, and
+- the rest have a few blocks spread over the file compressed with zlib at
+  level 1, a codec cheaper than croc's own, so the estimate is on the
+  pessimistic side.
+
+The bytes not sampled are assumed to compress like the sampled ones. croc
+decides per session, so the result is one decision for the whole send.
+"""
+import heapq
+import os
+import zlib
+from dataclasses import dataclass
+
+from src.utils.manifest import DEFAULT_CACHE, LARGEST_KEPT, scan_paths
+
+SAMPLE_SIZE = 64 * 1024
+SAMPLES_PER_FILE = 4
+MAX_SAMPLED_FILES = LARGEST_KEPT
+# Compress when the sample shrinks to at most this fraction of its size
+COMPRESS_THRESHOLD = 0.9
+
+COMPRESSED_EXTENSIONS = frozenset((
+    ".zip", ".gz", ".tgz", ".bz2", ".tbz2", ".xz", ".txz", ".zst", ".lz4", ".7z", ".rar", ".cab",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".heif", ".avif",
+    ".mp3", ".aac", ".m4a", ".ogg", ".opus", ".flac",
+    ".mp4", ".m4v", ".mkv", ".mov", ".avi", ".webm", ".wmv",
+    ".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp", ".epub",
+    ".jar", ".apk", ".whl", ".dmg", ".msi",
+))
+
+# (offset, magic bytes) of formats that are compressed whatever their name
+COMPRESSED_MAGIC = (
+    (0, b"PK\x03\x04"),
+    (0, b"\x1f\x8b"),
+    (0, b"\x28\xb5\x2f\xfd"),
+    (0, b"\xfd7zXZ\x00"),
+    (0, b"BZh"),
+    (0, b"7z\xbc\xaf\x27\x1c"),
+    (0, b"Rar!"),
+    (0, b"\x89PNG"),
+    (0, b"\xff\xd8\xff"),
+    (0, b"GIF8"),
+    (0, b"OggS"),
+    (0, b"fLaC"),
+    (0, b"ID3"),
+    (4, b"ftyp"),
+    (8, b"WEBP"),
+)
+
+
+@dataclass
+class CompressionEstimate:
+    """Whether to let croc compress a send, and what it would save"""
+    total_bytes: int = 0
+    sampled_bytes: int = 0
+    # Estimated compressed size / original size (1.0: no gain)
+    ratio: float = 1.0
+    sampled_files: int = 0
+    precompressed_files: int = 0
+
+    @property
+    def compress(self):
+        return self.total_bytes > 0 and self.ratio <= COMPRESS_THRESHOLD
+
+    @property
+    def saved_bytes(self):
+        return int(self.total_bytes * (1 - self.ratio))
+
+
+def _is_precompressed(head):
+    return any(head[offset:offset + len(magic)] == magic for offset, magic in COMPRESSED_MAGIC)
+
+
+def sample_ratio(path, size):
+    """(bytes sampled, their zlib level-1 compressed size), or None if unreadable
+
+    Known compressed formats return (sample, sample) without compressing.
+    """
+    sample = min(size, SAMPLE_SIZE * SAMPLES_PER_FILE)
+    if os.path.splitext(path)[1].lower() in COMPRESSED_EXTENSIONS:
+        return sample, sample
+    try:
+        with open(path, "rb") as f:
+            if size <= SAMPLE_SIZE * SAMPLES_PER_FILE:
+                blocks = [f.read(size)]
+            else:
+                # Evenly spaced blocks, the first at the start
+                step = (size - SAMPLE_SIZE) // (SAMPLES_PER_FILE - 1)
+                blocks = []
+                for index in range(SAMPLES_PER_FILE):
+                    f.seek(index * step)
+                    blocks.append(f.read(SAMPLE_SIZE))
+    except OSError:
+        return None
+    if _is_precompressed(blocks[0][:16]):
+        return sample, sample
+    raw = sum(len(block) for block in blocks)
+    return raw, sum(len(zlib.compress(block, 1)) for block in blocks)
+
+
+def estimate_compressibility(paths, max_files=MAX_SAMPLED_FILES, cancelled=None, totals=None,
+                             cache=DEFAULT_CACHE):
+    """CompressionEstimate for sending ``paths`` (files and folders)
+
+    Samples the largest files of ``totals`` (a finished scan_paths of
+    ``paths``), scanning first if none is given. ``cancelled()`` is polled
+    per directory and aborts with ScanCancelled.
+    """
+    if totals is None:
+        totals = scan_paths(paths, cache, cancelled=cancelled)
+    largest = heapq.nlargest(max_files, totals.largest)
+    estimate = CompressionEstimate(total_bytes=totals.bytes)
+    compressed = 0
+    for size, path in largest:
+        if size == 0:
+            continue
+        result = sample_ratio(path, size)
+        if result is None:
+            continue
+        raw, packed = result
+        if raw == packed:
+            estimate.precompressed_files += 1
+        # Weight each file's ratio by its size, not by the sample's
+        estimate.sampled_bytes += size
+        compressed += size * packed / raw if raw else size
+        estimate.sampled_files += 1
+    if estimate.sampled_bytes:
+        estimate.ratio = min(1.0, compressed / estimate.sampled_bytes)
+    return estimate
@@ -1,31 +1,53 @@
 import os
 import json
+import atexit
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+from src.utils.history_store import HistoryStore
+from src.utils.logger import get_logger
+
+log = get_logger("config")
+
+# Seconds to wait after the last change before writing config.json
+FLUSH_DELAY = 0.5
+
 class Config:
     def __init__(self):
         self.config_dir = os.path.join(str(Path.home()), ".siro")
         self.config_file = os.path.join(self.config_dir, "config.json")
         self.history_file = os.path.join(self.config_dir, "history.json")
+        self.history_db = os.path.join(self.config_dir, "history.db")
+        self.hash_db = os.path.join(self.config_dir, "hashes.db")
+        self.log_dir = os.path.join(self.config_dir, "logs")
         
         # Default configuration
         self.default_config = {
             "theme": "dark",
             "last_directory": str(Path.home()),
             "save_directory": str(Path.home()),
-            "relay_server": "https://croc.schollz.com:9009",
-            "max_history": 100
+            "relay_server": "https://croc.schollz.com:9009"
         }
         
+        # Write state: changes mark the config dirty and a timer writes it once
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._batch_depth = 0
+        self._flush_timer = None
+        
         # Ensure config directory exists
         os.makedirs(self.config_dir, exist_ok=True)
         
         # Load configuration
         self.config = self.load_config()
         
-        # Initialize history if it doesn't exist
-        if not os.path.exists(self.history_file):
-            self.save_history([])
+        # Write anything still pending when the process exits
+        atexit.register(self.flush)
+        
+        # Transfer history (opened on first use; imports an old history.json once)
+        self.history = HistoryStore(self.history_db, legacy_json=self.history_file)
     
     def load_config(self):
         """Load configuration from file or create default if it doesn't exist"""
@@ -33,18 +55,27 @@ class Config:
             try:
                 with open(self.config_file, 'r') as f:
                     return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                return self.default_config
+            except (json.JSONDecodeError, IOError) as e:
+                # Keep the unreadable file for inspection instead of overwriting it later
+                corrupt_file = f"{self.config_file}.corrupt"
+                log.warning("could not read %s (%s), moved it to %s and using defaults",
+                            self.config_file, e, corrupt_file)
+                try:
+                    os.replace(self.config_file, corrupt_file)
+                except OSError:
+                    pass
+                return dict(self.default_config)
         else:
             # Create default config
-            self.save_config(self.default_config)
-            return self.default_config
+            self.save_config(dict(self.default_config))
+            return self.config
     
     def save_config(self, config):
-        """Save configuration to file"""
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f, indent=4)
-        self.config = config
+        """Replace the configuration and write it to disk now"""
+        with self._lock:
+            self.config = config
+            self._dirty = True
+            self.flush()
     
     def get_config(self):
         """Get the entire configuration"""
@@ -55,9 +86,82 @@ class Config:
         return self.config.get(key, default)
     
     def set_value(self, key, value):
-        """Set a specific configuration value and save"""
-        self.config[key] = value
-        self.save_config(self.config)
+        """Set a specific configuration value and schedule a save"""
+        with self._lock:
+            if key in self.config and self.config[key] == value:
+                return
+            self.config[key] = value
+            self._dirty = True
+            if self._batch_depth == 0:
+                self._schedule_flush()
+    
+    @contextmanager
+    def transaction(self):
+        """Group several set_value calls into a single write
+
+        Other threads see the values as they are set, but the file is
+        written once, after the outermost block ends.
+        """
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._dirty:
+                    self._schedule_flush()
+    
+    def _schedule_flush(self):
+        """(Re)start the debounce timer; called with the lock held"""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        self._flush_timer = threading.Timer(FLUSH_DELAY, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+    
+    def flush(self):
+        """Write pending changes to disk now"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty:
+                return
+            data = json.dumps(self.config, indent=4)
+            try:
+                self._write_atomic(data)
+            except OSError:
+                log.exception("could not write %s", self.config_file)
+                return
+            self._dirty = False
+    
+    def save(self):
+        """Write the configuration to disk now (same as flush)"""
+        self.flush()
+    
+    def _write_atomic(self, data):
+        """Write to a temp file, fsync it and rename it over config.json"""
+        fd, tmp_file = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=self.config_dir)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.config_file)
+        except BaseException:
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+            raise
+        # Make the rename itself durable
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(self.config_dir, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
     
     def get_theme(self):
         """Get the current theme"""
@@ -67,28 +171,16 @@ class Config:
         """Set the current theme"""
         self.set_value("theme", theme)
     
-    def load_history(self):
-        """Load transfer history"""
-        if os.path.exists(self.history_file):
-            try:
-                with open(self.history_file, 'r') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
-                return []
-        return []
+    def load_history(self, limit=None):
+        """Load transfer history, newest first"""
+        if limit is None:
+            return self.history.page(limit=self.history.count())
+        return self.history.page(limit=limit)
     
     def save_history(self, history):
-        """Save transfer history"""
-        # Limit history size
-        max_history = self.get_value("max_history", 100)
-        if len(history) > max_history:
-            history = history[-max_history:]
-        
-        with open(self.history_file, 'w') as f:
-            json.dump(history, f, indent=4)
+        """Replace the stored transfer history"""
+        self.history.replace(history)
     
     def add_history_entry(self, entry):
         """Add an entry to the transfer history"""
-        history = self.load_history()
-        history.append(entry)
-        self.save_history(history) 
\ No newline at end of file
+        return self.history.append(entry)
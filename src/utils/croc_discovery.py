@@ -0,0 +1,145 @@
+"""Locating the croc binary and probing what it can do.
+
+Probing means running ``croc --version`` and parsing the flags listed by
+``croc --help`` and ``croc send --help``. The result is cached in
+``~/.siro/croc_cache.json`` keyed by the binary's path, size and mtime, so
+a normal launch only needs a stat and the subprocesses run again only
+when the binary changes (or in a background revalidation).
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import time
+
+from packaging import version
+
+CACHE_FILE_NAME = "croc_cache.json"
+MIN_CROC_VERSION = "9.0.0"
+PROBE_TIMEOUT = 10
+
+INSTALL_HINT = (
+    "Croc executable not found in PATH. Please install croc first:\n"
+    "- Linux/macOS: curl https://getcroc.schollz.com | bash\n"
+    "- Windows: Download from https://github.com/schollz/croc/releases"
+)
+
+_VERSION_RE = re.compile(r"(\d+\.\d+\.\d+)")
+_FLAG_RE = re.compile(r"(?<![\w-])(--[a-z][a-z0-9-]*)")
+
+
+def resolve_binary(croc_path=None):
+    """Absolute path of the croc binary to use, or None if there is none"""
+    if croc_path:
+        croc_path = os.path.expanduser(croc_path)
+        if os.path.isfile(croc_path) and os.access(croc_path, os.X_OK):
+            return os.path.abspath(croc_path)
+        return None
+    return shutil.which("croc")
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _run(path, *args):
+    result = subprocess.run(
+        [path, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        timeout=PROBE_TIMEOUT
+    )
+    return result.returncode, result.stdout
+
+
+def probe_binary(path):
+    """Run croc to find its version and supported flags"""
+    returncode, output = _run(path, "--version")
+    if returncode != 0:
+        raise FileNotFoundError(INSTALL_HINT)
+    match = _VERSION_RE.search(output)
+    croc_version = match.group(1) if match else "Unknown"
+
+    flags = set()
+    for args in (("--help",), ("send", "--help")):
+        try:
+            _, help_text = _run(path, *args)
+        except (OSError, subprocess.SubprocessError):
+            continue
+        flags.update(_FLAG_RE.findall(help_text))
+
+    size, mtime_ns = _fingerprint(path)
+    return {
+        "path": path,
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "version": croc_version,
+        "flags": sorted(flags),
+        "probed_at": time.time()
+    }
+
+
+def check_version(info):
+    """Raise if the probed croc is older than we support"""
+    croc_version = info.get("version", "Unknown")
+    if croc_version != "Unknown" and version.parse(croc_version) < version.parse(MIN_CROC_VERSION):
+        raise RuntimeError(
+            f"Croc version {croc_version} is too old, please upgrade to {MIN_CROC_VERSION} or newer"
+        )
+
+
+class CrocDiscovery:
+    """Cached croc lookup backed by a small JSON file"""
+
+    def __init__(self, cache_dir, croc_path=None):
+        self.cache_file = os.path.join(cache_dir, CACHE_FILE_NAME)
+        self.croc_path = croc_path
+
+    def _load(self):
+        try:
+            with open(self.cache_file, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _store(self, info):
+        entries = self._load()
+        entries[info["path"]] = info
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                json.dump(entries, f, indent=4)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            pass
+
+    def cached(self):
+        """Cached info if the binary is unchanged since it was probed (no subprocess)"""
+        path = resolve_binary(self.croc_path)
+        if path is None:
+            return None
+        info = self._load().get(path)
+        if info is None:
+            return None
+        try:
+            if (info.get("size"), info.get("mtime_ns")) != _fingerprint(path):
+                return None
+        except OSError:
+            return None
+        return info
+
+    def probe(self):
+        """Probe the binary now, update the cache and return the info"""
+        path = resolve_binary(self.croc_path)
+        if path is None:
+            raise FileNotFoundError(INSTALL_HINT)
+        info = probe_binary(path)
+        self._store(info)
+        return info
+
+    def discover(self):
+        """Cached info, or a fresh probe when the cache is missing or stale"""
+        return self.cached() or self.probe()
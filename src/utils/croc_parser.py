@@ -0,0 +1,224 @@
+"""Incremental parser for croc's terminal output.
+
+croc redraws its progress bar with carriage returns, so the parser works on
+raw byte chunks, splits on both ``\\r`` and ``\\n`` and runs every line once
+through a precompiled, version-specific rule table. Each rule carries a
+cheap substring prefilter so the regex only runs on lines that can match.
+"""
+import re
+from dataclasses import dataclass
+
+from packaging import version as _version
+
+# Lines longer than this are truncated before matching. croc never prints
+# anything close to it, and it bounds the regex work on garbage input.
+MAX_LINE_LENGTH = 4096
+
+
+@dataclass(frozen=True, slots=True)
+class CodeEvent:
+    """The sender's code phrase was announced"""
+    code: str
+
+
+@dataclass(frozen=True, slots=True)
+class FileInfoEvent:
+    """croc announced what is being sent or received"""
+    direction: str
+    name: str
+    size: str
+
+
+@dataclass(frozen=True, slots=True)
+class ConnectedEvent:
+    """The peers found each other and the transfer is starting"""
+    direction: str
+    peer: str
+
+
+@dataclass(frozen=True, slots=True)
+class ProgressEvent:
+    """A progress bar redraw"""
+    name: str
+    percent: float
+    speed: str | None
+    transferred: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class HashingEvent:
+    """Progress of croc hashing a file before sending it"""
+    name: str
+    percent: float
+
+
+@dataclass(frozen=True, slots=True)
+class PromptEvent:
+    """croc is asking the user for confirmation"""
+    message: str
+
+
+@dataclass(frozen=True, slots=True)
+class CompletedEvent:
+    """croc reported a finished transfer"""
+    message: str
+
+
+@dataclass(frozen=True, slots=True)
+class ErrorEvent:
+    """croc reported an error"""
+    message: str
+
+
+@dataclass(frozen=True, slots=True)
+class OutputLine:
+    """A raw output line, only emitted when the parser is asked to"""
+    text: str
+
+
+def _code(match, line):
+    return CodeEvent(match.group(1))
+
+
+def _file_info(direction):
+    def build(match, line):
+        return FileInfoEvent(direction, match.group(1), match.group(2))
+    return build
+
+
+def _connected(direction):
+    def build(match, line):
+        return ConnectedEvent(direction, match.group(1))
+    return build
+
+
+def _progress(match, line):
+    return ProgressEvent(
+        match.group(1).strip(),
+        float(match.group(2)),
+        match.group(4),
+        match.group(3)
+    )
+
+
+def _hashing(match, line):
+    return HashingEvent(match.group(1).strip(), float(match.group(2)))
+
+
+def _prompt(match, line):
+    return PromptEvent(line)
+
+
+def _completed(match, line):
+    return CompletedEvent(line)
+
+
+def _error(match, line):
+    return ErrorEvent(line)
+
+
+# (prefilter, pattern, factory). The prefilter is a plain lowercase
+# substring that must occur in the lowercased line before the regex is
+# tried, so it also holds for case-insensitive patterns. The first rule
+# that matches wins. Patterns avoid nested or adjacent unbounded
+# quantifiers so matching stays linear in the line length.
+_RULES_V9 = (
+    ("code is:", re.compile(r"Code is:\s*(\S+)"), _code),
+    ("hashing", re.compile(r"Hashing\s+'?([^%']{0,512}?)'?\s+(\d{1,3}(?:\.\d+)?)%"), _hashing),
+    ("sending (", re.compile(r"^Sending \((?:->)?([^)]{1,256})\)"), _connected("send")),
+    ("receiving (", re.compile(r"^Receiving \((?:<-)?([^)]{1,256})\)"), _connected("receive")),
+    ("sending", re.compile(r"^Sending '?([^()]{1,1024}?)'? \(([^()]{1,64})\)"), _file_info("send")),
+    ("receiving", re.compile(r"^Receiving '?([^()]{1,1024}?)'? \(([^()]{1,64})\)"), _file_info("receive")),
+    ("accept", re.compile(r"^Accept\b.{0,1024}\?"), _prompt),
+    ("%", re.compile(
+        r"^(.{0,1024}?)\s(\d{1,3}(?:\.\d+)?)%"
+        r"(?:[^(]{0,256}\(([\d.]+\s*\w*\s*/\s*[\d.]+\s*\w+)"
+        r"(?:,\s*([\d.]+\s*\w+/s))?)?"
+    ), _progress),
+    ("error", re.compile(r"(?i)\berror\b"), _error),
+    ("sent", re.compile(r"^(?:File sent|Sent)\b"), _completed),
+    ("received", re.compile(r"^(?:File received|Received)\b"), _completed),
+)
+
+# croc 10 kept the v9 wire format. It has its own entry so divergences in
+# later releases stay local to one table.
+PATTERN_TABLES = {
+    "9": _RULES_V9,
+    "10": _RULES_V9,
+}
+
+
+def pattern_table_for(croc_version):
+    """Pick the rule table for a croc version string (falls back to newest)"""
+    newest = max(PATTERN_TABLES, key=int)
+    if not croc_version or croc_version == "Unknown":
+        return PATTERN_TABLES[newest]
+    try:
+        major = str(_version.parse(croc_version).major)
+    except _version.InvalidVersion:
+        return PATTERN_TABLES[newest]
+    if major in PATTERN_TABLES:
+        return PATTERN_TABLES[major]
+    if int(major) > int(newest):
+        return PATTERN_TABLES[newest]
+    return PATTERN_TABLES[min(PATTERN_TABLES, key=int)]
+
+
+class CrocOutputParser:
+    """Turns croc's raw stdout/stderr bytes into typed events"""
+
+    def __init__(self, croc_version=None, emit_lines=False, encoding="utf-8"):
+        self.rules = pattern_table_for(croc_version)
+        self.emit_lines = emit_lines
+        self.encoding = encoding
+        self._pending = b""
+
+    def feed(self, chunk):
+        """Feed a chunk of bytes and return the events of all complete lines"""
+        data = self._pending + chunk
+        # \r\n, \r and \n all terminate a line; empty lines are dropped
+        pieces = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n").split(b"\n")
+        self._pending = pieces.pop()
+        if len(self._pending) > MAX_LINE_LENGTH:
+            # A runaway line without terminator: parse what we have
+            pieces.append(self._pending)
+            self._pending = b""
+
+        events = []
+        for raw in pieces:
+            if raw:
+                self._parse_line(raw, events)
+        return events
+
+    def close(self):
+        """Flush a trailing line that was not terminated"""
+        events = []
+        if self._pending:
+            self._parse_line(self._pending, events)
+            self._pending = b""
+        return events
+
+    def parse_line(self, line):
+        """Parse a single already-split text line"""
+        events = []
+        self._match(line.strip(), events)
+        return events
+
+    def _parse_line(self, raw, events):
+        if len(raw) > MAX_LINE_LENGTH:
+            raw = raw[:MAX_LINE_LENGTH]
+        line = raw.decode(self.encoding, errors="replace").strip()
+        if line:
+            self._match(line, events)
+
+    def _match(self, line, events):
+        if self.emit_lines:
+            events.append(OutputLine(line))
+        folded = line.lower()
+        for prefilter, pattern, factory in self.rules:
+            if prefilter not in folded:
+                continue
+            match = pattern.search(line)
+            if match is not None:
+                events.append(factory(match, line))
+                return
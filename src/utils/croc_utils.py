@@ -4,92 +4,283 @@ import platform
 import shlex
 from pathlib import Path
 import re
-import time
-from packaging import version
+import threading
+
+from src.utils.croc_parser import (
+    CrocOutputParser, CodeEvent, ConnectedEvent, FileInfoEvent,
+    ProgressEvent, PromptEvent, CompletedEvent, ErrorEvent, OutputLine
+)
+from src.utils.archive_stream import ArchiveProducer
+from src.utils.logger import get_logger, TranscriptBuffer, LazyLines
+from src.utils.manifest import path_size
+from src.utils.units import parse_rate, parse_size, parse_transferred
+from src.utils.croc_discovery import CrocDiscovery, check_version, INSTALL_HINT
+
+log = get_logger("croc")
+
+# Bytes read from croc's output pipe per call
+READ_CHUNK_SIZE = 4096
+# Seconds a croc process gets to exit after terminate() before it is killed
+TERMINATE_TIMEOUT = 5
+
+def _announced_file_count(summary):
+    """File count from croc's "Sending 3 files and 1 folders" summary"""
+    match = re.match(r"(\d+) files?\b", summary)
+    return int(match.group(1)) if match else None
+
+
+def _overall_progress(files_done, total_files, percent):
+    """Overall percentage across croc's per-file progress bars"""
+    if not total_files or total_files <= 1:
+        return percent
+    files_done = min(files_done, total_files - 1)
+    return (files_done * 100 + percent) / total_files
+
+
+def _progress_numbers(event, total_size):
+    """Numeric fields for a progress callback (None where croc did not say)
+
+    rate is bytes/s, size the whole transfer's bytes as croc announced
+    it, file_bytes/file_size the current file's progress in bytes.
+    """
+    file_bytes, file_size = parse_transferred(event.transferred) or (None, None)
+    return {
+        "rate": parse_rate(event.speed),
+        "size": total_size,
+        "file_bytes": file_bytes,
+        "file_size": file_size,
+    }
+
+
+def shard_paths(paths, shards, size_of=path_size):
+    """Split paths into at most ``shards`` groups of roughly equal total size
+
+    Largest-first greedy assignment: each path goes to the currently
+    lightest group. Groups keep the user's original path order.
+    """
+    paths = list(paths)
+    shards = max(1, min(int(shards), len(paths)))
+    if shards == 1:
+        return [paths] if paths else []
+    
+    order = {path: index for index, path in enumerate(paths)}
+    sized = sorted(((size_of(path), path) for path in paths), key=lambda item: -item[0])
+    groups = [[0, []] for _ in range(shards)]
+    for size, path in sized:
+        group = min(groups, key=lambda g: g[0])
+        group[0] += size
+        group[1].append(path)
+    return [sorted(group, key=order.get) for _, group in groups if group]
+
 
 class CrocUtils:
-    def __init__(self, config):
+    def __init__(self, config, info=None):
         self.config = config
-        self._check_croc_installed()
+        self._processes = {}
+        self._processes_lock = threading.Lock()
+        self.transcripts = TranscriptBuffer()
+        self._check_croc_installed(info)
     
-    def _check_croc_installed(self):
-        """Check if croc is installed and available in PATH"""
+    def _check_croc_installed(self, info=None):
+        """Resolve the croc binary (cached probe, honouring the croc_path setting)"""
         try:
-            result = subprocess.run(
-                ["croc", "--version"], 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                text=True
-            )
-            if result.returncode != 0:
-                raise FileNotFoundError("Croc executable not found")
-            
-            # Extract version
-            match = re.search(r'(\d+\.\d+\.\d+)', result.stdout)
-            if match:
-                self.version = match.group(1)
-            else:
-                self.version = "Unknown"
-                
-            # Check if version is sufficient
-            if self.version != "Unknown" and version.parse(self.version) < version.parse("9.0.0"):
-                raise RuntimeError(f"Croc version {self.version} is too old, please upgrade to 9.0.0 or newer")
-                
-        except FileNotFoundError:
-            raise FileNotFoundError(
-                "Croc executable not found in PATH. Please install croc first:\n"
-                "- Linux/macOS: curl https://getcroc.schollz.com | bash\n"
-                "- Windows: Download from https://github.com/schollz/croc/releases"
-            )
+            if info is None:
+                info = CrocDiscovery(self.config.config_dir, self.config.get_value("croc_path")).discover()
+        except (OSError, subprocess.SubprocessError):
+            raise FileNotFoundError(INSTALL_HINT)
+        self.apply_info(info)
+    
+    def apply_info(self, info):
+        """Use a (re)probed binary; raises if its version is too old"""
+        check_version(info)
+        self.binary = info["path"]
+        self.version = info.get("version", "Unknown")
+        self.capabilities = frozenset(info.get("flags", ()))
+    
+    def supports(self, flag):
+        """Whether the detected croc lists the given flag in its help"""
+        return flag in self.capabilities
     
     def get_version(self):
         """Get the installed croc version"""
         return self.version
     
-    def send_file(self, file_path, code=None, relay=None, callback=None):
+    def _track_process(self, process, transfer_id=None):
+        with self._processes_lock:
+            self._processes[process] = transfer_id
+    
+    def _untrack_process(self, process):
+        with self._processes_lock:
+            self._processes.pop(process, None)
+    
+    def terminate_all(self):
+        """Terminate every croc process started by this instance"""
+        with self._processes_lock:
+            processes = list(self._processes)
+        self._terminate(processes)
+    
+    def terminate_transfer(self, transfer_id):
+        """Terminate the croc processes of one transfer (and its shards)"""
+        prefix = f"{transfer_id}."
+        with self._processes_lock:
+            processes = [
+                process for process, owner in self._processes.items()
+                if owner is not None and (owner == transfer_id or owner.startswith(prefix))
+            ]
+        self._terminate(processes)
+    
+    def _terminate(self, processes):
+        for process in processes:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+    
+    def _reap(self, process):
+        """Stop a croc process that is still running and wait for it"""
+        if process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=TERMINATE_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    
+    def _read_events(self, process, parser, transcript):
+        """Yield parser events from croc's merged output as chunks arrive"""
+        stream = process.stdout
+        while True:
+            chunk = stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            events = parser.feed(chunk)
+            yield from self._record_lines(events, transcript)
+        yield from self._record_lines(parser.close(), transcript)
+    
+    def _record_lines(self, events, transcript):
+        """Keep raw lines in the transcript and pass the other events on"""
+        for event in events:
+            if isinstance(event, OutputLine):
+                transcript.append(event.text)
+                log.debug("croc: %s", event.text)
+            else:
+                yield event
+    
+    def _log_failure(self, key, returncode):
+        log.warning(
+            "croc exited with %s (%s), last output:\n%s",
+            returncode, key, LazyLines(self.transcripts.get(key))
+        )
+    
+    def send_file(self, file_path, code=None, relay=None, callback=None, transfer_id=None):
         """Send a file using croc"""
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
+        return self.send_files([file_path], code=code, relay=relay, callback=callback, transfer_id=transfer_id)
+    
+    def send_files(self, paths, code=None, relay=None, callback=None, transfer_id=None, archive=False,
+                   compress=True, members=None):
+        """Send any number of files and folders in a single croc session
+
+        With ``archive`` the paths are streamed into croc's stdin as one tar
+        (see archive_stream.py) instead of being passed as arguments; the
+        receiver gets a single archive file. ``members`` ((path, name)
+        pairs of files) archives exactly those under those names.
+        ``compress=False`` passes --no-compress when this croc has it.
+        """
+        archive = archive or members is not None
+        paths = list(paths)
+        if not paths:
+            raise ValueError("No files to send")
+        for path in paths:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"File not found: {path}")
         
         # Build command
-        cmd = ["croc", "send"]
+        cmd = [self.binary, "send"]
         
         # Add optional arguments
         if code:
             cmd.extend(["--code", code])
+        if not compress:
+            if self.supports("--no-compress"):
+                cmd.append("--no-compress")
+            else:
+                log.debug("croc %s has no --no-compress, sending compressed", self.version)
         
-        # Add file
-        cmd.append(file_path)
+        # Add files (croc reads stdin when given none)
+        if not archive:
+            cmd.extend(paths)
         
-        # 디버깅을 위한 로그 출력
-        print(f"[DEBUG] 실행 명령어: {' '.join(cmd)}")
+        log.debug("실행 명령어: %s", LazyLines(cmd, " "))
         
+        process = None
+        producer = None
         try:
-            # Start process
+            # Start process (raw, unbuffered pipe so progress redraws arrive immediately)
             process = subprocess.Popen(
                 cmd,
+                stdin=subprocess.PIPE if archive else None,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
-                universal_newlines=True
+                bufsize=0
             )
+            self._track_process(process, transfer_id)
+            
+            if archive:
+                # croc은 표준 입력을 다 받은 뒤에 크기를 알리므로 그동안 묶은 양을 알림
+                if members is not None:
+                    archive_size = sum(os.path.getsize(path) for path, _ in members)
+                else:
+                    archive_size = sum(path_size(path) for path in paths)
+                producer = ArchiveProducer(
+                    paths,
+                    process.stdin,
+                    progress=(lambda written: callback({
+                        "status": "archiving", "archived": written, "archive_size": archive_size
+                    })) if callback else None,
+                    abort=process.terminate,
+                    members=members
+                )
+                producer.start()
             
             code_phrase = None
-            waiting_for_receiver = False
+            last_error = None
             connection_established = False
+            parser = CrocOutputParser(self.version, emit_lines=True)
+            transcript_key = transfer_id or code or paths[0]
+            transcript = self.transcripts.open(transcript_key)
+            
+            # croc draws one progress bar per file; fold them into one overall value
+            total_files = 1 if archive else len(paths) if all(os.path.isfile(p) for p in paths) else None
+            total_size = None
+            files_done = 0
+            current_file = None
             
             # Process output
-            for line in iter(process.stdout.readline, ''):
-                line = line.strip()
-                print(f"[DEBUG] croc 출력: {line}")  # 디버깅 로그
+            for event in self._read_events(process, parser, transcript):
+                if isinstance(event, ProgressEvent):
+                    if current_file is not None and event.name != current_file:
+                        files_done += 1
+                    current_file = event.name
+                    
+                    if callback:
+                        callback(dict(
+                            _progress_numbers(event, total_size),
+                            status="transferring",
+                            progress=_overall_progress(files_done, total_files, event.percent),
+                            file=event.name,
+                            code=code_phrase
+                        ))
+                
+                elif isinstance(event, FileInfoEvent):
+                    announced = _announced_file_count(event.name)
+                    if announced:
+                        total_files = announced
+                    total_size = parse_size(event.size)
                 
-                # Try to extract code phrase
-                if "Code is:" in line:
-                    code_phrase = line.split("Code is:")[1].strip()
+                elif isinstance(event, CodeEvent):
+                    code_phrase = event.code
                     # 코드 생성 후 대기 상태로 전환
-                    waiting_for_receiver = True
-                    
                     if callback:
                         callback({
                             "status": "waiting",
@@ -97,12 +288,7 @@ class CrocUtils:
                             "message": "Waiting for receiver to connect..."
                         })
                 
-                # Check for connection with receiver patterns
-                elif (("Sending" in line and ("MB" in line or "KB" in line or "B)" in line)) or 
-                      "Connection established" in line or
-                      "Exchanged" in line):
-                    waiting_for_receiver = False
-                    
+                elif isinstance(event, ConnectedEvent):
                     if not connection_established:
                         connection_established = True
                         if callback:
@@ -112,41 +298,7 @@ class CrocUtils:
                                 "message": "Connection established, starting transfer..."
                             })
                 
-                # Extract progress information - improve pattern matching
-                progress_match = re.search(r'(\d+\.\d+)%\s+(\d+\.\d+\s+\w+\/s)', line)
-                if progress_match:
-                    percent = float(progress_match.group(1))
-                    speed = progress_match.group(2)
-                    
-                    if callback:
-                        print(f"[DEBUG] 진행률 업데이트: {percent}%, 속도: {speed}")  # 디버깅 로그
-                        callback({
-                            "status": "transferring",
-                            "progress": percent,
-                            "speed": speed,
-                            "code": code_phrase
-                        })
-                # Alternative progress pattern
-                elif "%" in line and "/" in line:
-                    # Try to find percent and speed in alternative format
-                    alt_progress = re.search(r'(\d+)%', line)
-                    alt_speed = re.search(r'(\d+\.\d+\s+\w+\/s)', line)
-                    
-                    if alt_progress:
-                        percent = float(alt_progress.group(1))
-                        speed = alt_speed.group(1) if alt_speed else "N/A"
-                        
-                        if callback:
-                            print(f"[DEBUG] 대체 패턴 진행률: {percent}%, 속도: {speed}")  # 디버깅 로그
-                            callback({
-                                "status": "transferring",
-                                "progress": percent,
-                                "speed": speed,
-                                "code": code_phrase
-                            })
-                            
-                # Check for completion
-                if "File sent" in line or "Sent" in line:
+                elif isinstance(event, CompletedEvent):
                     if callback:
                         callback({
                             "status": "completed",
@@ -154,44 +306,46 @@ class CrocUtils:
                             "code": code_phrase
                         })
                 
-                # Check for errors
-                if "Error:" in line:
-                    error_message = line
+                elif isinstance(event, ErrorEvent):
+                    last_error = event.message
                     if callback:
                         callback({
                             "status": "error",
-                            "message": error_message,
+                            "message": event.message,
                             "code": code_phrase
                         })
             
             # Wait for process to complete
             process.wait()
-            print(f"[DEBUG] 프로세스 종료 코드: {process.returncode}")  # 디버깅 로그
+            log.debug("프로세스 종료 코드: %s", process.returncode)
+            failure_message = "Transfer failed with unknown error"
+            if producer is not None:
+                producer.join()
+                if producer.error is not None:
+                    # 묶는 중 실패하면 croc을 먼저 종료하므로 잘린 묶음은 전송되지 않음
+                    failure_message = last_error = f"Archive failed: {producer.error}"
+            if process.returncode != 0:
+                self._log_failure(transcript_key, process.returncode)
             
-            # 추가: 전송 후 잠시 대기하여 리소스 정리
-            try:
-                time.sleep(0.5)  # 0.5초 대기
-            except:
-                pass
-                
             # 콜백 호출 전 검증
             if process.returncode != 0 and callback:
                 try:
                     callback({
                         "status": "error",
-                        "message": "Transfer failed with unknown error",
+                        "message": failure_message,
                         "code": code_phrase
                     })
                 except Exception as e:
-                    print(f"[DEBUG] 에러 콜백 호출 오류: {str(e)}")
+                    log.warning("에러 콜백 호출 오류: %s", e)
             
             return {
                 "code": code_phrase,
                 "status": "completed" if process.returncode == 0 else "error",
-                "returncode": process.returncode
+                "returncode": process.returncode,
+                "error": last_error
             }
         except Exception as e:
-            print(f"[DEBUG] 예외 발생: {str(e)}")  # 디버깅 로그
+            log.exception("croc 전송 예외 발생")
             if callback:
                 try:
                     callback({
@@ -200,13 +354,20 @@ class CrocUtils:
                         "code": code
                     })
                 except Exception as cb_error:
-                    print(f"[DEBUG] 예외 콜백 호출 오류: {str(cb_error)}")
+                    log.warning("예외 콜백 호출 오류: %s", cb_error)
             raise
+        finally:
+            # 읽는 중 예외가 나도 croc과 묶음 스레드를 남기지 않음
+            if process is not None:
+                self._reap(process)
+                self._untrack_process(process)
+            if producer is not None and producer.is_alive():
+                producer.join()
     
-    def receive_file(self, code, destination=None, callback=None):
+    def receive_file(self, code, destination=None, callback=None, transfer_id=None):
         """Receive a file using croc"""
         # Build command
-        cmd = ["croc", code, "--yes"]  # 자동 승인 옵션 추가
+        cmd = [self.binary, code, "--yes"]  # 자동 승인 옵션 추가
         
         # Add destination if specified
         if destination:
@@ -217,53 +378,62 @@ class CrocUtils:
             if save_dir:
                 cmd.extend(["--out", save_dir])
         
-        # 디버깅을 위한 로그 출력
-        print(f"[DEBUG] 수신 명령어: {' '.join(cmd)}")
+        log.debug("수신 명령어: %s", LazyLines(cmd, " "))
         
-        # Start process
+        # Start process (raw, unbuffered pipe so progress redraws arrive immediately)
         process = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
             stdin=subprocess.PIPE,  # stdin 추가하여 사용자 입력을 처리할 수 있도록 함
-            text=True,
-            bufsize=1,
-            universal_newlines=True
+            bufsize=0
         )
+        self._track_process(process, transfer_id)
         
         received_file = None
+        received_size = None
+        last_error = None
         connection_established = False
-        transfer_started = False
+        completed_sent = False
+        parser = CrocOutputParser(self.version, emit_lines=True)
+        transcript_key = transfer_id or code
+        transcript = self.transcripts.open(transcript_key)
         
         try:
             # Process output
-            for line in iter(process.stdout.readline, ''):
-                line = line.strip()
-                print(f"[DEBUG] croc 수신 출력: {line}")  # 디버깅 로그
+            for event in self._read_events(process, parser, transcript):
+                if isinstance(event, ProgressEvent):
+                    if callback:
+                        callback(dict(
+                            _progress_numbers(event, received_size),
+                            status="receiving",
+                            progress=event.percent,
+                            file=received_file
+                        ))
                 
                 # 파일 수신 확인 메시지 확인
-                if "Accept" in line and "?" in line:
+                elif isinstance(event, PromptEvent):
                     # 이 부분은 "--yes" 옵션으로 인해 더 이상 필요하지 않지만, 혹시 모를 경우에 대비
                     if callback:
                         try:
                             callback({
                                 "status": "confirmation",
-                                "message": line,
+                                "message": event.message,
                                 "file": received_file
                             })
                         except Exception as e:
-                            print(f"[DEBUG] 확인 콜백 오류: {str(e)}")
+                            log.warning("확인 콜백 오류: %s", e)
                             
                     # 자동으로 'y' 입력 (승인)
                     try:
-                        process.stdin.write("y\n")
+                        process.stdin.write(b"y\n")
                         process.stdin.flush()
-                        print("[DEBUG] 파일 수신 자동 승인됨")
+                        log.debug("파일 수신 자동 승인됨")
                     except Exception as e:
-                        print(f"[DEBUG] 파일 수신 자동 승인 실패: {str(e)}")
+                        log.warning("파일 수신 자동 승인 실패: %s", e)
                 
                 # Check for connection establishment
-                if "Connection" in line or "Joined" in line or "Requesting" in line:
+                elif isinstance(event, ConnectedEvent):
                     if not connection_established:
                         connection_established = True
                         if callback:
@@ -273,58 +443,24 @@ class CrocUtils:
                                     "message": "Connecting to sender..."
                                 })
                             except Exception as e:
-                                print(f"[DEBUG] 연결 콜백 오류: {str(e)}")
-                
-                # Try to extract file name
-                if "Receiving" in line:
-                    match = re.search(r'Receiving (.+) \(', line)
-                    if match:
-                        received_file = match.group(1)
-                        transfer_started = True
-                        
-                        if callback:
-                            callback({
-                                "status": "receiving",
-                                "message": f"Receiving file: {received_file}",
-                                "file": received_file,
-                                "progress": 0
-                            })
+                                log.warning("연결 콜백 오류: %s", e)
                 
-                # Extract progress information - improve pattern matching
-                progress_match = re.search(r'(\d+\.\d+)%\s+(\d+\.\d+\s+\w+\/s)', line)
-                if progress_match:
-                    percent = float(progress_match.group(1))
-                    speed = progress_match.group(2)
-                    
+                # File name announced by the sender
+                elif isinstance(event, FileInfoEvent):
+                    received_file = event.name
+                    received_size = parse_size(event.size)
                     if callback:
-                        print(f"[DEBUG] 수신 진행률 업데이트: {percent}%, 속도: {speed}")  # 디버깅 로그
                         callback({
                             "status": "receiving",
-                            "progress": percent,
-                            "speed": speed,
-                            "file": received_file
+                            "message": f"Receiving file: {received_file}",
+                            "file": received_file,
+                            "size": received_size,
+                            "progress": 0
                         })
-                # Alternative progress pattern
-                elif "%" in line and "/" in line:
-                    # Try to find percent and speed in alternative format
-                    alt_progress = re.search(r'(\d+)%', line)
-                    alt_speed = re.search(r'(\d+\.\d+\s+\w+\/s)', line)
-                    
-                    if alt_progress:
-                        percent = float(alt_progress.group(1))
-                        speed = alt_speed.group(1) if alt_speed else "N/A"
-                        
-                        if callback:
-                            print(f"[DEBUG] 대체 패턴 수신 진행률: {percent}%, 속도: {speed}")  # 디버깅 로그
-                            callback({
-                                "status": "receiving",
-                                "progress": percent,
-                                "speed": speed,
-                                "file": received_file
-                            })
                 
                 # Check for completion
-                if "Received" in line or "saved" in line:
+                elif isinstance(event, CompletedEvent):
+                    completed_sent = True
                     if callback:
                         callback({
                             "status": "completed",
@@ -333,34 +469,31 @@ class CrocUtils:
                         })
                 
                 # Check for errors
-                if "Error:" in line or "error" in line.lower():
-                    error_message = line
+                elif isinstance(event, ErrorEvent):
+                    last_error = event.message
                     if callback:
                         callback({
                             "status": "error",
-                            "message": error_message,
+                            "message": event.message,
                         })
             
             # 프로세스 완료 대기
             process.wait()
-            print(f"[DEBUG] 수신 프로세스 종료 코드: {process.returncode}")
+            log.debug("수신 프로세스 종료 코드: %s", process.returncode)
+            if process.returncode != 0:
+                self._log_failure(transcript_key, process.returncode)
             
-            # 추가: 수신 후 잠시 대기하여 리소스 정리
-            try:
-                time.sleep(0.5)  # 0.5초 대기
-            except:
-                pass
-                
             # 콜백 호출 안전하게 처리
             if callback:
                 try:
-                    # 정상 종료 시 완료 콜백
+                    # 정상 종료 시 완료 콜백 (출력에서 이미 완료를 알린 경우 제외)
                     if process.returncode == 0:
-                        callback({
-                            "status": "completed",
-                            "message": "File received successfully",
-                            "file": received_file
-                        })
+                        if not completed_sent:
+                            callback({
+                                "status": "completed",
+                                "message": "File received successfully",
+                                "file": received_file
+                            })
                     # 오류 발생 시 오류 콜백
                     else:
                         callback({
@@ -369,16 +502,17 @@ class CrocUtils:
                             "returncode": process.returncode
                         })
                 except Exception as e:
-                    print(f"[DEBUG] 수신 완료 콜백 오류: {str(e)}")
+                    log.warning("수신 완료 콜백 오류: %s", e)
             
             return {
                 "status": "completed" if process.returncode == 0 else "error",
                 "file": received_file,
-                "returncode": process.returncode
+                "returncode": process.returncode,
+                "error": last_error
             }
             
         except Exception as e:
-            print(f"[DEBUG] 수신 예외 발생: {str(e)}")
+            log.exception("croc 수신 예외 발생")
             if callback:
                 try:
                     callback({
@@ -386,5 +520,8 @@ class CrocUtils:
                         "message": f"Exception: {str(e)}"
                     })
                 except Exception as cb_error:
-                    print(f"[DEBUG] 수신 예외 콜백 오류: {str(cb_error)}")
-            raise 
\ No newline at end of file
+                    log.warning("수신 예외 콜백 오류: %s", cb_error)
+            raise
+        finally:
+            self._reap(process)
+            self._untrack_process(process)
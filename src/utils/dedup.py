@@ -0,0 +1,264 @@
+"""Leaving out files a recipient already has.
+
+Every completed send to a named recipient records the digests of its files
+in the history store's delivered index (see HistoryStore.mark_delivered).
+A send with dedup on hashes its files first (hashing.py), drops those whose
+content that recipient has already received, and sends the rest together
+with a small JSON manifest listing every file of the selection with its
+digest. The receiving side checks the files the manifest says were left
+out against what it has on disk (``verify_manifest``).
+
+croc lays out a folder argument as a whole. When only some files of a
+selected folder are left out, the rest are passed as its untouched
+subfolders and single files (``send_arguments``), which land at the top
+of the receiving folder. The manifest is always its own top-level path,
+except when the send is one tar (archive_stream.py): then a split folder
+keeps its structure inside the tar and the manifest goes in with it.
+"""
+import json
+import os
+import secrets
+import time
+from dataclasses import dataclass, field
+
+from src.utils.hashing import ALGORITHM, FileHasher
+
+MANIFEST_PREFIX = "sirodrop-manifest-"
+MANIFEST_FORMAT = "sirodrop-manifest"
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class DedupPlan:
+    """Which files of a selection to send and which the recipient already has"""
+    send: list = field(default_factory=list)
+    # (FileDigest, name it was delivered under before)
+    skipped: list = field(default_factory=list)
+
+    @property
+    def sent_bytes(self):
+        return sum(item.size for item in self.send)
+
+    @property
+    def skipped_bytes(self):
+        return sum(item.size for item, _ in self.skipped)
+
+
+def plan_dedup(digests, delivered):
+    """Split FileDigests by whether ``delivered`` (digest -> name) has their content"""
+    plan = DedupPlan()
+    for item in digests:
+        if item.digest in delivered:
+            plan.skipped.append((item, delivered[item.digest]))
+        else:
+            plan.send.append(item)
+    return plan
+
+
+def send_arguments(paths, plan, archive=False):
+    """(paths for croc, tar members or None) that send exactly ``plan.send``
+
+    Selected items that lose no files are passed whole; items that lose
+    all of them are dropped. A folder that loses only some is split: its
+    subfolders that lose nothing are passed whole and its other remaining
+    files one by one. croc puts every path at the top of the receiving
+    folder, so the ``plan.send`` items in a split folder are renamed to
+    where they will land. If two paths would land under the same name,
+    the folder is passed whole instead and its left-out files go back
+    into ``plan.send``.
+
+    With ``archive`` a split folder is sent as (path, name) tar members
+    that keep the folder structure, since everything goes as one tar.
+    """
+    skipped = {item.path for item, _ in plan.skipped}
+    sending = {item.path: item for item in plan.send}
+    skipped_dirs = _parents(skipped)
+    sending_dirs = _parents(sending)
+
+    paths = [os.path.abspath(path) for path in paths]
+    kept = []
+    taken = {os.path.basename(path.rstrip(os.sep)) for path in paths if path not in skipped_dirs}
+    split = False
+    for path in paths:
+        if not os.path.isdir(path):
+            if path not in skipped:
+                kept.append(path)
+            continue
+        if path not in skipped_dirs:
+            kept.append(path)
+            continue
+        if path not in sending_dirs:
+            continue
+        if archive:
+            split = True
+            continue
+        parts = _split_folder(path, skipped_dirs, sending_dirs, sending)
+        names = [os.path.basename(part) for part in parts]
+        if len(set(names)) != len(names) or taken.intersection(names):
+            _unskip(plan, path)
+            taken.add(os.path.basename(path))
+            kept.append(path)
+            continue
+        taken.update(names)
+        kept.extend(parts)
+        _rename_below(path, parts, sending)
+
+    if split:
+        return [item.path for item in plan.send], [(item.path, item.name) for item in plan.send]
+    return kept, None
+
+
+def _parents(file_paths):
+    """Every folder that contains one of ``file_paths``, at any depth"""
+    parents = set()
+    for path in file_paths:
+        parent = os.path.dirname(path)
+        while parent not in parents and parent != os.path.dirname(parent):
+            parents.add(parent)
+            parent = os.path.dirname(parent)
+    return parents
+
+
+def _split_folder(folder, skipped_dirs, sending_dirs, sending):
+    """Paths below ``folder`` that together hold exactly its files to send"""
+    parts = []
+    stack = [folder]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path not in sending_dirs:
+                            continue
+                        if entry.path in skipped_dirs:
+                            stack.append(entry.path)
+                        else:
+                            parts.append(entry.path)
+                    elif entry.path in sending:
+                        parts.append(entry.path)
+        except OSError:
+            continue
+    return sorted(parts)
+
+
+def _rename_below(folder, parts, sending):
+    """Name the files to send in a split ``folder`` as croc lays out ``parts``"""
+    parts = set(parts)
+    prefix = folder + os.sep
+    for path, item in sending.items():
+        if not path.startswith(prefix):
+            continue
+        part = path
+        while part not in parts:
+            part = os.path.dirname(part)
+        item.name = os.path.relpath(path, os.path.dirname(part)).replace(os.sep, "/")
+
+
+def _unskip(plan, folder):
+    """Move the left-out files of ``folder`` back into ``plan.send``"""
+    prefix = folder.rstrip(os.sep) + os.sep
+    back = [item for item, _ in plan.skipped if item.path.startswith(prefix)]
+    plan.skipped = [(item, name) for item, name in plan.skipped if not item.path.startswith(prefix)]
+    plan.send.extend(back)
+    plan.send.sort(key=lambda item: item.name)
+
+
+def write_manifest(directory, plan, recipient):
+    """Write the manifest of a deduplicated send into ``directory``; returns its path"""
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "version": MANIFEST_VERSION,
+        "algorithm": ALGORITHM,
+        "recipient": recipient,
+        "created": time.time(),
+        "sent": [{"name": item.name, "size": item.size, "digest": item.digest} for item in plan.send],
+        "skipped": [
+            dict({"name": item.name, "size": item.size, "digest": item.digest},
+                 **({"delivered_as": name} if name and name != item.name else {}))
+            for item, name in plan.skipped
+        ],
+    }
+    # Unique, so a receiver keeps the manifests of several sends apart
+    path = os.path.join(directory, f"{MANIFEST_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return path
+
+
+def manifest_snapshot(directory):
+    """Identity of the manifests in a folder, to tell which ones a receive added"""
+    snapshot = set()
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(MANIFEST_PREFIX) and entry.name.endswith(".json"):
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot.add((entry.name, st.st_ino, st.st_size, st.st_mtime_ns))
+    except OSError:
+        pass
+    return snapshot
+
+
+@dataclass
+class ManifestCheck:
+    """Result of checking the left-out files of a manifest"""
+    manifest: str
+    present: int = 0
+    present_bytes: int = 0
+    # Names that are missing or whose content differs
+    missing: list = field(default_factory=list)
+
+
+def verify_manifest(path, root=None, hasher=None):
+    """Check that the files a manifest left out are under ``root`` (default: its folder)
+
+    A file counts if its digest matches under its name or under the name
+    it was delivered with before. Raises ValueError for a file that is not
+    a manifest.
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if not isinstance(manifest, dict) or manifest.get("format") != MANIFEST_FORMAT:
+        raise ValueError(f"not a Sirodrop manifest: {path}")
+    if manifest.get("algorithm") != ALGORITHM:
+        raise ValueError(f"unsupported checksum algorithm: {manifest.get('algorithm')}")
+    root = root or os.path.dirname(os.path.abspath(path))
+    hasher = hasher or FileHasher()
+
+    entries = manifest.get("skipped", ())
+    candidates = []
+    for entry in entries:
+        names = [entry["name"]] + ([entry["delivered_as"]] if entry.get("delivered_as") else [])
+        local = [os.path.abspath(os.path.join(root, *name.split("/"))) for name in names]
+        candidates.append([
+            local_path for local_path in local
+            if os.path.isfile(local_path) and os.path.getsize(local_path) == entry["size"]
+        ])
+    # Hash every candidate in one parallel pass
+    digests = {
+        item.path: item.digest
+        for item in hasher.hash_paths({local_path for paths in candidates for local_path in paths})
+    }
+
+    check = ManifestCheck(os.path.abspath(path))
+    for entry, paths in zip(entries, candidates):
+        if any(digests.get(local_path) == entry["digest"] for local_path in paths):
+            check.present += 1
+            check.present_bytes += entry["size"]
+        else:
+            check.missing.append(entry["name"])
+    return check
+
+
+def verify_new_manifests(directory, before, hasher=None):
+    """ManifestCheck for every manifest that appeared in ``directory`` since ``before``"""
+    checks = []
+    for name, *_ in sorted(manifest_snapshot(directory) - before):
+        try:
+            checks.append(verify_manifest(os.path.join(directory, name), directory, hasher))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            checks.append(ManifestCheck(os.path.join(directory, name), missing=[f"({e})"]))
+    return checks
@@ -0,0 +1,318 @@
+"""Content checksums of the files in a transfer.
+
+``FileHasher`` hashes files on a thread pool with BLAKE2b (hashlib, so no
+extra dependency; it releases the GIL on large buffers, so the threads
+really run in parallel). Files of ``MMAP_THRESHOLD`` bytes or more are
+memory-mapped and fed to the hash in ``HASH_CHUNK`` slices; smaller ones
+are read in one go.
+
+Digests are remembered in a SQLite cache (``~/.siro/hashes.db``) keyed by
+(st_dev, st_ino, size, mtime_ns), so sending an unchanged file again costs
+one stat and one lookup. A file whose mtime is within ``RACY_WINDOW``
+seconds of the moment it was hashed is not cached: it could still change
+without its mtime moving on filesystems with coarse timestamps.
+"""
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+
+from src.utils.logger import get_logger
+from src.utils.manifest import ScanCancelled
+
+log = get_logger("hashing")
+
+ALGORITHM = "blake2b-256"
+HASH_CHUNK = 4 * 1024 * 1024
+MMAP_THRESHOLD = 1024 * 1024
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+PROGRESS_INTERVAL = 0.5
+RACY_WINDOW = 2.0
+# Cache rows not written for this long are dropped when the cache is opened
+CACHE_MAX_AGE = 180 * 24 * 3600
+BUSY_TIMEOUT_MS = 5000
+
+
+def new_hash():
+    return hashlib.blake2b(digest_size=32)
+
+
+@dataclass(slots=True)
+class FileDigest:
+    """Checksum of one file; ``name`` is its path as the receiver sees it"""
+    path: str
+    name: str
+    size: int
+    digest: str
+    cached: bool = False
+
+
+@dataclass(slots=True)
+class HashProgress:
+    """Running totals of a hashing pass (cached files count as done)"""
+    files: int = 0
+    total_files: int = 0
+    bytes: int = 0
+    total_bytes: int = 0
+    cached_files: int = 0
+    complete: bool = False
+
+    def copy(self):
+        return HashProgress(
+            self.files, self.total_files, self.bytes, self.total_bytes, self.cached_files, self.complete
+        )
+
+
+def list_files(paths, cancelled=None):
+    """(path, name, stat) of every regular file in ``paths``
+
+    Folders are walked without following symlinked folders. Names are
+    relative to each selected item's parent, with "/" separators, the way
+    croc lays them out on the other side.
+    """
+    files = []
+    for path in paths:
+        path = os.path.abspath(path)
+        base = os.path.dirname(path.rstrip(os.sep)) or path
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            log.warning("cannot hash %s: %s", path, e)
+            continue
+        if not os.path.isdir(path):
+            files.append((path, os.path.basename(path), st))
+            continue
+        stack = [path]
+        while stack:
+            if cancelled is not None and cancelled():
+                raise ScanCancelled()
+            try:
+                with os.scandir(stack.pop()) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                                continue
+                            if not entry.is_file():
+                                continue
+                            entry_st = entry.stat()
+                        except OSError:
+                            continue
+                        name = os.path.relpath(entry.path, base).replace(os.sep, "/")
+                        files.append((entry.path, name, entry_st))
+            except OSError:
+                continue
+    return files
+
+
+def hash_file(path, on_bytes=None, cancelled=None):
+    """Hex digest of a file; ``on_bytes(n)`` is called as data is hashed"""
+    h = new_hash()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # e.g. a filesystem that cannot map files
+                mapped = None
+            if mapped is not None:
+                with mapped, memoryview(mapped) as view:
+                    for offset in range(0, len(view), HASH_CHUNK):
+                        if cancelled is not None and cancelled():
+                            raise ScanCancelled()
+                        chunk = view[offset:offset + HASH_CHUNK]
+                        h.update(chunk)
+                        chunk.release()
+                        if on_bytes is not None:
+                            on_bytes(min(HASH_CHUNK, len(view) - offset))
+                return h.hexdigest()
+        while True:
+            if cancelled is not None and cancelled():
+                raise ScanCancelled()
+            data = f.read(HASH_CHUNK)
+            if not data:
+                return h.hexdigest()
+            h.update(data)
+            if on_bytes is not None:
+                on_bytes(len(data))
+
+
+def content_digest(digests):
+    """One digest over the names and digests of a whole transfer"""
+    h = new_hash()
+    for item in sorted(digests, key=lambda item: item.name):
+        h.update(f"{item.name}\0{item.digest}\n".encode("utf-8", "surrogateescape"))
+    return h.hexdigest()
+
+
+def _cache_key(st):
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class HashCache:
+    """Persistent (dev, inode, size, mtime_ns) -> digest map
+
+    Shared by every thread of the process behind a lock and by other
+    processes through SQLite's locking, like the history store.
+    """
+
+    def __init__(self, path, algorithm=ALGORITHM):
+        self.path = path
+        self.algorithm = algorithm
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS digests (
+                    dev INTEGER NOT NULL,
+                    ino INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    algorithm TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    hashed_at REAL NOT NULL,
+                    PRIMARY KEY (dev, ino, size, mtime_ns, algorithm)
+                ) WITHOUT ROWID"""
+            )
+            conn.execute("DELETE FROM digests WHERE hashed_at < ?", (time.time() - CACHE_MAX_AGE,))
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, stats):
+        """Cached digest for each stat result (None where unknown)"""
+        sql = ("SELECT digest FROM digests WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? "
+               "AND algorithm = ?")
+        with self._lock:
+            conn = self._connection()
+            found = []
+            for st in stats:
+                # Some filesystems report no inode numbers; those files are never cached
+                row = conn.execute(sql, _cache_key(st) + (self.algorithm,)).fetchone() if st.st_ino else None
+                found.append(row[0] if row else None)
+        return found
+
+    def store(self, items):
+        """Remember (stat, digest) pairs"""
+        rows = [_cache_key(st) + (self.algorithm, digest, time.time()) for st, digest in items if st.st_ino]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_hasher(config):
+    """FileHasher using the cache in the config folder, or None if checksums are turned off"""
+    if not config.get_value("hash_transfers", True):
+        return None
+    return FileHasher(HashCache(config.hash_db), config.get_value("hash_workers", DEFAULT_WORKERS))
+
+
+class FileHasher:
+    """Hashes the files of a selection in parallel, reusing cached digests"""
+
+    def __init__(self, cache=None, workers=DEFAULT_WORKERS):
+        self.cache = cache
+        self.workers = max(1, int(workers or DEFAULT_WORKERS))
+
+    def hash_paths(self, paths, progress=None, interval=PROGRESS_INTERVAL, cancelled=None):
+        """FileDigest of every file in ``paths`` (files and folders)
+
+        ``progress(HashProgress)`` is called on the calling thread every
+        ``interval`` seconds and once at the end. ``cancelled()`` aborts
+        with ScanCancelled. Unreadable files are logged and left out.
+        """
+        files = list_files(paths, cancelled)
+        totals = HashProgress(total_files=len(files), total_bytes=sum(st.st_size for _, _, st in files))
+        cached = self.cache.lookup([st for _, _, st in files]) if self.cache is not None else [None] * len(files)
+
+        results = []
+        todo = []
+        for (path, name, st), digest in zip(files, cached):
+            if digest is None:
+                todo.append((path, name, st))
+                continue
+            results.append(FileDigest(path, name, st.st_size, digest, cached=True))
+            totals.files += 1
+            totals.bytes += st.st_size
+            totals.cached_files += 1
+
+        stop = threading.Event()
+        lock = threading.Lock()
+
+        def add_bytes(count):
+            with lock:
+                totals.bytes += count
+
+        def hash_one(path, st):
+            digest = hash_file(path, add_bytes, stop.is_set)
+            after = os.stat(path)
+            # Changed while being read, or could still change unnoticed: don't cache
+            cacheable = (_cache_key(after) == _cache_key(st)
+                         and time.time() - after.st_mtime_ns / 1e9 > RACY_WINDOW)
+            return digest, after, cacheable
+
+        last_report = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hash") as pool:
+            pending = {pool.submit(hash_one, path, st): (path, name, st) for path, name, st in todo}
+            try:
+                while pending:
+                    done, _ = wait(pending, timeout=interval, return_when=FIRST_COMPLETED)
+                    if cancelled is not None and cancelled():
+                        raise ScanCancelled()
+                    fresh = []
+                    for future in done:
+                        path, name, st = pending.pop(future)
+                        try:
+                            digest, after, cacheable = future.result()
+                        except OSError as e:
+                            log.warning("cannot hash %s: %s", path, e)
+                            continue
+                        results.append(FileDigest(path, name, after.st_size, digest))
+                        with lock:
+                            totals.files += 1
+                        if cacheable:
+                            fresh.append((after, digest))
+                    if fresh and self.cache is not None:
+                        self.cache.store(fresh)
+                    now = time.monotonic()
+                    if progress is not None and now - last_report >= interval:
+                        last_report = now
+                        with lock:
+                            snapshot = totals.copy()
+                        progress(snapshot)
+            finally:
+                # Workers still running see this between chunks
+                stop.set()
+                for future in pending:
+                    future.cancel()
+
+        totals.complete = True
+        if progress is not None:
+            progress(totals.copy())
+        results.sort(key=lambda item: item.name)
+        return results
@@ -0,0 +1,88 @@
+"""Search queries over the transfer history.
+
+A query is free text plus optional filters, for example::
+
+    report >1MB <2GB from:2025-01-01 to:2025-03-31 "meeting notes"
+
+Words (or quoted phrases) must all appear in the file name, code or peer.
+The index is trigram based, so words shorter than ``MIN_TERM_LENGTH`` are
+ignored. ``>``/``<`` (also ``>=``/``<=``) bound the size, and
+``from:``/``to:`` bound the date (``to:`` includes that whole day).
+"""
+import re
+from datetime import datetime, timedelta
+
+from src.utils.units import parse_size
+
+MIN_TERM_LENGTH = 3
+
+_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+_SIZE_RE = re.compile(r"^([<>]=?)(.+)$")
+_DATE_PREFIXES = {"from:": "since", "since:": "since", "to:": "until", "until:": "until"}
+
+
+def _parse_date(text):
+    try:
+        return datetime.strptime(text, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def parse_search(text):
+    """Turn the search bar text into a search dict (None when it filters nothing)"""
+    search = {"terms": []}
+    for match in _TOKEN_RE.finditer(text or ""):
+        phrase, token = match.groups()
+        if phrase is not None:
+            if len(phrase.strip()) >= MIN_TERM_LENGTH:
+                search["terms"].append(phrase.strip())
+            continue
+
+        size = _SIZE_RE.match(token)
+        value = parse_size(size.group(2)) if size else None
+        if value is not None:
+            operator = size.group(1)
+            strict = len(operator) == 1
+            if operator.startswith(">"):
+                search["min_size"] = value + 1 if strict else value
+            else:
+                search["max_size"] = value - 1 if strict else value
+            continue
+
+        prefix = next((p for p in _DATE_PREFIXES if token.lower().startswith(p)), None)
+        if prefix:
+            date = _parse_date(token[len(prefix):])
+            if date is not None:
+                if _DATE_PREFIXES[prefix] == "since":
+                    search["since"] = date.timestamp()
+                else:
+                    search["until"] = (date + timedelta(days=1)).timestamp()
+            continue
+
+        if len(token) >= MIN_TERM_LENGTH:
+            search["terms"].append(token)
+
+    if not search["terms"]:
+        del search["terms"]
+    return search or None
+
+
+def matches_search(entry, search):
+    """Whether an entry satisfies a search dict (the same rules the store applies in SQL)"""
+    if not search:
+        return True
+    for term in search.get("terms", ()):
+        term = term.casefold()
+        if not any(term in (entry.get(column) or "").casefold() for column in ("file_name", "code", "peer")):
+            return False
+    size = entry.get("size")
+    if "min_size" in search and (size is None or size < search["min_size"]):
+        return False
+    if "max_size" in search and (size is None or size > search["max_size"]):
+        return False
+    timestamp = entry.get("timestamp") or 0
+    if "since" in search and timestamp < search["since"]:
+        return False
+    if "until" in search and timestamp >= search["until"]:
+        return False
+    return True
@@ -0,0 +1,257 @@
+"""Transfer statistics kept up to date inside the history database.
+
+Every recorded transfer adds to one ``stats_daily`` row (per local day and
+direction) and to log-scale histogram buckets for its throughput and
+connect time. Triggers on the transfers table do this in the same
+transaction as the insert, and take the share out again on delete or
+update, so the rollups stay right whichever process writes. Reading the
+dashboard touches one row per day and bucket, never the transfers.
+
+Percentiles come from the histograms: with ``BUCKETS_PER_OCTAVE`` buckets
+per doubling the estimate is within about 9% of the true value.
+
+Bulk writes (import, clear) pause the triggers with ``paused_stats`` and call
+``rebuild_stats`` for the days they touched, which is much cheaper than
+running the triggers row by row.
+"""
+import math
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+BUCKETS_PER_OCTAVE = 4
+# Bucket i covers [2 ** (i / 4), 2 ** ((i + 1) / 4)); this spans about
+# 1 ms (or 1 B/s) to 1 TB/s, values outside land in the end buckets
+LOWEST_BUCKET = -10 * BUCKETS_PER_OCTAVE
+HIGHEST_BUCKET = 40 * BUCKETS_PER_OCTAVE
+
+# Periods the dashboard can group by: SQL for a period's first day, given "day"
+PERIODS = {
+    "day": "day",
+    "week": "date(day, '-6 days', 'weekday 1')",
+}
+
+# While this meta key exists (only ever inside a write transaction) the triggers do nothing
+PAUSE_KEY = "stats_paused"
+_ACTIVE = f"WHEN NOT EXISTS (SELECT 1 FROM meta WHERE key = '{PAUSE_KEY}')"
+
+# Throughput leaves out the time spent waiting for the peer to connect
+_RATE_TIME = "({row}.duration - IFNULL({row}.connect_time, 0))"
+_METRICS = {
+    "rate": (
+        f"{{row}}.size / {_RATE_TIME}",
+        f"{{row}}.status IS 'completed' AND IFNULL({{row}}.size, 0) > 0 AND IFNULL({_RATE_TIME}, 0) > 0",
+    ),
+    "connect": (
+        "{row}.connect_time",
+        "{row}.connect_time IS NOT NULL",
+    ),
+}
+
+
+def _bucket_sql(value):
+    return (
+        f"IFNULL((SELECT bucket FROM stats_buckets WHERE lower <= {value} "
+        f"ORDER BY lower DESC LIMIT 1), {LOWEST_BUCKET})"
+    )
+
+
+def _share_sql(row, sign):
+    """Statements adding (sign 1) or taking out (sign -1) one transfer row"""
+    day = f"date({row}.timestamp, 'unixepoch', 'localtime')"
+    rate, rate_ok = (part.format(row=row) for part in _METRICS["rate"])
+    statements = [
+        f"""INSERT INTO stats_daily (day, direction, transfers, failures, bytes, rate_count, rate_sum)
+        VALUES (
+            {day}, {row}.direction, {sign}, {sign} * ({row}.status IS 'error'),
+            {sign} * (CASE WHEN {row}.status IS 'completed' THEN IFNULL({row}.size, 0) ELSE 0 END),
+            {sign} * ({rate_ok}), {sign} * (CASE WHEN {rate_ok} THEN {rate} ELSE 0 END)
+        )
+        ON CONFLICT (day, direction) DO UPDATE SET
+            transfers = transfers + excluded.transfers,
+            failures = failures + excluded.failures,
+            bytes = bytes + excluded.bytes,
+            rate_count = rate_count + excluded.rate_count,
+            rate_sum = rate_sum + excluded.rate_sum"""
+    ]
+    for metric, (value, valid) in _METRICS.items():
+        value, valid = value.format(row=row), valid.format(row=row)
+        statements.append(
+            f"""INSERT INTO stats_histogram (day, direction, metric, bucket, count)
+            SELECT {day}, {row}.direction, '{metric}', {_bucket_sql(value)}, {sign} WHERE {valid}
+            ON CONFLICT (day, direction, metric, bucket) DO UPDATE SET count = count + excluded.count"""
+        )
+    if sign < 0:
+        statements.append(
+            f"DELETE FROM stats_daily WHERE day = {day} AND direction = {row}.direction AND transfers = 0"
+        )
+    return "".join(f"{statement};\n" for statement in statements)
+
+
+def _rebuild_sql(where="1"):
+    """Statements adding the transfers matching ``where`` to the rollups"""
+    day = "date(timestamp, 'unixepoch', 'localtime')"
+    rate, rate_ok = (part.format(row="transfers") for part in _METRICS["rate"])
+    statements = [
+        f"""INSERT INTO stats_daily (day, direction, transfers, failures, bytes, rate_count, rate_sum)
+        SELECT {day} AS d, direction, COUNT(*), SUM(status IS 'error'),
+            SUM(CASE WHEN status IS 'completed' THEN IFNULL(size, 0) ELSE 0 END),
+            SUM({rate_ok}), SUM(CASE WHEN {rate_ok} THEN {rate} ELSE 0 END)
+        FROM transfers WHERE {where} GROUP BY d, direction"""
+    ]
+    for metric, (value, valid) in _METRICS.items():
+        value, valid = value.format(row="transfers"), valid.format(row="transfers")
+        statements.append(
+            f"""INSERT INTO stats_histogram (day, direction, metric, bucket, count)
+            SELECT {day} AS d, direction, '{metric}', {_bucket_sql(value)} AS b, COUNT(*)
+            FROM transfers WHERE ({where}) AND {valid} GROUP BY d, direction, b"""
+        )
+    return tuple(statements)
+
+
+STATS_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS stats_daily (
+        day TEXT NOT NULL,
+        direction TEXT NOT NULL,
+        transfers INTEGER NOT NULL,
+        failures INTEGER NOT NULL,
+        bytes INTEGER NOT NULL,
+        rate_count INTEGER NOT NULL,
+        rate_sum REAL NOT NULL,
+        PRIMARY KEY (day, direction)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS stats_histogram (
+        day TEXT NOT NULL,
+        direction TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (day, direction, metric, bucket)
+    ) WITHOUT ROWID""",
+    "CREATE TABLE IF NOT EXISTS stats_buckets (lower REAL PRIMARY KEY, bucket INTEGER NOT NULL) WITHOUT ROWID",
+    "INSERT OR IGNORE INTO stats_buckets (lower, bucket) VALUES " + ", ".join(
+        f"({2 ** (bucket / BUCKETS_PER_OCTAVE)!r}, {bucket})"
+        for bucket in range(LOWEST_BUCKET, HIGHEST_BUCKET + 1)
+    ),
+    *_rebuild_sql(),
+    f"""CREATE TRIGGER IF NOT EXISTS transfers_stats_insert AFTER INSERT ON transfers {_ACTIVE} BEGIN
+        {_share_sql("new", 1)}END""",
+    f"""CREATE TRIGGER IF NOT EXISTS transfers_stats_delete AFTER DELETE ON transfers {_ACTIVE} BEGIN
+        {_share_sql("old", -1)}END""",
+    f"""CREATE TRIGGER IF NOT EXISTS transfers_stats_update
+        AFTER UPDATE OF timestamp, direction, size, status, duration, connect_time ON transfers {_ACTIVE} BEGIN
+        {_share_sql("old", -1)}{_share_sql("new", 1)}END""",
+)
+
+
+_REBUILD_RANGE = _rebuild_sql("timestamp >= ? AND timestamp < ?")
+
+
+@contextmanager
+def paused_stats(conn):
+    """Turn the stats triggers off for the rest of the current write transaction"""
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, '1')", (PAUSE_KEY,))
+    try:
+        yield
+    finally:
+        conn.execute("DELETE FROM meta WHERE key = ?", (PAUSE_KEY,))
+
+
+def rebuild_stats(conn, timestamps=None):
+    """Recompute the rollups for the days containing ``timestamps`` (every day when None)"""
+    if timestamps is None:
+        conn.execute("DELETE FROM stats_daily")
+        conn.execute("DELETE FROM stats_histogram")
+        for statement in _rebuild_sql():
+            conn.execute(statement)
+        return
+    days = sorted({datetime.fromtimestamp(timestamp).date() for timestamp in timestamps})
+    if not days:
+        return
+    first, last = days[0].isoformat(), days[-1].isoformat()
+    conn.execute("DELETE FROM stats_daily WHERE day BETWEEN ? AND ?", (first, last))
+    conn.execute("DELETE FROM stats_histogram WHERE day BETWEEN ? AND ?", (first, last))
+    since = datetime.combine(days[0], time()).timestamp()
+    until = datetime.combine(days[-1] + timedelta(days=1), time()).timestamp()
+    for statement in _REBUILD_RANGE:
+        conn.execute(statement, (since, until))
+
+
+def bucket_value(bucket):
+    """Representative value of a histogram bucket (its geometric middle)"""
+    return 2 ** ((bucket + 0.5) / BUCKETS_PER_OCTAVE)
+
+
+def percentile(histogram, fraction):
+    """Estimate a percentile (0..1) from {bucket: count}; None when empty"""
+    total = sum(count for count in histogram.values() if count > 0)
+    if not total:
+        return None
+    rank = max(1, math.ceil(fraction * total))
+    seen = 0
+    for bucket in sorted(histogram):
+        if histogram[bucket] > 0:
+            seen += histogram[bucket]
+            if seen >= rank:
+                return bucket_value(bucket)
+    return bucket_value(max(histogram))
+
+
+def period_stats(conn, period="day", count=14):
+    """Totals for the latest ``count`` days or weeks that have transfers, newest first
+
+    Each item has period (first day, YYYY-MM-DD), sent_bytes,
+    received_bytes, transfers, failures, failure_rate, average_rate and
+    p95_rate (bytes/s over completed transfers) and median_connect
+    (seconds until the peers connected, over receives only: a send's wait
+    includes the receiver typing in the code).
+    """
+    key = PERIODS[period]
+    first_day = conn.execute(
+        f"SELECT MIN(p) FROM (SELECT DISTINCT {key} AS p FROM stats_daily ORDER BY p DESC LIMIT ?)",
+        (count,)
+    ).fetchone()[0]
+    if first_day is None:
+        return []
+
+    periods = {}
+    period_of_day = {}
+    for day, name, direction, transfers, failures, size, rate_count, rate_sum in conn.execute(
+        f"""SELECT day, {key}, direction, transfers, failures, bytes, rate_count, rate_sum
+        FROM stats_daily WHERE day >= ?""",
+        (first_day,)
+    ):
+        period_of_day[day] = name
+        stats = periods.setdefault(name, {
+            "period": name, "sent_bytes": 0, "received_bytes": 0, "transfers": 0, "failures": 0,
+            "rate_count": 0, "rate_sum": 0.0, "rate": {}, "connect": {},
+        })
+        stats["sent_bytes" if direction == "send" else "received_bytes"] += size
+        stats["transfers"] += transfers
+        stats["failures"] += failures
+        stats["rate_count"] += rate_count
+        stats["rate_sum"] += rate_sum
+
+    # Raw day rows, folded into periods here: cheaper than date() per row in SQL
+    for day, metric, bucket, total in conn.execute(
+        """SELECT day, metric, bucket, SUM(count) FROM stats_histogram
+        WHERE day >= ? AND (metric = 'rate' OR direction = 'receive')
+        GROUP BY day, metric, bucket""",
+        (first_day,)
+    ):
+        if day not in period_of_day:
+            continue
+        histogram = periods[period_of_day[day]][metric]
+        histogram[bucket] = histogram.get(bucket, 0) + total
+
+    result = []
+    for name in sorted(periods, reverse=True):
+        stats = periods[name]
+        if stats["transfers"] <= 0:
+            continue
+        rate_count, rate_sum = stats.pop("rate_count"), stats.pop("rate_sum")
+        stats["failure_rate"] = stats["failures"] / stats["transfers"]
+        stats["average_rate"] = rate_sum / rate_count if rate_count > 0 else None
+        stats["p95_rate"] = percentile(stats.pop("rate"), 0.95)
+        stats["median_connect"] = percentile(stats.pop("connect"), 0.5)
+        result.append(stats)
+    return result
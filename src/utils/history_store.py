@@ -0,0 +1,550 @@
+"""Transfer history kept in SQLite.
+
+Entries are appended as single rows, so recording a transfer costs the
+same with ten entries or a million, and readers load the page they show
+instead of the whole history. The database runs in WAL mode with a busy
+timeout, and writers take the write lock up front (``BEGIN IMMEDIATE``),
+so two app instances can record transfers at the same time. An existing
+``history.json`` is imported once and renamed out of the way.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.utils.history_stats import STATS_SCHEMA, paused_stats, period_stats, rebuild_stats
+from src.utils.logger import get_logger
+
+log = get_logger("history")
+
+PAGE_SIZE = 200
+BUSY_TIMEOUT_MS = 5000
+
+# Entry keys stored in their own columns; anything else goes into "extra"
+COLUMNS = (
+    "timestamp", "direction", "file_name", "file_count", "size", "code",
+    "status", "duration", "retries", "error", "peer", "connect_time"
+)
+
+# Columns covered by the full-text (trigram) search index
+SEARCH_COLUMNS = ("file_name", "code", "peer")
+
+_FTS_COLUMNS = ", ".join(SEARCH_COLUMNS)
+_FTS_NEW = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+_FTS_OLD = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+
+# Schema changes by version; a database runs the steps it has not seen yet
+_MIGRATIONS = (
+    (1, (
+        """CREATE TABLE IF NOT EXISTS transfers (
+            id INTEGER PRIMARY KEY,
+            timestamp REAL NOT NULL,
+            direction TEXT NOT NULL,
+            file_name TEXT,
+            file_count INTEGER,
+            size INTEGER,
+            code TEXT,
+            status TEXT,
+            duration REAL,
+            retries INTEGER,
+            error TEXT,
+            extra TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS transfers_timestamp ON transfers (timestamp)",
+        "CREATE INDEX IF NOT EXISTS transfers_direction ON transfers (direction, timestamp)",
+        "CREATE INDEX IF NOT EXISTS transfers_file_name ON transfers (file_name)",
+        "CREATE INDEX IF NOT EXISTS transfers_code ON transfers (code)",
+        "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)",
+    )),
+    (2, (
+        "CREATE INDEX IF NOT EXISTS transfers_file_sort ON transfers (IFNULL(file_name, ''))",
+        "CREATE INDEX IF NOT EXISTS transfers_size_sort ON transfers (IFNULL(size, -1))",
+        "CREATE INDEX IF NOT EXISTS transfers_direction_file_sort ON transfers (direction, IFNULL(file_name, ''))",
+        "CREATE INDEX IF NOT EXISTS transfers_direction_size_sort ON transfers (direction, IFNULL(size, -1))",
+    )),
+    (3, (
+        "ALTER TABLE transfers ADD COLUMN peer TEXT",
+        "CREATE INDEX IF NOT EXISTS transfers_size ON transfers (size)",
+    )),
+    # Daily rollups and histograms for the statistics dashboard (history_stats)
+    (4, (
+        "ALTER TABLE transfers ADD COLUMN connect_time REAL",
+        *STATS_SCHEMA,
+    )),
+    # Content each recipient has received, for sender-side dedup (dedup.py)
+    (5, (
+        """CREATE TABLE IF NOT EXISTS delivered (
+            peer TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            name TEXT,
+            size INTEGER,
+            transfer_id INTEGER,
+            delivered_at REAL,
+            PRIMARY KEY (peer, digest)
+        ) WITHOUT ROWID""",
+        "CREATE INDEX IF NOT EXISTS delivered_transfer ON delivered (transfer_id)",
+    )),
+    # One delivered row per transfer, so deleting one history entry keeps
+    # the deliveries other entries still back (0: no history entry)
+    (6, (
+        """CREATE TABLE delivered_v6 (
+            peer TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            transfer_id INTEGER NOT NULL,
+            name TEXT,
+            size INTEGER,
+            delivered_at REAL,
+            PRIMARY KEY (peer, digest, transfer_id)
+        ) WITHOUT ROWID""",
+        "INSERT INTO delivered_v6 SELECT peer, digest, IFNULL(transfer_id, 0), name, size, delivered_at FROM delivered",
+        "DROP TABLE delivered",
+        "ALTER TABLE delivered_v6 RENAME TO delivered",
+        "CREATE INDEX IF NOT EXISTS delivered_transfer ON delivered (transfer_id)",
+    )),
+)
+
+# Trigram index over SEARCH_COLUMNS, kept in sync by triggers. Optional:
+# without FTS5 (SQLite older than 3.34) text search falls back to LIKE.
+_FTS_SCHEMA = (
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS transfers_fts USING fts5(
+        {_FTS_COLUMNS}, content='transfers', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS transfers_fts_insert AFTER INSERT ON transfers BEGIN
+        INSERT INTO transfers_fts (rowid, {_FTS_COLUMNS}) VALUES (new.id, {_FTS_NEW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS transfers_fts_delete AFTER DELETE ON transfers BEGIN
+        INSERT INTO transfers_fts (transfers_fts, rowid, {_FTS_COLUMNS}) VALUES ('delete', old.id, {_FTS_OLD});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS transfers_fts_update AFTER UPDATE OF {_FTS_COLUMNS} ON transfers BEGIN
+        INSERT INTO transfers_fts (transfers_fts, rowid, {_FTS_COLUMNS}) VALUES ('delete', old.id, {_FTS_OLD});
+        INSERT INTO transfers_fts (rowid, {_FTS_COLUMNS}) VALUES (new.id, {_FTS_NEW});
+    END""",
+    "INSERT INTO transfers_fts (transfers_fts) VALUES ('rebuild')",
+)
+
+SCHEMA_VERSION = _MIGRATIONS[-1][0]
+
+# Sort orders page() supports, as SQL key expressions matching an index
+# (the row id is always the last key, so every order is total)
+SORT_KEYS = {
+    "timestamp": ("timestamp",),
+    "file_name": ("IFNULL(file_name, '')",),
+    "size": ("IFNULL(size, -1)",),
+    "direction": ("direction", "timestamp"),
+}
+_KEY_COLUMNS = ("timestamp", "file_name", "size", "direction", "id")
+
+# history.json entries written by older versions used these names
+_LEGACY_DIRECTIONS = {"보냄": "send", "받음": "receive", "sent": "send", "received": "receive"}
+_LEGACY_DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M")
+
+
+def _legacy_timestamp(value):
+    """Epoch seconds from a number, an ISO string or the old "YYYY-MM-DD HH:MM" format"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+        for date_format in _LEGACY_DATE_FORMATS:
+            try:
+                return datetime.strptime(value, date_format).timestamp()
+            except ValueError:
+                continue
+    return None
+
+
+def normalize_legacy_entry(entry):
+    """Map a history.json entry onto the store's column names"""
+    entry = dict(entry)
+    timestamp = _legacy_timestamp(entry.pop("timestamp", None))
+    if "date" in entry:
+        date = entry.pop("date")
+        timestamp = timestamp or _legacy_timestamp(date)
+    entry["timestamp"] = timestamp or 0.0
+
+    direction = entry.pop("direction", None) or entry.pop("type", None) or "send"
+    entry["direction"] = _LEGACY_DIRECTIONS.get(direction, direction)
+
+    if "file_name" not in entry and "file" in entry:
+        entry["file_name"] = entry.pop("file")
+    if "size" in entry and not isinstance(entry["size"], int):
+        # 예전 기록은 "2.5 MB" 같은 문자열로 저장됨
+        entry["size_text"] = entry.pop("size")
+    return entry
+
+
+class HistoryStore:
+    """Append-only transfer history with paged reads
+
+    The connection is opened on first use and shared by all threads of
+    this process behind a lock; other processes coordinate through
+    SQLite's own locking.
+    """
+
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        self.legacy_json = legacy_json
+        self._lock = threading.RLock()
+        self._conn = None
+        self._listeners = []
+        self._data_version = None
+        self.has_fts = False
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000,
+                                   isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn = conn
+            self._migrate()
+            self._data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        return self._conn
+
+    def add_listener(self, listener):
+        """Call ``listener(kind, payload)`` after each change made through this store
+
+        kind is "appended" (the stored entry), "updated" (the entry after
+        the change), "deleted" (a list of ids) or "reset" (None: reload
+        everything). Listeners run on the thread that made the change.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Stop notifying a listener"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, kind, payload=None):
+        for listener in list(self._listeners):
+            try:
+                listener(kind, payload)
+            except Exception:
+                log.exception("history listener failed")
+
+    def changed_externally(self):
+        """True if another connection (e.g. another app instance) committed since the last check"""
+        with self._lock:
+            conn = self._connection()
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            changed = data_version != self._data_version
+            self._data_version = data_version
+        return changed
+
+    def poll_external_changes(self):
+        """Send listeners a "reset" if another connection changed the history"""
+        if self.changed_externally():
+            self._notify("reset")
+            return True
+        return False
+
+    @contextmanager
+    def _write(self):
+        """Write transaction that takes SQLite's write lock up front"""
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _migrate(self):
+        conn = self._conn
+        with self._write():
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for step, statements in _MIGRATIONS:
+                if step > version:
+                    for statement in statements:
+                        conn.execute(statement)
+            if version < SCHEMA_VERSION:
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.has_fts = self._ensure_fts()
+            imported = self._import_legacy_json()
+        if imported is not None:
+            log.info("imported %d entries from %s", imported, self.legacy_json)
+        self._retire_legacy_json()
+
+    def _ensure_fts(self):
+        """Create the search index if this SQLite can; returns whether it exists"""
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'transfers_fts'").fetchone():
+            return True
+        conn.execute("SAVEPOINT fts")
+        try:
+            for statement in _FTS_SCHEMA:
+                conn.execute(statement)
+        except sqlite3.OperationalError as e:
+            conn.execute("ROLLBACK TO fts")
+            conn.execute("RELEASE fts")
+            log.info("full-text search unavailable, using LIKE: %s", e)
+            return False
+        conn.execute("RELEASE fts")
+        return True
+
+    def _import_legacy_json(self):
+        """Copy history.json into the table once; the meta flag stops a second instance repeating it"""
+        if not self.legacy_json or not os.path.exists(self.legacy_json):
+            return None
+        conn = self._conn
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+            return None
+        try:
+            with open(self.legacy_json, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("could not read %s: %s", self.legacy_json, e)
+            entries = []
+        rows = [self._row(normalize_legacy_entry(entry)) for entry in entries if isinstance(entry, dict)]
+        conn.executemany(self._insert_sql, rows)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', ?)", (str(time.time()),))
+        return len(rows)
+
+    def _retire_legacy_json(self):
+        if self.legacy_json and os.path.exists(self.legacy_json):
+            try:
+                os.replace(self.legacy_json, f"{self.legacy_json}.migrated")
+            except OSError:
+                pass
+
+    _insert_sql = (
+        f"INSERT INTO transfers ({', '.join(COLUMNS)}, extra) "
+        f"VALUES ({', '.join('?' for _ in COLUMNS)}, ?)"
+    )
+
+    @staticmethod
+    def _row(entry):
+        values = [entry.get(column) for column in COLUMNS]
+        if values[0] is None:
+            values[0] = time.time()
+        extra = {key: value for key, value in entry.items() if key not in COLUMNS and key != "id"}
+        values.append(json.dumps(extra) if extra else None)
+        return values
+
+    @staticmethod
+    def _stored_entry(entry_id, values, entry):
+        """The entry as append() stored it, without reading it back"""
+        stored = dict(zip(COLUMNS, values))
+        stored.update((key, value) for key, value in entry.items() if key not in COLUMNS)
+        stored["id"] = entry_id
+        return stored
+
+    @staticmethod
+    def _entry(row):
+        entry = {key: row[key] for key in row.keys() if key != "extra"}
+        if row["extra"]:
+            entry.update(json.loads(row["extra"]))
+        return entry
+
+    def append(self, entry):
+        """Store one entry and return its id"""
+        values = self._row(entry)
+        with self._lock:
+            conn = self._connection()
+            with self._write():
+                entry_id = conn.execute(self._insert_sql, values).lastrowid
+        self._notify("appended", self._stored_entry(entry_id, values, entry))
+        return entry_id
+
+    def extend(self, entries):
+        """Store several entries in one transaction"""
+        rows = [self._row(entry) for entry in entries]
+        with self._lock:
+            conn = self._connection()
+            with self._write(), paused_stats(conn):
+                conn.executemany(self._insert_sql, rows)
+                rebuild_stats(conn, [row[0] for row in rows])
+        self._notify("reset")
+
+    def replace(self, entries):
+        """Replace the whole history with the given entries"""
+        with self._lock:
+            conn = self._connection()
+            with self._write(), paused_stats(conn):
+                conn.execute("DELETE FROM transfers")
+                conn.execute("DELETE FROM delivered")
+                conn.executemany(self._insert_sql, [self._row(entry) for entry in entries])
+                rebuild_stats(conn)
+        self._notify("reset")
+
+    def update(self, entry_id, fields):
+        """Merge fields into a stored entry; returns the updated entry or None"""
+        with self._lock:
+            conn = self._connection()
+            with self._write():
+                row = conn.execute("SELECT * FROM transfers WHERE id = ?", (entry_id,)).fetchone()
+                if row is None:
+                    return None
+                entry = self._entry(row)
+                entry.update(fields)
+                values = self._row(entry)
+                conn.execute(
+                    f"UPDATE transfers SET {', '.join(f'{column} = ?' for column in COLUMNS)}, extra = ? "
+                    "WHERE id = ?",
+                    values + [entry_id]
+                )
+        self._notify("updated", entry)
+        return entry
+
+    def delete(self, entry_id):
+        """Remove one entry"""
+        self.delete_many((entry_id,))
+
+    def delete_many(self, entry_ids):
+        """Remove several entries in one transaction"""
+        entry_ids = list(entry_ids)
+        with self._lock:
+            conn = self._connection()
+            with self._write():
+                conn.executemany("DELETE FROM transfers WHERE id = ?", [(entry_id,) for entry_id in entry_ids])
+                # 기록을 지우면 그 전송으로만 보낸 파일은 다시 보냄 (다른 기록이 있는 파일은 유지)
+                conn.executemany("DELETE FROM delivered WHERE transfer_id = ?", [(entry_id,) for entry_id in entry_ids])
+        self._notify("deleted", entry_ids)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            conn = self._connection()
+            with self._write(), paused_stats(conn):
+                conn.execute("DELETE FROM transfers")
+                conn.execute("DELETE FROM delivered")
+                rebuild_stats(conn)
+        self._notify("reset")
+
+    def mark_delivered(self, peer, items, entry_id=None):
+        """Remember that ``peer`` received these FileDigests (in history entry ``entry_id``)"""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with self._write():
+                conn.executemany(
+                    "INSERT OR REPLACE INTO delivered (peer, digest, name, size, transfer_id, delivered_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(peer, item.digest, item.name, item.size, entry_id or 0, now) for item in items]
+                )
+
+    def delivered(self, peer, digests):
+        """{digest: name it was last delivered under} for the digests ``peer`` already received
+
+        A digest counts as long as any history entry (or a send without
+        one) backs it.
+        """
+        digests = list(digests)
+        found = {}
+        with self._lock:
+            conn = self._connection()
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(digests), 500):
+                chunk = digests[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT digest, name FROM delivered WHERE peer = ? AND digest IN ({', '.join('?' for _ in chunk)}) "
+                    "ORDER BY delivered_at",
+                    [peer, *chunk]
+                ).fetchall()
+                found.update((row["digest"], row["name"]) for row in rows)
+        return found
+
+    def get(self, entry_id):
+        """One entry by id, or None"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT * FROM transfers WHERE id = ?", (entry_id,)
+            ).fetchone()
+        return self._entry(row) if row else None
+
+    def stats(self, period="day", count=14):
+        """Totals per day or week from the rollup tables (see history_stats.period_stats)"""
+        with self._lock:
+            return period_stats(self._connection(), period, count)
+
+    def _filter_clauses(self, direction=None, search=None):
+        """WHERE clauses and parameters for a direction and a parse_search() dict"""
+        clauses, params = [], []
+        if direction:
+            clauses.append("direction = ?")
+            params.append(direction)
+        if not search:
+            return clauses, params
+
+        terms = search.get("terms", ())
+        if terms and self.has_fts:
+            # Each term as a quoted phrase; the trigram index matches substrings
+            clauses.append("id IN (SELECT rowid FROM transfers_fts WHERE transfers_fts MATCH ?)")
+            params.append(" ".join('"' + term.replace('"', '""') + '"' for term in terms))
+        elif terms:
+            # No FTS5 here: same substring semantics, but a scan
+            for term in terms:
+                pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                clauses.append("(" + " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in SEARCH_COLUMNS) + ")")
+                params.extend([pattern] * len(SEARCH_COLUMNS))
+        for key, clause in (("min_size", "size >= ?"), ("max_size", "size <= ?"),
+                            ("since", "timestamp >= ?"), ("until", "timestamp < ?")):
+            if key in search:
+                clauses.append(clause)
+                params.append(search[key])
+        return clauses, params
+
+    def count(self, direction=None, search=None):
+        """Number of stored entries, optionally filtered like page()"""
+        with self._lock:
+            conn = self._connection()
+            clauses, params = self._filter_clauses(direction, search)
+            sql = "SELECT COUNT(*) FROM transfers"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+            return conn.execute(sql, params).fetchone()[0]
+
+    def page(self, limit=PAGE_SIZE, after=None, direction=None, sort="timestamp", descending=True,
+             search=None):
+        """Up to ``limit`` entries in ``sort`` order (newest first by default)
+
+        ``after`` is the last entry of the previous page. The next page
+        continues from its sort key through an index, so deep pages cost
+        the same as the first. ``search`` is a dict from
+        ``history_search.parse_search``.
+        """
+        keys = SORT_KEYS[sort] + ("id",)
+        order = "DESC" if descending else "ASC"
+        with self._lock:
+            conn = self._connection()
+            clauses, params = self._filter_clauses(direction, search)
+            if after is not None:
+                key_list = ", ".join(keys)
+                # Evaluate the sort keys on the entry itself, so paging still
+                # works if that entry has been deleted since
+                position = conn.execute(
+                    f"SELECT {key_list} FROM (SELECT "
+                    + ", ".join(f"? AS {column}" for column in _KEY_COLUMNS) + ")",
+                    [after.get(column) for column in _KEY_COLUMNS]
+                ).fetchone()
+                # The bound on the first key lets SQLite seek in the index
+                # instead of scanning it from the start
+                first, rest = ("<=", "<") if descending else (">=", ">")
+                clauses.append(f"{keys[0]} {first} ?")
+                clauses.append(f"({key_list}) {rest} ({', '.join('?' for _ in keys)})")
+                params.append(position[0])
+                params.extend(position)
+            sql = "SELECT * FROM transfers"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+            sql += " ORDER BY " + ", ".join(f"{key} {order}" for key in keys) + " LIMIT ?"
+            params.append(limit)
+            rows = conn.execute(sql, params).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def close(self):
+        """Close the connection; the next call reopens it"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
@@ -0,0 +1,122 @@
+"""Application logging.
+
+Everything logs through ``logging.getLogger("siro.<area>")`` with %-style
+arguments, so a disabled level costs one cached ``isEnabledFor`` check and
+nothing is formatted. When verbose logging is on, records are handed to a
+queue and written to rotating files by a background listener thread.
+"""
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict, deque
+
+ROOT_LOGGER = "siro"
+LOG_FILE_NAME = "siro.log"
+LOG_FILE_MAX_BYTES = 1024 * 1024
+LOG_FILE_BACKUPS = 5
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+_listener = None
+_queue_handler = None
+_lock = threading.Lock()
+
+
+def get_logger(area):
+    """Logger for one part of the app, e.g. get_logger("croc")"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{area}")
+
+
+def configure_logging(log_dir, verbose=False):
+    """Apply the verbose_log setting; safe to call again when it changes"""
+    global _listener, _queue_handler
+    root = logging.getLogger(ROOT_LOGGER)
+    root.propagate = False
+
+    with _lock:
+        if verbose and _listener is None:
+            # Only needed for file output (pulls in socket and pickle)
+            from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+            os.makedirs(log_dir, exist_ok=True)
+            file_handler = RotatingFileHandler(
+                os.path.join(log_dir, LOG_FILE_NAME),
+                maxBytes=LOG_FILE_MAX_BYTES,
+                backupCount=LOG_FILE_BACKUPS,
+                encoding="utf-8"
+            )
+            file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            log_queue = queue.SimpleQueue()
+            _queue_handler = QueueHandler(log_queue)
+            _listener = QueueListener(log_queue, file_handler)
+            _listener.start()
+            root.addHandler(_queue_handler)
+        elif not verbose:
+            _stop_listener()
+
+        if not root.handlers:
+            # Errors still reach stderr when file logging is off
+            stream_handler = logging.StreamHandler()
+            stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            stream_handler.setLevel(logging.WARNING)
+            root.addHandler(stream_handler)
+
+        root.setLevel(logging.DEBUG if verbose else logging.WARNING)
+
+
+def shutdown_logging():
+    """Flush and stop the background writer"""
+    with _lock:
+        _stop_listener()
+
+
+def _stop_listener():
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    logging.getLogger(ROOT_LOGGER).removeHandler(_queue_handler)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _queue_handler = None
+
+
+class TranscriptBuffer:
+    """Keeps the last croc output lines of recent transfers for post-mortems"""
+
+    def __init__(self, max_lines=200, max_transfers=32):
+        self.max_lines = max_lines
+        self.max_transfers = max_transfers
+        self._transcripts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, key):
+        """Start (or restart) the transcript for a transfer and return it"""
+        lines = deque(maxlen=self.max_lines)
+        with self._lock:
+            self._transcripts[key] = lines
+            self._transcripts.move_to_end(key)
+            while len(self._transcripts) > self.max_transfers:
+                self._transcripts.popitem(last=False)
+        return lines
+
+    def get(self, key):
+        """The recorded lines of a transfer, oldest first"""
+        with self._lock:
+            lines = self._transcripts.get(key)
+            return list(lines) if lines is not None else []
+
+    def keys(self):
+        with self._lock:
+            return list(self._transcripts)
+
+
+class LazyLines:
+    """Joins lines only if the log record is actually formatted"""
+
+    def __init__(self, lines, separator="\n"):
+        self.lines = lines
+        self.separator = separator
+
+    def __str__(self):
+        return self.separator.join(self.lines)
@@ -0,0 +1,199 @@
+"""Size and file-count manifest of the paths selected for sending.
+
+Directories are walked with ``os.scandir`` and each directory's own
+totals (files directly inside it, its ``LARGEST_KEPT`` largest files, plus
+its subdirectory names) can be cached keyed by (path, st_mtime_ns,
+st_ino). Re-scanning an unchanged tree then only stats the directories
+instead of every file. Like any mtime-keyed cache, it misses a file
+rewritten in place without touching its directory until that directory
+changes, so it is only used for the send panel's preview; sizes that are
+recorded or decide how a send is split (``path_size``) come from a fresh
+scan. The cache keeps the ``MAX_CACHED_DIRECTORIES`` most recently used
+directories.
+"""
+import heapq
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+# Largest files remembered per directory and per scan, for sampling
+# (compressibility.py) without walking the selection again
+LARGEST_KEPT = 48
+MAX_CACHED_DIRECTORIES = 250_000
+
+
+def _keep_largest(heap, size, path):
+    """Add a file to a min-heap of at most LARGEST_KEPT (size, path); False if too small"""
+    if len(heap) < LARGEST_KEPT:
+        heapq.heappush(heap, (size, path))
+    elif size > heap[0][0]:
+        heapq.heapreplace(heap, (size, path))
+    else:
+        return False
+    return True
+
+
+@dataclass(slots=True)
+class ManifestTotals:
+    """Running totals of a scan"""
+    bytes: int = 0
+    files: int = 0
+    directories: int = 0
+    # Min-heap of the LARGEST_KEPT largest files as (size, path)
+    largest: list = field(default_factory=list)
+    complete: bool = False
+
+    @property
+    def largest_size(self):
+        return max(self.largest)[0] if self.largest else 0
+
+    @property
+    def largest_path(self):
+        return max(self.largest)[1] if self.largest else None
+
+    def add_file(self, path, size):
+        self.bytes += size
+        self.files += 1
+        _keep_largest(self.largest, size, path)
+
+    def add_largest(self, files):
+        """Merge (size, path) pairs sorted largest first"""
+        for size, path in files:
+            if not _keep_largest(self.largest, size, path):
+                break
+
+    def copy(self):
+        return ManifestTotals(self.bytes, self.files, self.directories, list(self.largest), self.complete)
+
+
+class DirectoryCache:
+    """Thread-safe LRU cache of per-directory totals"""
+
+    def __init__(self, max_entries=MAX_CACHED_DIRECTORIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, st):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return None
+            if entry[0] != st.st_mtime_ns or entry[1] != st.st_ino:
+                del self._entries[path]
+                return None
+            self._entries.move_to_end(path)
+        return entry
+
+    def put(self, path, st, direct_bytes, direct_files, largest, subdirs):
+        entry = (st.st_mtime_ns, st.st_ino, direct_bytes, direct_files, largest, subdirs)
+        with self._lock:
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+# Shared by the send panel's previews (scanner, compressibility estimate)
+DEFAULT_CACHE = DirectoryCache()
+
+
+class ScanCancelled(Exception):
+    pass
+
+
+def _scan_directory(path, st, cache):
+    """Totals of the files directly inside one directory (cached unless ``cache`` is None)"""
+    if cache is not None:
+        entry = cache.get(path, st)
+        if entry is not None:
+            return entry
+
+    direct_bytes = 0
+    direct_files = 0
+    largest = []
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        size = entry.stat(follow_symlinks=False).st_size
+                        direct_bytes += size
+                        direct_files += 1
+                        _keep_largest(largest, size, entry.path)
+                except OSError:
+                    pass
+    except OSError:
+        pass
+    largest = tuple(sorted(largest, reverse=True))
+    if cache is None:
+        return (st.st_mtime_ns, st.st_ino, direct_bytes, direct_files, largest, tuple(subdirs))
+    return cache.put(path, st, direct_bytes, direct_files, largest, tuple(subdirs))
+
+
+def scan_paths(paths, cache=DEFAULT_CACHE, progress=None, interval=0.1, cancelled=None):
+    """Total size, file count and largest files of files and folders
+
+    ``progress(totals)`` is called with a snapshot at most every ``interval``
+    seconds while walking; ``cancelled()`` is polled per directory and
+    aborts the scan with ScanCancelled. ``cache=None`` reads every
+    directory afresh.
+    """
+    totals = ManifestTotals()
+    last_report = time.monotonic()
+
+    for root in paths:
+        try:
+            st = os.stat(root)
+        except OSError:
+            continue
+        if not os.path.isdir(root):
+            totals.add_file(root, st.st_size)
+            continue
+
+        stack = [(root, st)]
+        while stack:
+            if cancelled is not None and cancelled():
+                raise ScanCancelled()
+            path, st = stack.pop()
+            _, _, direct_bytes, direct_files, largest, subdirs = _scan_directory(path, st, cache)
+
+            totals.directories += 1
+            totals.bytes += direct_bytes
+            totals.files += direct_files
+            totals.add_largest(largest)
+
+            for name in subdirs:
+                child = os.path.join(path, name)
+                try:
+                    stack.append((child, os.stat(child, follow_symlinks=False)))
+                except OSError:
+                    pass
+
+            if progress is not None:
+                now = time.monotonic()
+                if now - last_report >= interval:
+                    last_report = now
+                    progress(totals.copy())
+
+    totals.complete = True
+    return totals
+
+
+def path_size(path, cache=None):
+    """Size of a file, or the total size of a folder's contents (fresh scan by default)"""
+    return scan_paths([path], cache).bytes
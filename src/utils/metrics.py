@@ -0,0 +1,283 @@
+"""Transfer metrics for Prometheus-style scraping.
+
+Off unless configured:
+
+- ``metrics_port``: serve ``/metrics`` over HTTP on 127.0.0.1 at that port
+  (OpenMetrics when the scraper asks for it, else Prometheus text 0.0.4)
+- ``metrics_textfile``: rewrite that file every ``TEXTFILE_INTERVAL``
+  seconds, e.g. for node_exporter's textfile collector
+
+``TransferMetrics.observe`` takes the same (transfer_id, event) stream the
+send/receive panels get. When metrics are off it is never connected, so
+there is no cost at all.
+"""
+import bisect
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.utils.logger import get_logger
+from src.utils.transfer_record import CONNECTED_STATUSES
+
+log = get_logger("metrics")
+
+NAMESPACE = "sirodrop"
+DIRECTIONS = ("send", "receive")
+DURATION_BUCKETS = (1, 5, 15, 60, 300, 900, 3600, 4 * 3600)
+CONNECT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+TEXTFILE_INTERVAL = 15
+# How many finished transfer ids to remember, so late events for them are ignored
+CLOSED_MEMORY = 1024
+
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class TransferMetrics:
+    """Counters and histograms built from transfer events (thread safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # transfer_id -> {"direction", "started", "connected", "size", "progress"}
+        self._active = {}
+        # Recently finished transfer ids, oldest first (dict as an ordered set)
+        self._closed = {}
+        self._transfers = {}
+        self._bytes = {}
+        self._retries = {}
+        self._failures = {}
+        self._durations = {}
+        self._connects = {}
+
+    def observe(self, transfer_id, event):
+        """Feed one transfer event (connect to TransferManager.transfer_event)"""
+        now = time.monotonic()
+        status = event.get("status")
+        direction = event.get("direction") or "unknown"
+        with self._lock:
+            if transfer_id in self._closed:
+                return
+            state = self._active.get(transfer_id)
+            if state is None:
+                state = self._active[transfer_id] = {
+                    "direction": direction, "started": now, "connected": None, "size": None, "progress": 0.0,
+                }
+            if event.get("size") is not None:
+                state["size"] = event["size"]
+            if event.get("progress") is not None:
+                state["progress"] = float(event["progress"])
+
+            if status in CONNECTED_STATUSES and state["connected"] is None:
+                state["connected"] = now
+                self._histogram(self._connects, direction, CONNECT_BUCKETS).observe(now - state["started"])
+            elif status == "retrying":
+                key = (direction, event.get("reason") or "unknown")
+                self._retries[key] = self._retries.get(key, 0) + 1
+            elif status in ("completed", "error"):
+                del self._active[transfer_id]
+                self._closed[transfer_id] = None
+                if len(self._closed) > CLOSED_MEMORY:
+                    del self._closed[next(iter(self._closed))]
+                key = (direction, status)
+                self._transfers[key] = self._transfers.get(key, 0) + 1
+                if status == "error":
+                    key = (direction, event.get("reason") or "unknown")
+                    self._failures[key] = self._failures.get(key, 0) + 1
+                if state["size"]:
+                    # A failed transfer still moved the part it got through
+                    done = 100.0 if status == "completed" else min(state["progress"], 100.0)
+                    self._bytes[direction] = self._bytes.get(direction, 0) + int(state["size"] * done / 100)
+                self._histogram(self._durations, direction, DURATION_BUCKETS).observe(now - state["started"])
+
+    @staticmethod
+    def _histogram(histograms, direction, bounds):
+        histogram = histograms.get(direction)
+        if histogram is None:
+            histogram = histograms[direction] = _Histogram(bounds)
+        return histogram
+
+    def render(self, openmetrics=True):
+        """The metrics as OpenMetrics text, or Prometheus text format 0.0.4"""
+        lines = []
+
+        def family(name, kind, help_text):
+            # OpenMetrics names a counter family without _total; the 0.0.4 format uses the sample name
+            type_name = f"{name}_total" if kind == "counter" and not openmetrics else name
+            lines.append(f"# HELP {type_name} {help_text}")
+            lines.append(f"# TYPE {type_name} {kind}")
+
+        def counter(name, help_text, values, label_names):
+            family(name, "counter", help_text)
+            for key, value in sorted(values.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                lines.append(f"{name}_total{_labels(label_names, key)} {value}")
+
+        def histogram(name, help_text, histograms):
+            family(name, "histogram", help_text)
+            for direction, data in sorted(histograms.items()):
+                cumulative = 0
+                for bound, count in zip(data.bounds, data.counts):
+                    cumulative += count
+                    le = _labels(("direction",), (direction,), [("le", _number(float(bound)))])
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                le = _labels(("direction",), (direction,), [("le", "+Inf")])
+                lines.append(f"{name}_bucket{le} {data.count}")
+                lines.append(f"{name}_sum{_labels(('direction',), (direction,))} {_number(data.sum)}")
+                lines.append(f"{name}_count{_labels(('direction',), (direction,))} {data.count}")
+
+        with self._lock:
+            active = {direction: 0 for direction in DIRECTIONS}
+            for state in self._active.values():
+                active[state["direction"]] = active.get(state["direction"], 0) + 1
+
+            family(f"{NAMESPACE}_active_transfers", "gauge", "Transfers currently running.")
+            for direction, count in sorted(active.items()):
+                lines.append(f"{NAMESPACE}_active_transfers{_labels(('direction',), (direction,))} {count}")
+            counter(f"{NAMESPACE}_transfers", "Finished transfers by outcome.",
+                    self._transfers, ("direction", "status"))
+            counter(f"{NAMESPACE}_transferred_bytes", "Bytes moved by finished transfers.",
+                    self._bytes, ("direction",))
+            histogram(f"{NAMESPACE}_transfer_duration_seconds", "Time from start to finish of a transfer.",
+                      self._durations)
+            histogram(f"{NAMESPACE}_connect_latency_seconds",
+                      "Time from start until the peers connected (sends include waiting for the receiver).",
+                      self._connects)
+            counter(f"{NAMESPACE}_retries", "Retried croc attempts by failure reason.",
+                    self._retries, ("direction", "reason"))
+            counter(f"{NAMESPACE}_failures", "Failed transfers by reason.",
+                    self._failures, ("direction", "reason"))
+
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = self.server.metrics.render(openmetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug("scrape from %s: %s", self.client_address[0], format % args)
+
+
+class MetricsExporter:
+    """Serves and/or writes TransferMetrics until stopped"""
+
+    def __init__(self, metrics, port=None, textfile=None, interval=TEXTFILE_INTERVAL):
+        self.metrics = metrics
+        self.port = port
+        self.textfile = textfile
+        self.interval = interval
+        self._server = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self.port is not None:
+            # Localhost only: the numbers are for a local agent to scrape, not the network
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.port), _MetricsHandler)
+            self._server.daemon_threads = True
+            self._server.metrics = self.metrics
+            self.port = self._server.server_address[1]
+            self._spawn(self._server.serve_forever, "metrics-http")
+            log.info("serving metrics on http://127.0.0.1:%d/metrics", self.port)
+        if self.textfile:
+            self._spawn(self._write_loop, "metrics-textfile")
+            log.info("writing metrics to %s every %ss", self.textfile, self.interval)
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _write_loop(self):
+        self.write_textfile()
+        while not self._stop.wait(self.interval):
+            self.write_textfile()
+        self.write_textfile()
+
+    def write_textfile(self):
+        """Rewrite the textfile atomically (a collector never sees half a file)"""
+        directory = os.path.dirname(os.path.abspath(self.textfile))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".metrics-", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(self.metrics.render(openmetrics=False))
+                os.replace(tmp_path, self.textfile)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            log.exception("could not write metrics to %s", self.textfile)
+
+    def stop(self):
+        """Stop serving; the textfile gets one last write"""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=2)
+
+
+def start_metrics(config):
+    """A started MetricsExporter per the config, or None when metrics are off"""
+    port = config.get_value("metrics_port")
+    textfile = config.get_value("metrics_textfile")
+    if not port and not textfile:
+        return None
+    exporter = MetricsExporter(TransferMetrics(), port=port, textfile=textfile)
+    try:
+        exporter.start()
+    except OSError as e:
+        log.warning("could not start metrics (%s)", e)
+        exporter.stop()
+        return None
+    return exporter
@@ -0,0 +1,32 @@
+import sys
+import time
+
+
+class StartupTimer:
+    """Records named startup phases and prints a timing breakdown"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.last = self.started
+        self.phases = []
+
+    def mark(self, phase):
+        """Close the current phase under the given name"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self, stream=None):
+        """Print each phase and the total in milliseconds"""
+        if not self.enabled:
+            return
+        stream = stream or sys.stderr
+        width = max((len(phase) for phase, _ in self.phases), default=5)
+        print("startup report", file=stream)
+        for phase, elapsed in self.phases:
+            print(f"  {phase:<{width}}  {elapsed * 1000:8.1f} ms", file=stream)
+        print(f"  {'total':<{width}}  {(self.last - self.started) * 1000:8.1f} ms", file=stream)
+        stream.flush()
@@ -0,0 +1,183 @@
+"""Throughput samples and rate estimates for one transfer.
+
+``ThroughputSeries`` keeps the rates croc reports in fixed-size float
+arrays, so memory stays the same however long a transfer runs:
+
+- a ring of the latest ``RING_SIZE`` samples, for live display, and
+- an overview of the whole transfer in at most ``OVERVIEW_POINTS`` slots.
+  When the overview fills up, neighbouring slots are merged pairwise and
+  each slot then covers twice as many samples.
+
+The overview is what gets saved with the history entry: each point is
+``[seconds since start, progress %, mean rate, min rate]``, so stalls
+show up as a low minimum or as a gap between timestamps.
+
+``RateEstimator`` smooths the reported rate for display and the ETA, so
+neither jumps around on a bursty link.
+"""
+import time
+from array import array
+
+RING_SIZE = 120
+OVERVIEW_POINTS = 64
+# croc redraws its progress line several times a second; keep at most this often
+SAMPLE_INTERVAL = 0.5
+# A rate sample's weight in the smoothed rate halves every this many seconds
+RATE_HALF_LIFE = 3.0
+
+
+def _floats(size):
+    return array("f", bytes(4 * size))
+
+
+class ThroughputSeries:
+    """Fixed-memory record of (time, progress, rate) samples for one transfer
+
+    Not thread safe; each thread that follows a transfer keeps its own.
+    """
+
+    def __init__(self, ring_size=RING_SIZE, overview_points=OVERVIEW_POINTS, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self._started = time.monotonic()
+        self._last_sample = None
+
+        self._ring_times = _floats(ring_size)
+        self._ring_progress = _floats(ring_size)
+        self._ring_rates = _floats(ring_size)
+        self._ring_next = 0
+        self._ring_count = 0
+
+        # An even slot count, so halving always merges full pairs
+        overview_points = max(2, overview_points - overview_points % 2)
+        self._overview_times = _floats(overview_points)
+        self._overview_progress = _floats(overview_points)
+        self._overview_mean = _floats(overview_points)
+        self._overview_min = _floats(overview_points)
+        self._overview_count = 0
+        # Samples per overview slot, and the slot being filled
+        self._span = 1
+        self._pending = 0
+        self._pending_sum = 0.0
+        self._pending_min = 0.0
+        self._pending_time = 0.0
+        self._pending_progress = 0.0
+
+    def __len__(self):
+        return self._ring_count
+
+    def add(self, progress, rate, now=None):
+        """Record a sample; returns False when it came too soon after the last one"""
+        elapsed = (time.monotonic() if now is None else now) - self._started
+        if self._last_sample is not None and elapsed - self._last_sample < self.interval:
+            return False
+        self._last_sample = elapsed
+        progress = float(progress or 0)
+        rate = float(rate)
+
+        size = len(self._ring_rates)
+        slot = self._ring_next
+        self._ring_times[slot] = elapsed
+        self._ring_progress[slot] = progress
+        self._ring_rates[slot] = rate
+        self._ring_next = (slot + 1) % size
+        self._ring_count = min(self._ring_count + 1, size)
+
+        self._pending_min = rate if self._pending == 0 else min(self._pending_min, rate)
+        self._pending += 1
+        self._pending_sum += rate
+        self._pending_time = elapsed
+        self._pending_progress = progress
+        if self._pending == self._span:
+            self._close_slot()
+        return True
+
+    def _close_slot(self):
+        if self._overview_count == len(self._overview_times):
+            # The pending samples now fill half of a (twice as wide) slot
+            self._halve_overview()
+            return
+        index = self._overview_count
+        self._overview_times[index] = self._pending_time
+        self._overview_progress[index] = self._pending_progress
+        self._overview_mean[index] = self._pending_sum / self._pending
+        self._overview_min[index] = self._pending_min
+        self._overview_count += 1
+        self._pending = 0
+        self._pending_sum = 0.0
+
+    def _halve_overview(self):
+        """Merge neighbouring overview slots so each covers twice the samples"""
+        merged = self._overview_count // 2
+        for index in range(merged):
+            first, second = 2 * index, 2 * index + 1
+            self._overview_times[index] = self._overview_times[second]
+            self._overview_progress[index] = self._overview_progress[second]
+            self._overview_mean[index] = (self._overview_mean[first] + self._overview_mean[second]) / 2
+            self._overview_min[index] = min(self._overview_min[first], self._overview_min[second])
+        self._overview_count = merged
+        self._span *= 2
+
+    def _ring_order(self):
+        start = (self._ring_next - self._ring_count) % len(self._ring_rates)
+        return [(start + offset) % len(self._ring_rates) for offset in range(self._ring_count)]
+
+    def samples(self):
+        """Latest samples, oldest first, as (seconds since start, progress, rate)"""
+        return [(self._ring_times[i], self._ring_progress[i], self._ring_rates[i]) for i in self._ring_order()]
+
+    def rates(self):
+        """Latest rates in bytes/s, oldest first"""
+        return [self._ring_rates[i] for i in self._ring_order()]
+
+    def overview(self):
+        """The whole transfer downsampled, as JSON-ready [t, progress, mean rate, min rate] points"""
+        points = [
+            [round(self._overview_times[i], 1), round(self._overview_progress[i], 1),
+             round(self._overview_mean[i]), round(self._overview_min[i])]
+            for i in range(self._overview_count)
+        ]
+        if self._pending:
+            points.append([round(self._pending_time, 1), round(self._pending_progress, 1),
+                           round(self._pending_sum / self._pending), round(self._pending_min)])
+        return points
+
+
+def remaining_bytes(event):
+    """Bytes still to go according to a progress event's numeric fields, or None"""
+    size, progress = event.get("size"), event.get("progress")
+    if size is not None and progress is not None:
+        return size * (1 - min(float(progress), 100.0) / 100)
+    if event.get("file_size") is not None and event.get("file_bytes") is not None:
+        return event["file_size"] - event["file_bytes"]
+    return None
+
+
+class RateEstimator:
+    """Exponentially weighted moving average of a transfer's rate, and the ETA from it
+
+    Weights depend on the time between samples rather than their count,
+    so a burst of progress redraws does not outweigh a slow stretch.
+    """
+
+    def __init__(self, half_life=RATE_HALF_LIFE):
+        self.half_life = half_life
+        self.rate = None
+        self._last_update = None
+
+    def update(self, rate, now=None):
+        """Feed a reported rate (bytes/s); returns the smoothed rate"""
+        now = time.monotonic() if now is None else now
+        if self.rate is None:
+            self.rate = float(rate)
+        else:
+            elapsed = max(0.0, now - self._last_update)
+            weight = 1 - 0.5 ** (elapsed / self.half_life)
+            self.rate += weight * (rate - self.rate)
+        self._last_update = now
+        return self.rate
+
+    def eta(self, remaining):
+        """Seconds left for ``remaining`` bytes at the smoothed rate, or None"""
+        if remaining is None or not self.rate or self.rate <= 0:
+            return None
+        return max(0.0, remaining) / self.rate
@@ -0,0 +1,386 @@
+"""One croc send or receive, run to completion on the calling thread.
+
+``TransferJob`` holds everything about a transfer that does not need Qt:
+the retry supervisor, sharded sends, rate smoothing and history recording.
+Every event is tagged with the transfer id and direction and handed to
+``publish(transfer_id, event)``. The GUI runs jobs in a ``TransferWorker``
+thread that publishes to the progress bus; the headless runner calls
+``run()`` from plain threads.
+
+With a ``hasher`` (see hashing.py) a send also checksums its files on a
+separate thread while croc runs. Hashing progress is published as its own
+"hashing" events, and the "completed" event waits for the checksums so
+the history entry carries them.
+
+A send with a ``recipient`` records what that recipient received; with
+``dedup`` as well, it hashes first and leaves out what they already have
+(see dedup.py). A receive checks any dedup manifest that arrives with it.
+"""
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.compressibility import estimate_compressibility
+from src.utils.croc_utils import shard_paths
+from src.utils.dedup import manifest_snapshot, plan_dedup, send_arguments, verify_new_manifests, write_manifest
+from src.utils.hashing import ALGORITHM, FileHasher, content_digest
+from src.utils.logger import get_logger
+from src.utils.manifest import ScanCancelled
+from src.utils.throughput import RateEstimator, remaining_bytes
+from src.utils.transfer_supervisor import TransferSupervisor
+
+log = get_logger("transfer")
+
+# Per-file checksums are kept in the history entry up to this many files;
+# above it only the combined content digest is
+CHECKSUM_LIST_LIMIT = 1000
+
+
+class TransferJob:
+    """A single croc send/receive with retries, reported through ``publish``"""
+
+    def __init__(self, transfer_id, croc_utils, direction, code, options, publish,
+                 retry_policy=None, recorder=None, hasher=None):
+        self.transfer_id = transfer_id
+        self.croc_utils = croc_utils
+        self.direction = direction
+        self.code = code
+        self.options = options or {}
+        self.publish = publish
+        self.retry_policy = retry_policy or {}
+        self.recorder = recorder
+        self.hasher = hasher
+        self.recipient = self.options.get("recipient") or None
+        self.digests = None
+        # With dedup, the digests actually sent (the rest the recipient already had)
+        self._sent_digests = None
+        self._manifests_before = None
+        self._hash_thread = None
+        self._hash_stop = False
+        self._supervisors = []
+        self._cancelled = False
+        self._terminal_sent = False
+        self._rate = RateEstimator()
+        self._compress_files = True
+
+    def cancel(self):
+        """Stop retrying and terminate this transfer's croc processes"""
+        self._cancelled = True
+        self._hash_stop = True
+        for supervisor in list(self._supervisors):
+            supervisor.cancel()
+        self.croc_utils.terminate_transfer(self.transfer_id)
+
+    def _supervise(self, attempt, callback):
+        """Run a croc attempt under a retry supervisor"""
+        supervisor = TransferSupervisor(**self.retry_policy)
+        self._supervisors.append(supervisor)
+        if self._cancelled:
+            supervisor.cancel()
+        return supervisor.run(attempt, callback)
+
+    def _emit(self, data):
+        """Tag a CrocUtils callback dict, record it and publish it"""
+        if self._terminal_sent:
+            # croc가 종료 시 완료/오류를 한 번 더 알리는 경우 등: 이미 끝난 전송
+            return
+        event = dict(data)
+        event["transfer_id"] = self.transfer_id
+        event["direction"] = self.direction
+        if self.code is None and self.direction == "send" and event.get("code"):
+            # croc가 정한 코드로 재시도해야 기다리는 받는 쪽이 다시 연결할 수 있음
+            self.code = event["code"]
+        if event.get("status") == "completed":
+            if self.direction == "send":
+                self._attach_checksums(event)
+            else:
+                self._verify_manifests(event)
+        elif event.get("status") == "error":
+            # 실패한 전송의 체크섬은 필요 없음
+            self._hash_stop = True
+        if event.get("status") in ("completed", "error"):
+            self._terminal_sent = True
+        if event.get("rate") is not None:
+            # 순간 속도 대신 평활한 속도로 남은 시간 추정
+            event["rate_avg"] = self._rate.update(event["rate"])
+            event["eta"] = self._rate.eta(remaining_bytes(event))
+        if self.recorder is not None:
+            entry = self.recorder.observe(self.transfer_id, event)
+            if entry is not None and entry["status"] == "completed":
+                self._record_delivery(entry)
+        self.publish(self.transfer_id, event)
+
+    def run(self):
+        try:
+            if self.recorder is not None:
+                self.recorder.begin(self.transfer_id, self.direction, self.code, self.options)
+            if self.direction == "send":
+                self._run_send()
+            else:
+                self._run_receive()
+        except ScanCancelled:
+            # Cancelled while hashing, before croc started
+            if not self._terminal_sent:
+                self._emit({"status": "error", "message": "Cancelled", "reason": "cancelled", "code": self.code})
+        except Exception as e:
+            # CrocUtils already reports errors raised after croc started
+            if not self._terminal_sent:
+                self._emit({"status": "error", "message": str(e), "code": self.code})
+
+    def _report_hashing(self, totals):
+        self._emit({
+            "status": "hashing",
+            "hashed_files": totals.files,
+            "hash_files": totals.total_files,
+            "hashed_bytes": totals.bytes,
+            "hash_bytes": totals.total_bytes,
+            "hash_cached": totals.cached_files,
+            "hash_complete": totals.complete,
+        })
+
+    def _start_hashing(self, files):
+        """Checksum the files on a thread of their own while croc sends them"""
+        def run():
+            try:
+                self.digests = self.hasher.hash_paths(
+                    files, progress=self._report_hashing, cancelled=lambda: self._hash_stop
+                )
+            except ScanCancelled:
+                return
+            except Exception:
+                log.exception("hashing %s failed", self.transfer_id)
+
+        self._hash_thread = threading.Thread(target=run, name=f"hash-{self.transfer_id}", daemon=True)
+        self._hash_thread.start()
+
+    def _attach_checksums(self, event):
+        """Wait for the checksums and add them to the completed event"""
+        if self._hash_thread is not None:
+            self._hash_thread.join()
+        if self.digests is None:
+            return
+        event["hash_algorithm"] = ALGORITHM
+        event["content_digest"] = content_digest(self.digests)
+        if len(self.digests) <= CHECKSUM_LIST_LIMIT:
+            event["checksums"] = {item.name: item.digest for item in self.digests}
+
+    def _record_delivery(self, entry):
+        """Remember which content the recipient now has"""
+        sent = self.digests if self._sent_digests is None else self._sent_digests
+        if self.direction != "send" or not self.recipient or not sent:
+            return
+        try:
+            self.recorder.store.mark_delivered(self.recipient, sent, entry.get("id"))
+        except Exception:
+            log.exception("could not record delivery of %s", self.transfer_id)
+
+    def _deduplicate(self, files, manifest_dir):
+        """Hash the files and drop what the recipient has; returns (paths, tar members or None)
+
+        Members are only used for a tar send (options["zip"]); otherwise
+        the manifest is one more top-level path so the receiver sees it.
+        """
+        hasher = self.hasher or FileHasher()
+        self.digests = hasher.hash_paths(files, progress=self._report_hashing, cancelled=lambda: self._hash_stop)
+        if self.recorder is not None:
+            delivered = self.recorder.store.delivered(self.recipient, {item.digest for item in self.digests})
+        else:
+            log.warning("no history to deduplicate %s against, sending everything", self.transfer_id)
+            delivered = {}
+        plan = plan_dedup(self.digests, delivered)
+        paths, members = send_arguments(files, plan, archive=bool(self.options.get("zip")))
+        # 받는 쪽이 제외된 파일을 가지고 있는지 확인할 수 있도록 목록을 함께 보냄
+        manifest = write_manifest(manifest_dir, plan, self.recipient)
+        paths.append(manifest)
+        if members is not None:
+            members.append((manifest, os.path.basename(manifest)))
+        self._sent_digests = plan.send
+        self._emit({
+            "status": "deduplicated",
+            "recipient": self.recipient,
+            "skipped_files": len(plan.skipped),
+            "skipped_bytes": plan.skipped_bytes,
+            "sent_files": len(plan.send),
+            "sent_bytes": plan.sent_bytes,
+            "code": self.code,
+        })
+        return paths, members
+
+    def _verify_manifests(self, event):
+        """Check the files dedup manifests received in this transfer say we already have"""
+        save_path = self.options.get("save_path")
+        if self._manifests_before is None or not save_path:
+            return
+        checks = verify_new_manifests(save_path, self._manifests_before, self.hasher)
+        if not checks:
+            return
+        event["manifest_present"] = sum(check.present for check in checks)
+        event["manifest_present_bytes"] = sum(check.present_bytes for check in checks)
+        event["manifest_missing"] = [name for check in checks for name in check.missing]
+        if event["manifest_missing"]:
+            log.warning("%s: %d files the sender left out are missing here: %s", self.transfer_id,
+                        len(event["manifest_missing"]), ", ".join(event["manifest_missing"][:20]))
+
+    def _compress(self, files):
+        """options['compress']: True, False, or "auto" to decide from sampled compressibility"""
+        compress = self.options.get("compress", True)
+        if compress != "auto":
+            return bool(compress)
+        estimate = estimate_compressibility(files)
+        self._emit({
+            "status": "analyzed",
+            "compress": estimate.compress,
+            "compress_ratio": estimate.ratio,
+            "compress_saving": estimate.saved_bytes,
+            "code": self.code,
+        })
+        return estimate.compress
+
+    def _run_send(self):
+        files = self.options.get("files", [])
+        if not (self.options.get("dedup") and self.recipient):
+            if self.hasher is not None:
+                self._start_hashing(files)
+            self._send(files)
+            return
+        manifest_dir = tempfile.mkdtemp(prefix="sirodrop-")
+        try:
+            self._send(*self._deduplicate(files, manifest_dir))
+        finally:
+            shutil.rmtree(manifest_dir, ignore_errors=True)
+
+    def _send(self, files, members=None):
+        shards = int(self.options.get("shards", 1))
+        self._compress_files = self._compress(files)
+        # 나눠 보낼 묶음 목록(members)은 한 세션의 tar 하나로만 보냄
+        if shards > 1 and len(files) > 1 and members is None:
+            self._run_sharded_send(shard_paths(files, shards))
+            return
+
+        result = self._supervise(
+            lambda callback: self.croc_utils.send_files(
+                files, code=self.code, callback=callback, transfer_id=self.transfer_id,
+                archive=bool(self.options.get("zip")), compress=self._compress_files, members=members
+            ),
+            self._emit
+        )
+        if not self._terminal_sent:
+            if result.get("status") == "completed":
+                # croc가 완료 메시지 없이 정상 종료하는 경우
+                self._emit({
+                    "status": "completed",
+                    "progress": 100,
+                    "code": self.code,
+                    "retries": result.get("retries", 0),
+                    "time_lost": result.get("time_lost", 0.0)
+                })
+            else:
+                self._emit({"status": "error", "message": "Transfer failed", "code": self.code})
+
+    def _run_sharded_send(self, groups):
+        """Send each group in its own croc session and report them as one transfer"""
+        codes = [f"{self.code}-{index}" for index in range(1, len(groups) + 1)]
+        progress = [0.0] * len(groups)
+        rates = [None] * len(groups)
+        sizes = [None] * len(groups)
+        archived = [0] * len(groups)
+        archive_sizes = [0] * len(groups)
+        states = [None] * len(groups)
+        announced = set()
+        lock = threading.Lock()
+
+        def shard_callback(index):
+            def callback(data):
+                with lock:
+                    if self._terminal_sent:
+                        return
+                    status = data.get("status")
+                    if "progress" in data and status != "error":
+                        progress[index] = float(data["progress"])
+                    if "rate" in data:
+                        rates[index] = data["rate"]
+                    elif status in ("completed", "error"):
+                        rates[index] = None
+                    if data.get("size") is not None:
+                        sizes[index] = data["size"]
+                    if status == "archiving":
+                        archived[index] = data["archived"]
+                        archive_sizes[index] = data["archive_size"]
+                    previous = states[index]
+                    states[index] = status
+                    event = dict(data, code=self.code, codes=codes, shard=index + 1, shard_count=len(groups))
+                    event["progress"] = sum(progress) / len(progress)
+                    if status == "transferring":
+                        # 세션별 속도와 크기를 합쳐 전체 전송 값으로 표시 (파일별 값은 세션마다 달라 제외)
+                        event["rate"] = sum(rate for rate in rates if rate)
+                        event["size"] = sum(sizes) if None not in sizes else None
+                        event["file_bytes"] = event["file_size"] = None
+                    elif status == "archiving":
+                        event["archived"] = sum(archived)
+                        event["archive_size"] = sum(archive_sizes)
+
+                    if status == "waiting":
+                        # 모든 세션의 코드가 준비되면 한 번만 알림
+                        announced.add(index)
+                        if len(announced) != len(groups):
+                            return
+                    elif status == "connected":
+                        if "connected" in states[:index] + states[index + 1:]:
+                            return
+                    elif status == "completed":
+                        if previous == "completed" or states.count("completed") != len(groups):
+                            event["status"] = "transferring"
+                    elif status == "error":
+                        if "error" in states[:index] + states[index + 1:]:
+                            return
+                        # 한 세션이 실패하면 나머지 세션도 중단
+                        self.croc_utils.terminate_transfer(self.transfer_id)
+                    self._emit(event)
+            return callback
+
+        def run_shard(index, group):
+            shard_id = f"{self.transfer_id}.{index + 1}"
+            result = self._supervise(
+                lambda callback: self.croc_utils.send_files(
+                    group, code=codes[index], callback=callback, transfer_id=shard_id,
+                    archive=bool(self.options.get("zip")), compress=self._compress_files
+                ),
+                shard_callback(index)
+            )
+            if result.get("status") == "completed" and states[index] != "completed":
+                shard_callback(index)({
+                    "status": "completed",
+                    "progress": 100,
+                    "retries": result.get("retries", 0),
+                    "time_lost": result.get("time_lost", 0.0)
+                })
+            return result
+
+        with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+            futures = [pool.submit(run_shard, index, group) for index, group in enumerate(groups)]
+            for future in futures:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self.croc_utils.terminate_transfer(self.transfer_id)
+                    if not self._terminal_sent:
+                        self._emit({"status": "error", "message": str(e), "code": self.code})
+                    continue
+                if result.get("status") != "completed" and not self._terminal_sent:
+                    self._emit({"status": "error", "message": "Transfer failed", "code": self.code})
+
+    def _run_receive(self):
+        if self.options.get("save_path"):
+            self._manifests_before = manifest_snapshot(self.options["save_path"])
+        # 재시도 시 같은 --out 폴더로 다시 실행하므로 croc가 부분 수신한 파일을 이어받음
+        self._supervise(
+            lambda callback: self.croc_utils.receive_file(
+                self.code,
+                destination=self.options.get("save_path"),
+                callback=callback,
+                transfer_id=self.transfer_id
+            ),
+            self._emit
+        )
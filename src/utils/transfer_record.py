@@ -0,0 +1,118 @@
+"""Turning a transfer's event stream into a history entry."""
+import os
+import threading
+import time
+
+from src.utils.logger import get_logger
+from src.utils.manifest import path_size
+from src.utils.throughput import ThroughputSeries
+
+log = get_logger("history")
+
+TERMINAL_STATUSES = ("completed", "error")
+# The first of these marks the moment the peers reached each other
+CONNECTED_STATUSES = ("connected", "connecting", "receiving", "transferring")
+
+
+class TransferRecorder:
+    """Follows transfers by id and appends one history entry when each ends
+
+    Each entry keeps a downsampled throughput series (see throughput.py).
+    Thread safe: sharded sends report from several threads at once.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._active = {}
+
+    def begin(self, transfer_id, direction, code, options=None):
+        """Start following a transfer (call from the worker thread: sizes a send's files)"""
+        options = options or {}
+        files = list(options.get("files", []))
+        record = {
+            "timestamp": time.time(),
+            "started": time.monotonic(),
+            "connected": None,
+            "throughput": ThroughputSeries(),
+            "direction": direction,
+            "code": code,
+            "file_name": os.path.basename(files[0].rstrip(os.sep)) if files else None,
+            "file_count": len(files) if files else None,
+            "size": sum(path_size(path) for path in files) if files else None,
+            "save_path": options.get("save_path"),
+            # 받는 사람 이름 (보낼 때 직접 입력, 중복 제외의 기준)
+            "peer": options.get("recipient") or None,
+            "dedup": None,
+        }
+        with self._lock:
+            self._active[transfer_id] = record
+
+    def observe(self, transfer_id, event):
+        """Feed one event; returns the stored entry when the transfer ends, else None"""
+        with self._lock:
+            record = self._active.get(transfer_id)
+            if record is None:
+                return None
+            status = event.get("status")
+            if event.get("file") and record["direction"] == "receive":
+                record["file_name"] = event["file"]
+                record["file_count"] = 1
+            if status in CONNECTED_STATUSES and record["connected"] is None:
+                record["connected"] = time.monotonic()
+            if event.get("size") is not None and record["size"] is None:
+                # 받는 쪽은 croc가 알려준 크기를 기록
+                record["size"] = event["size"]
+            if event.get("rate") is not None:
+                record["throughput"].add(event.get("progress"), event["rate"])
+            if event.get("code") and not record["code"]:
+                record["code"] = event["code"]
+            if status == "deduplicated":
+                record["dedup"] = event
+            if status not in TERMINAL_STATUSES:
+                return None
+            del self._active[transfer_id]
+
+        entry = {
+            "timestamp": record["timestamp"],
+            "direction": record["direction"],
+            "file_name": record["file_name"],
+            "file_count": record["file_count"],
+            "size": record["size"],
+            "code": record["code"],
+            "status": status,
+            "duration": time.monotonic() - record["started"],
+            "retries": event.get("retries", 0),
+            "error": event.get("message") if status == "error" else None,
+            "connect_time": (record["connected"] - record["started"]) if record["connected"] is not None else None,
+            "peer": record["peer"],
+        }
+        if record["save_path"]:
+            entry["save_path"] = record["save_path"]
+        throughput = record["throughput"].overview()
+        if throughput:
+            entry["throughput"] = throughput
+        if event.get("reason"):
+            entry["reason"] = event["reason"]
+        if event.get("time_lost"):
+            entry["time_lost"] = event["time_lost"]
+        if event.get("codes"):
+            entry["codes"] = event["codes"]
+        if event.get("content_digest"):
+            entry["hash_algorithm"] = event["hash_algorithm"]
+            entry["content_digest"] = event["content_digest"]
+            if event.get("checksums"):
+                entry["checksums"] = event["checksums"]
+        if record["dedup"] is not None:
+            entry["skipped_files"] = record["dedup"]["skipped_files"]
+            entry["bytes_saved"] = record["dedup"]["skipped_bytes"]
+        if event.get("manifest_missing") is not None:
+            entry["manifest_present"] = event["manifest_present"]
+            entry["manifest_missing"] = event["manifest_missing"]
+
+        try:
+            entry["id"] = self.store.append(entry)
+        except Exception:
+            # 기록 실패가 전송 결과에 영향을 주면 안 됨
+            log.exception("could not record transfer %s", transfer_id)
+        return entry
@@ -0,0 +1,164 @@
+"""Retry supervisor around a croc send or receive.
+
+A failed croc run is classified from its last error line and exit code.
+Transient failures (network, relay, peer dropping out) are retried with
+exponential backoff and jitter; croc resumes partially received files when
+it is re-run into the same ``--out`` directory. Permanent failures such as
+a wrong code, and failures that match no known pattern, are reported right
+away.
+"""
+import random
+import re
+import threading
+import time
+
+from src.utils.logger import get_logger
+
+log = get_logger("supervisor")
+
+# (reason, retryable, pattern) checked in order against croc's error line
+FAILURE_PATTERNS = (
+    ("cancelled", False, re.compile(r"interrupt|cancel+ed|killed|terminated", re.IGNORECASE)),
+    ("bad_code", False, re.compile(r"bad password|incorrect password|pake|could not decrypt|wrong code", re.IGNORECASE)),
+    ("refused", False, re.compile(r"refus|declined|rejected", re.IGNORECASE)),
+    ("file_not_found", False, re.compile(r"no such file|not found|does not exist", re.IGNORECASE)),
+    ("room_full", False, re.compile(r"room (?:is )?full", re.IGNORECASE)),
+    ("peer_disconnected", True, re.compile(r"peer disconnected|disconnect|EOF|connection reset|broken pipe", re.IGNORECASE)),
+    ("relay", True, re.compile(r"room not ready|relay|could not connect|connection refused", re.IGNORECASE)),
+    ("network", True, re.compile(r"timeout|timed out|no route|unreachable|network|dial tcp|i/o", re.IGNORECASE)),
+)
+
+FATAL_REASONS = frozenset(reason for reason, retryable, _ in FAILURE_PATTERNS if not retryable) | {"unknown"}
+
+
+def classify_failure(result):
+    """Return (reason, retryable) for a failed croc result dict"""
+    returncode = result.get("returncode")
+    if returncode is not None and returncode < 0:
+        # Killed by a signal: we terminated it (window closed, shard aborted)
+        return "cancelled", False
+
+    message = result.get("error") or ""
+    for reason, retryable, pattern in FAILURE_PATTERNS:
+        if pattern.search(message):
+            return reason, retryable
+    # Nothing says a rerun would help
+    return "unknown", False
+
+
+def failure_message(result, held_errors=()):
+    """croc's own error text for a failed attempt, or None if it gave none
+
+    The attempt's last error line wins; otherwise the first held error
+    event whose text classifies, then the first one croc printed. The
+    event sent when croc exits (it has a ``returncode``) only says that
+    it failed.
+    """
+    if result.get("error"):
+        return result["error"]
+    printed = [data["message"] for data in held_errors if data.get("message") and "returncode" not in data]
+    for message in printed:
+        if classify_failure({"error": message})[0] != "unknown":
+            return message
+    return printed[0] if printed else None
+
+
+class TransferSupervisor:
+    """Runs an attempt function until it succeeds or retrying is pointless"""
+
+    def __init__(self, max_retries=3, base_delay=2.0, max_delay=60.0, jitter=0.5):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Stop retrying; an ongoing backoff wait returns immediately"""
+        self._cancelled.set()
+
+    def backoff_delay(self, retry):
+        """Delay before the given retry (1-based): exponential with jitter"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (retry - 1)))
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def run(self, attempt, callback=None):
+        """Call ``attempt(callback)`` (a CrocUtils send/receive) with retries
+
+        Error events of an attempt that will be retried are held back and
+        replaced by a "retrying" event. The returned result, and the final
+        completed/error event, carry ``retries``, ``time_lost`` (seconds
+        spent in failed attempts and backoff) and, on failure, ``reason``.
+        """
+        retries = 0
+        time_lost = 0.0
+
+        while True:
+            held_errors = []
+            stats = {"retries": retries, "time_lost": time_lost}
+
+            def forward(data):
+                status = data.get("status")
+                if status == "error":
+                    held_errors.append(data)
+                    return
+                if callback:
+                    if status == "completed":
+                        data = dict(data, **stats)
+                    callback(data)
+
+            started = time.monotonic()
+            try:
+                result = attempt(forward)
+            except Exception as e:
+                result = {"status": "error", "error": str(e), "exception": e}
+            if result.get("status") == "completed":
+                return dict(result, retries=retries, time_lost=time_lost)
+
+            message = failure_message(result, held_errors)
+            reason, retryable = classify_failure(dict(result, error=message))
+            attempt_time = time.monotonic() - started
+
+            if self._cancelled.is_set():
+                reason, retryable = "cancelled", False
+
+            if retryable and retries < self.max_retries:
+                retries += 1
+                delay = self.backoff_delay(retries)
+                log.info("attempt %d failed (%s), retrying in %.1fs", retries, reason, delay)
+                if callback:
+                    callback({
+                        "status": "retrying",
+                        "reason": reason,
+                        "attempt": retries,
+                        "max_retries": self.max_retries,
+                        "delay": delay,
+                        "message": message or reason,
+                        "code": result.get("code")
+                    })
+                if self._cancelled.wait(delay):
+                    reason = "cancelled"
+                    time_lost += attempt_time
+                else:
+                    time_lost += attempt_time + delay
+                    continue
+            else:
+                time_lost += attempt_time
+
+            final = dict(result, retries=retries, time_lost=time_lost, reason=reason)
+            if message:
+                final["error"] = message
+            if callback:
+                error = dict(held_errors[-1]) if held_errors else {
+                    "status": "error",
+                    "message": "Transfer failed",
+                    "code": result.get("code")
+                }
+                if message:
+                    # croc's error line instead of the generic exit message
+                    error["message"] = message
+                error.update(retries=retries, time_lost=time_lost, reason=reason)
+                callback(error)
+            if "exception" in result:
+                raise result["exception"]
+            return final
@@ -0,0 +1,71 @@
+"""Byte counts and rates: parsing croc's text and formatting for display.
+
+croc prints sizes like "2.5 MB", "512 kB" or "1.2 GiB" and rates like
+"12.3 MB/s". Its progress bar library counts in 1024s whatever the
+suffix says, so every unit here is binary.
+"""
+import re
+
+SIZE_UNITS = {
+    "": 1, "B": 1,
+    "K": 1024, "KB": 1024, "KIB": 1024,
+    "M": 1024 ** 2, "MB": 1024 ** 2, "MIB": 1024 ** 2,
+    "G": 1024 ** 3, "GB": 1024 ** 3, "GIB": 1024 ** 3,
+    "T": 1024 ** 4, "TB": 1024 ** 4, "TIB": 1024 ** 4,
+}
+
+_UNIT = r"(?:[kmgt]i?)?b"
+_SIZE_RE = re.compile(rf"\s*(\d+(?:\.\d+)?)\s*((?:[kmgt]|{_UNIT})?)\s*", re.IGNORECASE)
+_RATE_RE = re.compile(rf"(\d+(?:\.\d+)?)\s*({_UNIT})/s", re.IGNORECASE)
+_TRANSFERRED_RE = re.compile(
+    rf"(\d+(?:\.\d+)?)\s*({_UNIT})?\s*/\s*(\d+(?:\.\d+)?)\s*({_UNIT})", re.IGNORECASE
+)
+
+
+def _bytes(number, unit):
+    return float(number) * SIZE_UNITS[(unit or "").upper()]
+
+
+def parse_size(text):
+    """Bytes from a size like "2.5 MB" or "10GB" (a bare number is bytes), or None"""
+    match = _SIZE_RE.fullmatch(text or "")
+    return round(_bytes(*match.groups())) if match else None
+
+
+def parse_rate(text):
+    """Bytes per second from a rate like "12.3 MB/s", or None (e.g. for "N/A")"""
+    match = _RATE_RE.search(text or "")
+    return _bytes(*match.groups()) if match else None
+
+
+def parse_transferred(text):
+    """(done, total) bytes from croc's "1.0/2.5 MB" (the first unit may be left out), or None"""
+    match = _TRANSFERRED_RE.search(text or "")
+    if not match:
+        return None
+    done, done_unit, total, total_unit = match.groups()
+    return round(_bytes(done, done_unit or total_unit)), round(_bytes(total, total_unit))
+
+
+def format_size(size):
+    """Human readable byte count"""
+    size = float(size)
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_rate(rate):
+    """Human readable bytes per second"""
+    return f"{format_size(rate)}/s"
+
+
+def format_duration(seconds):
+    """Clock-style duration: "0:07", "12:34", "1:02:03" """
+    seconds = max(0, int(round(seconds)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
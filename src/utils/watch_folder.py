@@ -0,0 +1,307 @@
+"""Watching an outbox folder and batching what lands in it for sending.
+
+Each top-level entry of the folder (a file or a whole folder) is one item.
+An item is ready once it has stopped changing: its size and mtime (for a
+folder: the file count, total size and newest mtime of everything in it)
+stay the same for ``quiet_period`` seconds. Items that become ready within
+``batch_window`` seconds of the first one are handed over together, so a
+build dropping twenty artifacts becomes one multi-file send.
+
+On Linux changes are noticed with inotify (through ctypes, no extra
+dependency) and the watcher thread sleeps in select() until something
+happens, so an idle folder costs nothing however many files it holds.
+Elsewhere the folder is polled: one stat of the folder per
+``poll_interval`` (its mtime moves when entries are added, removed or
+renamed), plus an os.scandir pass when it moved and every
+``RESCAN_INTERVAL`` seconds to catch files rewritten in place.
+
+Names starting with "." and common partial-file suffixes are ignored, so a
+writer that creates "x.part" and renames it when done only produces "x".
+"""
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from src.utils.logger import get_logger
+
+log = get_logger("watch")
+
+QUIET_PERIOD = 2.0
+BATCH_WINDOW = 5.0
+POLL_INTERVAL = 2.0
+RESCAN_INTERVAL = 30.0
+IGNORED_SUFFIXES = (".tmp", ".part", ".partial", ".crdownload", ".download", ".swp", "~")
+
+# inotify(7)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+# No IN_MODIFY: it fires on every write(); a write ends with IN_CLOSE_WRITE
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF)
+_EVENT = struct.Struct("iIII")
+
+
+def is_ignored(name):
+    """Hidden files and partial downloads are never sent"""
+    return name.startswith(".") or name.endswith(IGNORED_SUFFIXES)
+
+
+def tree_signature(path):
+    """(file count, total size, newest mtime_ns) of a file or everything under a folder"""
+    st = os.stat(path)
+    if not os.path.isdir(path):
+        return 1, st.st_size, st.st_mtime_ns
+    count, total, newest = 0, 0, st.st_mtime_ns
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            newest = max(newest, entry.stat(follow_symlinks=False).st_mtime_ns)
+                            continue
+                        entry_st = entry.stat()
+                    except OSError:
+                        continue
+                    count += 1
+                    total += entry_st.st_size
+                    newest = max(newest, entry_st.st_mtime_ns)
+        except OSError:
+            continue
+    return count, total, newest
+
+
+class _Inotify:
+    """Non-blocking inotify descriptor watching one directory"""
+
+    def __init__(self, path, mask=WATCH_MASK):
+        # Imported here: ctypes is only needed once a folder is watched (and only on Linux)
+        import ctypes
+        # The process's own symbols include libc's
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, os.strerror(errno), path)
+
+    def read(self):
+        """(mask, name) of every event queued so far"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            offset = 0
+            while offset < len(data):
+                _wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                events.append((mask, os.fsdecode(data[offset:offset + length].rstrip(b"\0"))))
+                offset += length
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _open_inotify(path):
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        return _Inotify(path)
+    except (OSError, AttributeError) as e:
+        # e.g. fs.inotify.max_user_watches exhausted, or a libc without inotify
+        log.warning("inotify unavailable for %s (%s), polling instead", path, e)
+        return None
+
+
+class FolderWatcher:
+    """Calls ``on_batch(paths)`` with each batch of settled items in a folder
+
+    ``run()`` blocks until ``stop()``, so give it its own thread; on_batch
+    runs on that thread. Items already in the folder at start are only sent
+    when ``include_existing`` is set. An item is sent again when it changes
+    after being sent (for folders: when the folder entry itself changes).
+    """
+
+    def __init__(self, path, on_batch, quiet_period=QUIET_PERIOD, batch_window=BATCH_WINDOW,
+                 poll_interval=POLL_INTERVAL, include_existing=False, use_inotify=True):
+        self.path = os.path.abspath(path)
+        self.on_batch = on_batch
+        self.quiet_period = quiet_period
+        self.batch_window = batch_window
+        self.poll_interval = poll_interval
+        self.include_existing = include_existing
+        self.use_inotify = use_inotify
+        self.mode = None
+        self._tick_interval = max(0.1, min(1.0, quiet_period / 4))
+        self._stop = threading.Event()
+        self._wake_lock = threading.Lock()
+        self._wake_r, self._wake_w = os.pipe()
+        # name -> cheap (size, mtime_ns) of the entry when last seen settled
+        self._known = {}
+        # name -> [tree signature, monotonic time it last changed]
+        self._pending = {}
+        self._batch = []
+        self._batch_deadline = None
+        self._next_tick = 0.0
+        self._next_poll = 0.0
+        self._folder_mtime = None
+        self._last_rescan = 0.0
+
+    def stop(self):
+        """Make run() return (safe from any thread)"""
+        self._stop.set()
+        with self._wake_lock:
+            if self._wake_w is not None:
+                os.write(self._wake_w, b"x")
+
+    def run(self):
+        """Watch until stop(); raises OSError if the folder goes away"""
+        inotify = _open_inotify(self.path) if self.use_inotify else None
+        self.mode = "inotify" if inotify is not None else "poll"
+        log.info("watching %s (%s)", self.path, self.mode)
+        try:
+            self._rescan(time.monotonic(), initial=True)
+            while not self._stop.is_set():
+                timeout = self._timeout(time.monotonic(), inotify is None)
+                if inotify is not None:
+                    readable, _, _ = select.select([inotify.fd, self._wake_r], [], [], timeout)
+                    if self._stop.is_set():
+                        break
+                    if inotify.fd in readable:
+                        self._handle_events(inotify.read(), time.monotonic())
+                else:
+                    # select() only takes sockets on Windows; polling just sleeps
+                    if self._stop.wait(timeout):
+                        break
+                    self._poll(time.monotonic())
+                self._tick(time.monotonic())
+        finally:
+            if inotify is not None:
+                inotify.close()
+            with self._wake_lock:
+                os.close(self._wake_r)
+                os.close(self._wake_w)
+                self._wake_w = None
+
+    def _timeout(self, now, polling):
+        """Seconds until something is due, or None to sleep until an event"""
+        deadlines = []
+        if self._pending:
+            deadlines.append(self._next_tick)
+        if self._batch_deadline is not None:
+            deadlines.append(self._batch_deadline)
+        if polling:
+            deadlines.append(self._next_poll)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - now)
+
+    def _handle_events(self, events, now):
+        for mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; compare against a fresh listing instead
+                self._rescan(now)
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                raise FileNotFoundError(f"Watched folder is gone: {self.path}")
+            elif not name or is_ignored(name):
+                continue
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._forget(name)
+            else:
+                self._mark(name, now)
+
+    def _poll(self, now):
+        if now < self._next_poll:
+            return
+        self._next_poll = now + self.poll_interval
+        folder_mtime = os.stat(self.path).st_mtime_ns
+        if folder_mtime != self._folder_mtime or now - self._last_rescan >= RESCAN_INTERVAL:
+            self._rescan(now)
+
+    def _rescan(self, now, initial=False):
+        """Compare a listing of the folder with what is known"""
+        self._folder_mtime = os.stat(self.path).st_mtime_ns
+        self._last_rescan = now
+        present = set()
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if is_ignored(entry.name):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                present.add(entry.name)
+                quick = (st.st_size, st.st_mtime_ns)
+                if initial and not self.include_existing:
+                    self._known[entry.name] = quick
+                elif self._known.get(entry.name) != quick:
+                    self._mark(entry.name, now)
+        for name in list(self._known):
+            if name not in present:
+                self._forget(name)
+
+    def _mark(self, name, now):
+        """Something happened to an entry; wait for it to settle again"""
+        if name in self._batch:
+            self._batch.remove(name)
+        if name not in self._pending:
+            self._pending[name] = [None, now]
+            self._next_tick = min(self._next_tick, now)
+
+    def _forget(self, name):
+        self._known.pop(name, None)
+        self._pending.pop(name, None)
+        if name in self._batch:
+            self._batch.remove(name)
+
+    def _tick(self, now):
+        if self._pending and now >= self._next_tick:
+            self._next_tick = now + self._tick_interval
+            for name, state in list(self._pending.items()):
+                path = os.path.join(self.path, name)
+                try:
+                    signature = tree_signature(path)
+                    st = os.stat(path)
+                except OSError:
+                    self._forget(name)
+                    continue
+                if signature != state[0]:
+                    state[0] = signature
+                    state[1] = now
+                elif now - state[1] >= self.quiet_period:
+                    del self._pending[name]
+                    self._known[name] = (st.st_size, st.st_mtime_ns)
+                    if not self._batch:
+                        self._batch_deadline = now + self.batch_window
+                    self._batch.append(name)
+
+        if self._batch and now >= self._batch_deadline:
+            paths = sorted(os.path.join(self.path, name) for name in self._batch)
+            self._batch = []
+            self._batch_deadline = None
+            try:
+                self.on_batch(paths)
+            except Exception:
+                log.exception("watch batch handler failed")
+        elif not self._batch:
+            self._batch_deadline = None